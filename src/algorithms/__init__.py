@@ -4,13 +4,22 @@ Modified __init__.py for algorithms with animation support
 Add this to: src/algorithms/__init__.py
 """
 
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
 from .dfs import dfs
 from .bfs import bfs
 from .ucs import ucs
 from .dls import dls
 from .ids import ids
 from .astar import astar
-from networkx import MultiDiGraph
+from core.edge_snapping import virtual_nodes
+from core.weight_profiles import DEFAULT_PROFILE
+from .instrumentation import SearchStats
+
+if TYPE_CHECKING:
+    from networkx import MultiDiGraph
 
 ALGORITHMS = {
     "DFS": dfs,
@@ -21,6 +30,9 @@ ALGORITHMS = {
     "IDS": ids,
 }
 
+# Chain compression keeps path weights but not hop counts, so only the weighted searches use it
+COMPRESSIBLE = ("UCS", "A*")
+
 COMPARE_MODE = "Compare All"
 
 
@@ -32,18 +44,38 @@ def run_algorithm(
     node_coords: dict[int, tuple[float, float]],
     callback=None,  # NEW: callback for visualization
     delay: float = 0.0,  # NEW: delay in seconds
+    search_graph=None,
+    snaps=None,
+    cancel=None,
+    stats=None,
+    profile: str = None,
+    snapshot=None,
 ):
     """
     Run pathfinding algorithm with optional animation.
 
     Args:
         algorithm_name: Name of algorithm to run
-        graph: Road network graph
+        graph: Road network graph (Map.graph, or a networkx MultiDiGraph)
         start_node: Starting node ID
         goal_node: Goal node ID
-        node_coords: Dictionary of node coordinates
-        callback: Optional function called after each step with (current_node, visited_set)
+        node_coords: Node ID -> (lat, lon) mapping (Map.node_coords or a dict)
+        callback: Optional function called after each step with (current_node, visited_set);
+            the set is the live one, so callbacks must not modify it
         delay: Optional delay in seconds between steps (for animation)
+        search_graph: Optional ChainCompressedGraph; UCS and A* run on it and
+            the path is expanded back to the full node sequence (the other
+            searches ignore it)
+        snaps: Optional {virtual node id: EdgeSnap} for endpoints placed on an
+            edge; start_node/goal_node may then be those virtual ids
+        cancel: Optional threading.Event; once set the search stops at its
+            next step and returns an empty path
+        stats: Optional SearchStats the algorithm fills with its hot-path
+            counters; leaving it out keeps the search uninstrumented
+        profile: Optional weight profile name (see Map.profiles) the weighted
+            searches minimise; None keeps the graph's own (length)
+        snapshot: Optional WeightSnapshot to search; None takes the latest
+            one. Either way the search keeps it while updates are published
 
     Returns:
         tuple: (path, nodes_explored)
@@ -53,7 +85,28 @@ def run_algorithm(
     if not algorithm:
         raise ValueError(f"Algorithm {algorithm_name} not found")
 
+    if hasattr(graph, "with_profile"):
+        # A view of its own: the profile and any snapped endpoints stay private to this query
+        graph = graph.with_profile(profile, snapshot)
+    elif profile not in (None, DEFAULT_PROFILE):
+        raise ValueError(f"Weight profile {profile} needs a compiled graph")
+    elif snapshot is not None:
+        raise ValueError("Weight snapshots need a compiled graph")
+
+    if search_graph is not None and algorithm_name in COMPRESSIBLE:
+        with search_graph.query(start_node, goal_node, snaps, graph.profile, graph.snapshot) as compressed, \
+                virtual_nodes(None, node_coords, snaps):
+            path, explored = _search(algorithm_name, compressed, start_node, goal_node, node_coords, callback, delay, cancel, stats)
+            return compressed.expand_path(path), explored
+
+    with virtual_nodes(graph, node_coords, snaps):
+        return _search(algorithm_name, graph, start_node, goal_node, node_coords, callback, delay, cancel, stats)
+
+
+def _search(algorithm_name, graph, start_node, goal_node, node_coords, callback, delay, cancel, stats):
+    algorithm = ALGORITHMS[algorithm_name]
     if algorithm_name == "A*":
-        return algorithm(graph, start_node, goal_node, node_coords, callback, delay)
+        return algorithm(graph, start_node, goal_node, node_coords, callback, delay, cancel, stats)
 
-    return algorithm(graph, start_node, goal_node, callback, delay)
+    # Keywords: DLS/IDS take a depth limit before the callback
+    return algorithm(graph, start_node, goal_node, callback=callback, delay=delay, cancel=cancel, stats=stats)
@@ -1,8 +1,14 @@
+from __future__ import annotations
+
 import heapq
 import math
 import time
-from networkx import MultiDiGraph
-from core.utils import reconstruct_path
+from typing import TYPE_CHECKING
+from core.utils import heuristic_scale, reconstruct_path, weighted_neighbors
+from algorithms.instrumentation import estimate_memory
+
+if TYPE_CHECKING:
+    from networkx import MultiDiGraph
 
 
 def astar(
@@ -12,44 +18,82 @@ def astar(
     nodes_data: dict[int, tuple[float, float]],
     callback=None,
     delay: float = 0.0,
+    cancel=None,
+    stats=None,
 ):
 
     pq = [(0, start)]
     g_score = {start: 0}
     parent = {start: None}
     visited_set = set()
+    neighbors = weighted_neighbors(graph)
 
     gx, gy = nodes_data[goal]
+    ky, kx = heuristic_scale(graph, gx)
+
+    counting = stats is not None
+    pops = 0
+    heuristic_s = 0.0
 
     while pq:
+        if cancel is not None and cancel.is_set():
+            return [], len(visited_set)
+
+        if counting:
+            stats.peak_frontier = max(stats.peak_frontier, len(pq))
+            pops += 1
+
         _, current = heapq.heappop(pq)
 
         if current == goal:
             break
 
         if current in visited_set:
+            if counting:
+                stats.stale_pops += 1
             continue
 
         visited_set.add(current)
 
         if callback:
-            callback(current, visited_set.copy())
+            callback(current, visited_set)
 
-        for neighbor in graph.neighbors(current):
-            edge_data = graph.get_edge_data(current, neighbor)[0]
-            weight = edge_data.get("length", 1)
+        if counting:
+            adjacency_start = time.perf_counter()
+            adjacent = neighbors(current)
+            stats.edges_scanned += len(adjacent)
+        else:
+            adjacent = neighbors(current)
 
+        for neighbor, weight in adjacent:
             new_g = g_score[current] + weight
 
             if neighbor not in g_score or new_g < g_score[neighbor]:
                 parent[neighbor] = current
                 g_score[neighbor] = new_g
 
-                # heuristic: euclidean distance
+                if counting:
+                    heuristic_start = time.perf_counter()
+
+                # heuristic: straight-line distance, scaled so it never overestimates the weight left
                 nx_lat, nx_lon = nodes_data[neighbor]
-                dist = math.sqrt((nx_lat - gx) ** 2 + (nx_lon - gy) ** 2) * 111000
+                dist = math.sqrt(((nx_lat - gx) * ky) ** 2 + ((nx_lon - gy) * kx) ** 2)
+
+                if counting:
+                    heuristic_s += time.perf_counter() - heuristic_start
 
                 f_score = new_g + dist
                 heapq.heappush(pq, (f_score, neighbor))
 
+        if counting:
+            stats.adjacency_ms += (time.perf_counter() - adjacency_start) * 1000
+
+    if counting:
+        stats.expansions = len(visited_set)
+        stats.discovered = len(parent)
+        stats.pushes = pops + len(pq)
+        stats.heuristic_ms = heuristic_s * 1000
+        stats.adjacency_ms -= stats.heuristic_ms
+        estimate_memory(stats, (g_score, parent, visited_set), (0.0, start))
+
     return reconstruct_path(parent, goal), len(visited_set)
@@ -1,6 +1,12 @@
+from __future__ import annotations
+
 import time
-from networkx import MultiDiGraph
+from typing import TYPE_CHECKING
 from core.utils import reconstruct_path
+from algorithms.instrumentation import estimate_memory
+
+if TYPE_CHECKING:
+    from networkx import MultiDiGraph
 
 
 def dfs(
@@ -9,28 +15,58 @@ def dfs(
     goal: int,
     callback=None,
     delay: float = 0.0,
+    cancel=None,
+    stats=None,
 ):
     stack = [start]
     parent = {start: None}
     visited_set = set()
 
+    counting = stats is not None
+    pops = 0
+
     while stack:
+        if cancel is not None and cancel.is_set():
+            return [], len(visited_set)
+
+        if counting:
+            stats.peak_frontier = max(stats.peak_frontier, len(stack))
+            pops += 1
+
         current = stack.pop()
 
         if current in visited_set:
+            if counting:
+                stats.stale_pops += 1
             continue
 
         visited_set.add(current)
 
         if callback:
-            callback(current, visited_set.copy())
+            callback(current, visited_set)
 
         if current == goal:
             break
 
-        for neighbor in graph.neighbors(current):
+        if counting:
+            adjacency_start = time.perf_counter()
+            adjacent = list(graph.neighbors(current))
+            stats.edges_scanned += len(adjacent)
+        else:
+            adjacent = graph.neighbors(current)
+
+        for neighbor in adjacent:
             if neighbor not in parent:
                 parent[neighbor] = current
                 stack.append(neighbor)
 
-    return reconstruct_path(parent, goal), len(parent)
+        if counting:
+            stats.adjacency_ms += (time.perf_counter() - adjacency_start) * 1000
+
+    if counting:
+        stats.expansions = len(visited_set)
+        stats.discovered = len(parent)
+        stats.pushes = pops + len(stack)
+        estimate_memory(stats, (parent, visited_set), start)
+
+    return reconstruct_path(parent, goal), len(visited_set)
@@ -1,5 +1,12 @@
-from networkx import MultiDiGraph
+from __future__ import annotations
+
+import time
+from typing import TYPE_CHECKING
 from core.utils import reconstruct_path
+from algorithms.instrumentation import estimate_memory
+
+if TYPE_CHECKING:
+    from networkx import MultiDiGraph
 
 
 def dls(
@@ -7,13 +14,25 @@ def dls(
     start: int,
     goal: int,
     limit: int = 200,
-    callback=None, 
+    callback=None,
     delay: float = 0.0,
+    cancel=None,
+    stats=None,
 ):
     stack = [(start, 0)]
     parent = {start: None}
 
+    counting = stats is not None
+    pops = 0
+
     while stack:
+        if cancel is not None and cancel.is_set():
+            return [], len(parent)
+
+        if counting:
+            stats.peak_frontier = max(stats.peak_frontier, len(stack))
+            pops += 1
+
         current, current_depth = stack.pop()
 
         if current == goal:
@@ -22,11 +41,27 @@ def dls(
         if current_depth >= limit:
             continue
 
-        for neighbor in graph.neighbors(current):
+        if counting:
+            stats.expansions += 1
+            adjacency_start = time.perf_counter()
+            adjacent = list(graph.neighbors(current))
+            stats.edges_scanned += len(adjacent)
+        else:
+            adjacent = graph.neighbors(current)
+
+        for neighbor in adjacent:
             if neighbor not in parent:
                 parent[neighbor] = current
                 stack.append((neighbor, current_depth + 1))
 
+        if counting:
+            stats.adjacency_ms += (time.perf_counter() - adjacency_start) * 1000
+
+    if counting:
+        stats.discovered = len(parent)
+        stats.pushes = pops + len(stack)
+        estimate_memory(stats, (parent,), (start, 0))
+
     if goal not in parent:
         return [], len(parent)
 
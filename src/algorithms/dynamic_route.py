@@ -0,0 +1,87 @@
+from contextlib import ExitStack
+
+from algorithms.lpastar import LPAStar
+from core.edge_snapping import virtual_nodes
+from core.graph_view import NodeCoords
+
+
+class DynamicRoute:
+    """
+    A start → goal route kept current while roads are edited live
+    (Map.apply_edits) or traffic speeds come in (Map.ingest_traffic).
+
+    The route searches its own view of the map's arrays, with any snapped
+    endpoints spliced in. repair() moves that view to the latest weight
+    snapshot and feeds the edges changed since the last call to an LPAStar,
+    which only re-expands the part of the search they affect. The route is
+    planned afresh when the A* scale changes, when the changes reach back
+    further than the edit log or when they touch over REPLAN_SHARE of the
+    edges.
+    """
+
+    REPLAN_SHARE = 0.05
+
+    def __init__(self, map, start: int, goal: int, snaps=None, profile: str = None):
+        self.map = map
+        self.compiled = map.compiled
+        self.start = start
+        self.goal = goal
+        self.snaps = snaps or {}
+        self.profile = profile
+        self.version = self.compiled.version
+        self.planner = None
+        self._endpoints = ExitStack()
+
+    def repair(self, cancel=None):
+        """(path, nodes expanded) for the current edits; the first call plans from scratch."""
+        c = self.compiled
+        if self.map.compiled is not c:
+            raise RuntimeError("The map this route was planned on has been replaced")
+
+        # Taken before the log, so the edges read can only be a superset of the snapshot's changes
+        snapshot = c.snapshot
+        edges = c.edited_since(self.version)
+        self.version = snapshot.version
+
+        if (
+            self.planner is None
+            or edges is None
+            or len(edges) > self.REPLAN_SHARE * c.num_edges
+            or c.heuristic_scale(self.planner.graph.profile, snapshot) != (self.planner.ky, self.planner.kx)
+        ):
+            self._plan(snapshot)
+        elif len(edges):
+            pairs = list(zip(c.node_ids[c.edge_sources[edges]].tolist(), c.target_ids[edges].tolist()))
+            pairs.extend(self._pin(snapshot, self._on_snapped_edge(pairs)))
+            self.planner.update_edges(pairs)
+
+        return self.planner.compute(cancel)
+
+    def close(self):
+        self._endpoints.close()
+
+    def _plan(self, snapshot):
+        self.close()
+        view = self.map.graph.with_profile(self.profile, snapshot)
+        coords = NodeCoords(view)
+        self._endpoints.enter_context(virtual_nodes(view, coords, self.snaps))
+        self.planner = LPAStar(view, self.start, self.goal, coords)
+
+    def _on_snapped_edge(self, pairs):
+        snapped = {(u, v) for snap in self.snaps.values() for u, v, _, _ in snap.directions()}
+        return any(pair in snapped for pair in pairs)
+
+    def _pin(self, snapshot, resplit):
+        """
+        Move the planner to a view of `snapshot`, splicing the endpoints in
+        again; with `resplit` returns every virtual edge before or after.
+        """
+        old, coords = self.planner.graph, self.planner.node_coords
+        view = old.with_profile(None, snapshot)
+        before = old.overlay_edges()
+
+        self.close()
+        self._endpoints.enter_context(virtual_nodes(view, coords, self.snaps))
+        self.planner.graph = view
+
+        return before + view.overlay_edges() if resplit else []
@@ -1,5 +1,11 @@
-from networkx import MultiDiGraph
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
 from core.utils import reconstruct_path
+from algorithms.instrumentation import estimate_memory
+
+if TYPE_CHECKING:
+    from networkx import MultiDiGraph
 
 
 def ids(
@@ -8,33 +14,62 @@ def ids(
     goal: int,
     max_depth: int = 200,
     callback=None,
-    delay: float = 0.0,  
+    delay: float = 0.0,
+    cancel=None,
+    stats=None,
 ):
     total_explored = 0
+    parent, found = {start: None}, False
 
     for depth_limit in range(max_depth + 1):
         parent = {start: None}
-        found = _depth_limited_search(graph, start, goal, depth_limit, parent)
+        if stats is not None:
+            stats.pushes += 1
+        found = _depth_limited_search(graph, start, goal, depth_limit, parent, cancel, stats)
         total_explored += len(parent)
 
+        if cancel is not None and cancel.is_set():
+            return [], total_explored
+
         if found:
-            return reconstruct_path(parent, goal), total_explored
+            break
+
+    if stats is not None:
+        # Every iteration re-discovers from scratch; the frontier is the recursion stack
+        stats.discovered = total_explored
+        estimate_memory(stats, (parent,), start)
 
-    return [], total_explored
+    if not found:
+        return [], total_explored
 
+    return reconstruct_path(parent, goal), total_explored
+
+
+def _depth_limited_search(graph, node, goal, limit, parent, cancel=None, stats=None, current_depth=0):
+    if cancel is not None and cancel.is_set():
+        return False
 
-def _depth_limited_search(graph, node, goal, limit, parent, current_depth=0):
     if node == goal:
         return True
 
     if current_depth >= limit:
         return False
 
-    for neighbor in graph.neighbors(node):
+    if stats is not None:
+        stats.expansions += 1
+        stats.peak_frontier = max(stats.peak_frontier, current_depth + 1)
+        adjacent = list(graph.neighbors(node))
+        stats.edges_scanned += len(adjacent)
+    else:
+        adjacent = graph.neighbors(node)
+
+    for neighbor in adjacent:
         if neighbor not in parent:
             parent[neighbor] = node
+            if stats is not None:
+                stats.pushes += 1
             if _depth_limited_search(
-                graph, neighbor, goal, limit, parent, current_depth + 1
+                graph, neighbor, goal, limit, parent, cancel, stats, current_depth + 1
             ):
                 return True
 
@@ -0,0 +1,42 @@
+import sys
+from dataclasses import dataclass, asdict
+
+POINTER_BYTES = 8
+
+
+@dataclass
+class SearchStats:
+    """
+    Hot-path counters a search fills in when one is passed as `stats`.
+
+    Without one, each algorithm pays a single local flag test per expansion.
+    `edges_scanned` counts the out-edges read at each expansion, closed ones
+    skipped. Pushes are derived from pops and what is left in the frontier,
+    so the push path itself is never counted; IDS, whose frontier is the
+    recursion stack, counts each frame it enters. `adjacency_ms` is time spent
+    reading each expanded node's edges and relaxing them, frontier pushes
+    included and heuristic time excluded.
+    """
+    expansions: int = 0
+    discovered: int = 0
+    edges_scanned: int = 0
+    pushes: int = 0
+    stale_pops: int = 0
+    peak_frontier: int = 0
+    peak_memory_bytes: int = 0
+    heuristic_ms: float = 0.0
+    adjacency_ms: float = 0.0
+
+    def as_dict(self):
+        return asdict(self)
+
+
+def estimate_memory(stats: SearchStats, containers, frontier_item):
+    """
+    Peak bytes of the search state: the bookkeeping containers (which only
+    grow, so their final size is their peak) plus the frontier at its peak.
+    """
+    item_bytes = POINTER_BYTES + sys.getsizeof(frontier_item)
+    if isinstance(frontier_item, tuple):
+        item_bytes += sum(sys.getsizeof(x) for x in frontier_item)
+    stats.peak_memory_bytes = sum(sys.getsizeof(c) for c in containers) + stats.peak_frontier * item_bytes
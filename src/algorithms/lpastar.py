@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import heapq
+import math
+from typing import TYPE_CHECKING
+from core.utils import heuristic_scale
+
+if TYPE_CHECKING:
+    from core.graph_view import GraphView
+
+INF = math.inf
+
+
+class LPAStar:
+    """
+    Lifelong Planning A* (Koenig & Likhachev) between a fixed start and goal.
+
+    The first compute() does the work of an A* search. After edges change,
+    update_edges() re-queues only the heads of those edges, and the next
+    compute() repairs the g-values that actually moved instead of searching
+    from scratch. `graph` needs weighted_neighbors and weighted_predecessors
+    (a GraphView); point it at a view of the new weights before calling
+    update_edges().
+    """
+
+    def __init__(self, graph: GraphView, start: int, goal: int, node_coords):
+        self.graph = graph
+        self.start = start
+        self.goal = goal
+        self.node_coords = node_coords
+
+        self.g = {}
+        self.rhs = {start: 0.0}
+        self.queued = {}  # node -> its key while in the heap; other heap entries are stale
+        self.heap = []
+        self.expanded = 0  # by the last compute()
+
+        self.gx, self.gy = node_coords[goal]
+        self.ky, self.kx = heuristic_scale(graph, self.gx)
+        self._push(start)
+
+    @property
+    def cost(self):
+        return self.g.get(self.goal, INF)
+
+    def update_edges(self, pairs):
+        """Re-check the heads of changed edges [(u, v)]: closed, reopened, or re-weighted."""
+        for _, v in pairs:
+            self._update_vertex(v)
+
+    def compute(self, cancel=None, callback=None, stats=None):
+        """Bring g up to date for the goal; returns (path, nodes expanded by this call)."""
+        g, rhs, queued, heap = self.g, self.rhs, self.queued, self.heap
+        neighbors = self.graph.weighted_neighbors
+        expanded = set()
+        counting = stats is not None
+
+        while heap:
+            if cancel is not None and cancel.is_set():
+                return [], len(expanded)
+
+            k1, k2, u = heap[0]
+            if queued.get(u) != (k1, k2):
+                heapq.heappop(heap)
+                if counting:
+                    stats.stale_pops += 1
+                continue
+            if (k1, k2) >= self._key(self.goal) and rhs.get(self.goal, INF) == g.get(self.goal, INF):
+                break
+
+            if counting:
+                stats.peak_frontier = max(stats.peak_frontier, len(queued))
+
+            heapq.heappop(heap)
+            del queued[u]
+            expanded.add(u)
+            if callback:
+                callback(u, expanded)
+
+            g_old, r = g.get(u, INF), rhs.get(u, INF)
+            successors = neighbors(u)
+            if counting:
+                stats.edges_scanned += len(successors)
+
+            if g_old > r:
+                # Overconsistent: u's cost dropped to rhs, which can only lower its successors'
+                g[u] = r
+                for v, w in successors:
+                    if r + w < rhs.get(v, INF):
+                        rhs[v] = r + w
+                        self._push(v)
+            else:
+                # Underconsistent: u got dearer; successors that leaned on it look for a new best
+                g[u] = INF
+                self._update_vertex(u)
+                for v, w in successors:
+                    if rhs.get(v, INF) == g_old + w:
+                        self._update_vertex(v)
+
+        self.expanded = len(expanded)
+        if counting:
+            stats.expansions += len(expanded)
+        return self.path(), len(expanded)
+
+    def path(self):
+        """The current shortest path, walking back over the cheapest predecessors; [] if unreachable."""
+        if self.cost == INF:
+            return []
+
+        path = [self.goal]
+        seen = {self.goal}
+        while path[-1] != self.start:
+            preds = self.graph.weighted_predecessors(path[-1])
+            node = min(preds, key=lambda p: self.g.get(p[0], INF) + p[1])[0] if preds else None
+            if node is None or node in seen:
+                return []
+            path.append(node)
+            seen.add(node)
+        return path[::-1]
+
+    def _update_vertex(self, v):
+        if v != self.start:
+            best = INF
+            for u, w in self.graph.weighted_predecessors(v):
+                best = min(best, self.g.get(u, INF) + w)
+            self.rhs[v] = best
+        self._push(v)
+
+    def _push(self, v):
+        """Queue v under its current key when it is inconsistent, otherwise drop it."""
+        if self.g.get(v, INF) == self.rhs.get(v, INF):
+            self.queued.pop(v, None)
+            return
+        key = self._key(v)
+        if self.queued.get(v) != key:
+            self.queued[v] = key
+            heapq.heappush(self.heap, (*key, v))
+
+    def _key(self, v):
+        best = min(self.g.get(v, INF), self.rhs.get(v, INF))
+        lat, lon = self.node_coords[v]
+        h = math.sqrt(((lat - self.gx) * self.ky) ** 2 + ((lon - self.gy) * self.kx) ** 2)
+        return best + h, best
@@ -1,35 +1,58 @@
+from __future__ import annotations
+
 import heapq
 import time
-from networkx import MultiDiGraph
-from core.utils import reconstruct_path
+from typing import TYPE_CHECKING
+from core.utils import reconstruct_path, weighted_neighbors
+from algorithms.instrumentation import estimate_memory
+
+if TYPE_CHECKING:
+    from networkx import MultiDiGraph
 
 
-def ucs(graph: MultiDiGraph, start: int, goal: int, callback=None, delay: float = 0.0):
+def ucs(graph: MultiDiGraph, start: int, goal: int, callback=None, delay: float = 0.0, cancel=None, stats=None):
 
     pq = [(0, start)]
     costs = {start: 0}
     parent = {start: None}
     visited = set()
+    neighbors = weighted_neighbors(graph)
+
+    counting = stats is not None
+    pops = 0
 
     while pq:
+        if cancel is not None and cancel.is_set():
+            return [], len(visited)
+
+        if counting:
+            stats.peak_frontier = max(stats.peak_frontier, len(pq))
+            pops += 1
+
         current_cost, current = heapq.heappop(pq)
 
         if current == goal:
             break
 
         if current in visited:
+            if counting:
+                stats.stale_pops += 1
             continue
 
         visited.add(current)
 
 
         if callback:
-            callback(current, visited.copy())
+            callback(current, visited)
 
-        for neighbor in graph.neighbors(current):
-            edge_data = graph.get_edge_data(current, neighbor)[0]
-            weight = edge_data.get("length", 1)
+        if counting:
+            adjacency_start = time.perf_counter()
+            adjacent = neighbors(current)
+            stats.edges_scanned += len(adjacent)
+        else:
+            adjacent = neighbors(current)
 
+        for neighbor, weight in adjacent:
             new_cost = current_cost + weight
 
             if neighbor not in costs or new_cost < costs[neighbor]:
@@ -37,4 +60,13 @@ def ucs(graph: MultiDiGraph, start: int, goal: int, callback=None, delay: float
                 parent[neighbor] = current
                 heapq.heappush(pq, (new_cost, neighbor))
 
+        if counting:
+            stats.adjacency_ms += (time.perf_counter() - adjacency_start) * 1000
+
+    if counting:
+        stats.expansions = len(visited)
+        stats.discovered = len(parent)
+        stats.pushes = pops + len(pq)
+        estimate_memory(stats, (costs, parent, visited), (0.0, start))
+
     return reconstruct_path(parent, goal), len(visited)
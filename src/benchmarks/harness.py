@@ -0,0 +1,133 @@
+import time
+
+import numpy as np
+
+PERCENTILES = (50, 90, 99)
+HIGHER_IS_BETTER = ("throughput_per_s", "points_per_s")  # every other metric is a time
+FAILURE_COUNTS = ("timeouts", "errors")  # search stage counts that must not go up
+DEFAULT_METRIC = "best_p50_ms"
+MIN_DELTA_MS = 1.0  # time differences below this are never regressions
+
+
+def measure(fn, warmup: int = 1, repeat: int = 5):
+    """Run fn() `warmup` times untimed, then `repeat` times; returns the timings in seconds."""
+    for _ in range(warmup):
+        fn()
+
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def measure_each(fn, items, warmup: int = 1, repeat: int = 3):
+    """Time fn(item) for every item, `repeat` rounds after `warmup` untimed ones; one sample per call."""
+    for _ in range(warmup):
+        for item in items:
+            fn(item)
+
+    samples = []
+    for _ in range(repeat):
+        for item in items:
+            start = time.perf_counter()
+            fn(item)
+            samples.append(time.perf_counter() - start)
+    return samples
+
+
+def best_of_rounds(samples, num_items: int):
+    """Fastest timing of each item, from samples taken round by round over the same `num_items` items."""
+    if num_items == 0 or len(samples) == 0:
+        return []
+    return np.asarray(samples, dtype=np.float64).reshape(-1, num_items).min(axis=0).tolist()
+
+
+def summarize(samples, items_per_sample: int = 1, best=None):
+    """
+    Percentiles (ms) of a list of timings in seconds, plus throughput in items
+    per second where each sample processed `items_per_sample` items.
+
+    `best` holds the fastest timing of each distinct item (see best_of_rounds;
+    every sample counts as its own item when left out). Their median is
+    "best_p50_ms", which scheduling noise and slow rounds barely move.
+    """
+    ms = np.asarray(samples, dtype=np.float64) * 1000
+    if len(ms) == 0:
+        return {"count": 0}
+
+    summary = {
+        "count": int(len(ms)),
+        "min_ms": float(ms.min()),
+        "mean_ms": float(ms.mean()),
+        "max_ms": float(ms.max()),
+    }
+    for p in PERCENTILES:
+        summary[f"p{p}_ms"] = float(np.percentile(ms, p))
+
+    best_ms = ms if best is None else np.asarray(best, dtype=np.float64) * 1000
+    summary["best_p50_ms"] = float(np.median(best_ms))
+
+    total_s = ms.sum() / 1000
+    summary["throughput_per_s"] = float(len(ms) * items_per_sample / total_s) if total_s > 0 else None
+    return summary
+
+
+def compare(current, baseline, tolerance: float = 0.10, stage_tolerances=None, metric: str = DEFAULT_METRIC,
+            min_delta_ms: float = MIN_DELTA_MS):
+    """
+    Stages that regressed against the baseline: their `metric` got slower by
+    more than the tolerance (a fraction; `stage_tolerances` overrides it per
+    stage name) and, for times, by at least `min_delta_ms`; the baseline has
+    the metric but the current run does not (every query timed out or
+    failed); or more queries hit the timeout or raised (FAILURE_COUNTS).
+
+    Returns a list of (graph, stage, field, baseline, current, slowdown),
+    worst first. For `metric`, slowdown is current / baseline for times and
+    baseline / current for the HIGHER_IS_BETTER rates, and current is None
+    with an infinite slowdown when the metric is gone. For the counts it is
+    current / baseline, infinite from a baseline of zero.
+    """
+    stage_tolerances = stage_tolerances or {}
+    regressions = []
+
+    for graph_name, graph in current["graphs"].items():
+        base_graph = baseline.get("graphs", {}).get(graph_name)
+        if base_graph is None:
+            continue
+
+        for stage, summary in graph["stages"].items():
+            base_summary = base_graph["stages"].get(stage, {})
+            base = base_summary.get(metric)
+            value = summary.get(metric)
+
+            if base and value is None:
+                regressions.append((graph_name, stage, metric, base, None, float("inf")))
+            elif base and value is not None:
+                if metric in HIGHER_IS_BETTER:
+                    ratio = base / value if value > 0 else float("inf")
+                    noticeable = True
+                else:
+                    ratio = value / base
+                    noticeable = value - base >= min_delta_ms
+                if noticeable and ratio > 1.0 + stage_tolerances.get(stage, tolerance):
+                    regressions.append((graph_name, stage, metric, base, value, ratio))
+
+            for field in FAILURE_COUNTS:
+                count, base_count = summary.get(field, 0), base_summary.get(field, 0)
+                if count > base_count:
+                    ratio = count / base_count if base_count else float("inf")
+                    regressions.append((graph_name, stage, field, base_count, count, ratio))
+
+    return sorted(regressions, key=lambda r: -r[5])
+
+
+def missing_stages(current, baseline):
+    """(graph, stage) pairs the baseline measured but the current report lacks, for graphs in both."""
+    missing = []
+    for graph_name, graph in current["graphs"].items():
+        base_graph = baseline.get("graphs", {}).get(graph_name)
+        if base_graph is not None:
+            missing.extend((graph_name, stage) for stage in base_graph["stages"] if stage not in graph["stages"])
+    return missing
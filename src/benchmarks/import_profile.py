@@ -0,0 +1,59 @@
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def profile_imports(module: str, top: int = 10, repeat: int = 3):
+    """
+    Import `module` in fresh interpreters under -X importtime (from src/, like
+    the entry points) and keep the fastest run. Returns the total ms, the
+    heaviest packages by summed self time and the heaviest single modules.
+    """
+    best = None
+    for _ in range(repeat):
+        rows = _run(module)
+        total = next((cum for _, cum, depth, name in rows if name == module and depth == 1), None)
+        if total is not None and (best is None or total < best[0]):
+            best = (total, rows)
+
+    if best is None:
+        raise RuntimeError(f"Could not import {module}")
+
+    total, rows = best
+    packages = defaultdict(int)
+    for self_us, _, _, name in rows:
+        packages[name.split(".")[0]] += self_us
+
+    return {
+        "total_ms": total / 1000,
+        "packages": [
+            {"name": name, "self_ms": us / 1000}
+            for name, us in sorted(packages.items(), key=lambda item: -item[1])[:top]
+        ],
+        "modules": [
+            {"name": name, "self_ms": self_us / 1000, "cumulative_ms": cum / 1000}
+            for self_us, cum, _, name in sorted(rows, key=lambda r: -r[0])[:top]
+        ],
+    }
+
+
+def _run(module):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=SRC_DIR, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr else f"import {module} failed")
+
+    rows = []
+    for line in result.stderr.splitlines():
+        match = LINE.match(line)
+        if match:
+            self_us, cum_us, indent, name = match.groups()
+            rows.append((int(self_us), int(cum_us), len(indent), name))
+    return rows
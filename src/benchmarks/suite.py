@@ -0,0 +1,237 @@
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+
+import networkx as nx
+import numpy as np
+
+from algorithms import ALGORITHMS, run_algorithm
+from algorithms.dynamic_route import DynamicRoute
+from benchmarks.harness import best_of_rounds, measure, measure_each, summarize
+from core.map import Map
+from core.map_matching import MapMatcher
+from core.osm_importer import is_osm_file
+from core.road_edits import road_edits
+from core.synthetic_roads import synthetic_graph
+
+
+def run_suite(graphs, algorithms=None, queries: int = 40, seed: int = 0, warmup: int = 1, repeat: int = 5,
+              load_repeat: int = 5, timeout_s: float = 10.0, compress: bool = False, min_km: float = 0.5,
+              max_km: float = 5.0, profile: str = "length"):
+    """
+    Benchmark every graph source; `graphs` maps a name to ("region", location)
+    for a cached region or local extract, or ("synthetic", nodes) for a
+    generated road network. Returns the JSON-ready report.
+    """
+    report = {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "networkx": nx.__version__,
+            "machine": platform.machine(),
+            "queries": queries,
+            "seed": seed,
+            "warmup": warmup,
+            "repeat": repeat,
+            "compress": compress,
+            "profile": profile,
+        },
+        "graphs": {},
+    }
+
+    for name, (kind, source) in graphs.items():
+        print(f"⏱️ Benchmarking {name}", file=sys.stderr)
+        if kind == "region":
+            load = _region_loader(source)
+        else:
+            load = _synthetic_loader(source, seed)
+        if load is None:
+            print(f"⚠️ Skipping {name}: not cached locally", file=sys.stderr)
+            continue
+
+        report["graphs"][name] = benchmark_graph(
+            load, algorithms or list(ALGORITHMS), queries, seed, warmup, repeat, load_repeat,
+            timeout_s, compress, min_km, max_km, profile,
+        )
+
+    return report
+
+
+def benchmark_graph(load, algorithms, queries, seed, warmup, repeat, load_repeat, timeout_s, compress,
+                    min_km, max_km, profile="length"):
+    stages = {}
+    loaded = []
+    samples = measure(lambda: loaded.append(load()), warmup=0, repeat=load_repeat)
+    stages["load"] = summarize(samples, best=best_of_rounds(samples, 1))
+    m = loaded[-1]
+
+    starts, goals, _ = m.sampler.sample(queries, min_km, max_km, seed=seed)
+    pairs = list(zip(starts.tolist(), goals.tolist()))
+
+    # Snap points spread over the graph's bounding box
+    rng = np.random.default_rng(seed)
+    low, high = m.compiled.coords.min(axis=0), m.compiled.coords.max(axis=0)
+    points = rng.uniform(low, high, size=(max(queries, 1), 2)).tolist()
+    samples = measure_each(lambda p: m.snap_to_edge(*p), points, warmup, repeat)
+    stages["snap"] = summarize(samples, best=best_of_rounds(samples, len(points)))
+
+    search_graph = m.search_graph if compress else None
+    for _ in range(warmup):
+        for name in algorithms:
+            for start, goal in pairs:
+                _search(m, name, start, goal, search_graph, timeout_s, profile)
+
+    # Rounds go through every algorithm in turn, so a slow spell of the machine
+    # hits one round of each rather than every round of one
+    runs = {name: {"samples": [], "best": {}, "timeouts": 0, "found": 0, "errors": []} for name in algorithms}
+    for r in range(repeat):
+        for name in algorithms:
+            run = runs[name]
+            for start, goal in pairs:
+                elapsed, path, error = _search(m, name, start, goal, search_graph, timeout_s, profile)
+                if error is not None:
+                    run["errors"].append(error)
+                    continue
+                if path is None:
+                    run["timeouts"] += 1
+                    continue
+                run["samples"].append(elapsed)
+                run["best"][start, goal] = min(elapsed, run["best"].get((start, goal), elapsed))
+                run["found"] += bool(path)
+
+    for name, run in runs.items():
+        summary = summarize(run["samples"], best=list(run["best"].values()))
+        summary["timeouts"] = run["timeouts"]
+        summary["found"] = run["found"]
+        # Crashed searches are left out of the timings, but counted
+        summary["errors"] = len(run["errors"])
+        if run["errors"]:
+            summary["error"] = run["errors"][0]
+        stages[f"search:{name}"] = summary
+
+    # The later stages take their routes from one UCS reference search, whichever algorithms were selected
+    paths = []
+    for start, goal in pairs:
+        _, path, _ = _search(m, "UCS", start, goal, search_graph, timeout_s, profile)
+        if path:
+            paths.append(path)
+    if paths:
+        samples = measure_each(m.get_path_coords, paths, warmup, repeat)
+        stages["geometry"] = summarize(samples, best=best_of_rounds(samples, len(paths)))
+        samples = _repair_samples(m, paths, profile, repeat)
+        stages["repair"] = summarize(samples, best=best_of_rounds(samples, sum(len(p) >= 2 for p in paths)))
+        stages["match"] = _match_summary(m, paths, seed, warmup, repeat)
+    samples = _ingest_samples(m, seed, warmup, repeat)
+    stages["ingest"] = summarize(samples, best=best_of_rounds(samples, 1))
+
+    return {
+        "nodes": len(m.node_keys),
+        "edges": m.graph.number_of_edges(),
+        "pairs": len(pairs),
+        "stages": stages,
+    }
+
+
+def _search(m, name, start, goal, search_graph, timeout_s, profile):
+    """(seconds, path, error) for one query; path is None when it hit the timeout, error the message if it raised."""
+    cancel = threading.Event()
+    timer = threading.Timer(timeout_s, cancel.set)
+    timer.start()
+    try:
+        begin = time.perf_counter()
+        path, _ = run_algorithm(name, m.graph, start, goal, m.node_coords, search_graph=search_graph, cancel=cancel,
+                                profile=profile)
+        elapsed = time.perf_counter() - begin
+    except Exception as e:
+        return None, None, f"{type(e).__name__}: {e}"
+    finally:
+        timer.cancel()
+    return elapsed, None if cancel.is_set() else path, None
+
+
+def _repair_samples(m, paths, profile, repeat=1):
+    """
+    Seconds to repair each route after closing the road at its middle, planned
+    before the closure; `repeat` rounds over the routes of two or more nodes.
+    """
+    samples = []
+    for path in [path for path in paths if len(path) >= 2] * repeat:
+        route = DynamicRoute(m, path[0], path[-1], profile=profile)
+        route.repair()
+
+        c = m.compiled
+        u, v = path[len(path) // 2 - 1], path[len(path) // 2]
+        two_way = c.edge_ids([c.index_of(v)], [c.index_of(u)])[0] >= 0
+        m.apply_edits(road_edits(u, v, two_way, closed=True))
+        begin = time.perf_counter()
+        route.repair()
+        samples.append(time.perf_counter() - begin)
+
+        m.clear_edits()
+        route.close()
+    return samples
+
+
+def _match_summary(m, paths, seed, warmup, repeat, spacing_m=20.0, noise_m=5.0):
+    """Seconds to map-match each route as a GPS trace: a fix every `spacing_m` with `noise_m` of noise, one core."""
+    rng = np.random.default_rng(seed)
+    projection = m.segment_index
+    traces = []
+    for path in paths:
+        xy = projection.project(*np.asarray(m.get_path_coords(path)).T)
+        along = np.concatenate([[0.0], np.cumsum(np.hypot(*np.diff(xy, axis=0).T))])
+        at = np.arange(0.0, along[-1], spacing_m)
+        fixes = np.column_stack([np.interp(at, along, xy[:, 0]), np.interp(at, along, xy[:, 1])])
+        traces.append(projection.unproject(fixes + rng.normal(0.0, noise_m, fixes.shape)))
+
+    # A fresh matcher each round, so the shortest-path trees are not already cached
+    samples = []
+    for r in range(warmup + repeat):
+        matcher = MapMatcher(m.compiled, m.segment_index)
+        round_samples = measure_each(matcher.match, traces, warmup=0, repeat=1)
+        if r >= warmup:
+            samples.extend(round_samples)
+
+    summary = summarize(samples, best=best_of_rounds(samples, len(traces)))
+    summary["points_per_s"] = sum(len(trace) for trace in traces) * repeat / sum(samples) if samples else 0.0
+    return summary
+
+
+def _ingest_samples(m, seed, warmup, repeat):
+    """Seconds to read and publish a traffic snapshot CSV with a speed for every edge."""
+    c = m.compiled
+    speeds = np.random.default_rng(seed).uniform(5.0, 120.0, c.num_edges)
+    rows = np.column_stack([c.node_ids[c.edge_sources], c.target_ids, speeds])
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "traffic.csv")
+        np.savetxt(path, rows, fmt=["%d", "%d", "%.1f"], delimiter=",", header="u,v,speed_kph", comments="")
+        return measure(lambda: m.ingest_traffic(path), warmup=warmup, repeat=repeat)
+
+
+def _region_loader(location):
+    probe = Map()
+    key = probe.cache.region_key(location, probe.network_type)
+    if not probe.cache.has_graph(key) and not is_osm_file(location):
+        return None
+
+    def load():
+        m = Map()
+        success, msg = m.load_map(location)
+        if not success:
+            raise RuntimeError(msg)
+        return m
+    return load
+
+
+def _synthetic_loader(nodes, seed):
+    graph = synthetic_graph(int(nodes), seed)
+
+    def load():
+        m = Map()
+        m.load_graph(graph, f"synthetic network of {nodes:,} nodes")
+        return m
+    return load
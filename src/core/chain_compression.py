@@ -0,0 +1,320 @@
+import weakref
+from contextlib import contextmanager
+
+import numpy as np
+
+from core.graph_view import GraphView
+from core.weight_profiles import DEFAULT_PROFILE
+
+
+class ChainCompressedGraph:
+    """
+    Search graph with maximal degree-2 chains collapsed into single edges.
+
+    A node is a chain interior if it only passes traffic through: one-way
+    (one predecessor, one different successor) or two-way (exactly two
+    neighbours, both reachable in both directions). Compressed edges are CSR
+    rows over the original dense node indices (interior nodes have empty
+    rows), each keeping the interior nodes it replaces and the original
+    edges it runs along, so paths found here expand back to full node
+    sequences and every weight profile sums up without recompressing.
+    Parallel chains between the same junctions are all kept. A chain is
+    closed while any of its edges is. Chain weights are summed per weight
+    snapshot on first use and dropped along with it.
+    """
+
+    def __init__(self, view: GraphView):
+        c = view.compiled
+        self.compiled = c
+        self.index = view.index
+        n = c.num_nodes
+
+        indptr, targets = c.indptr.tolist(), c.indices.tolist()
+        order = np.argsort(c.indices, kind="stable")
+        rev_indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(c.indices, minlength=n), out=rev_indptr[1:])
+        rev_indptr, rev_sources = rev_indptr.tolist(), c.edge_sources[order].tolist()
+
+        def is_interior(i):
+            succs = targets[indptr[i]:indptr[i + 1]]
+            preds = rev_sources[rev_indptr[i]:rev_indptr[i + 1]]
+            if i in succs or i in preds:
+                return False  # self-loop
+            if len(preds) == 1 and len(succs) == 1:
+                return preds != succs
+            return len(preds) == 2 and set(preds) == set(succs)
+
+        is_node = [not is_interior(i) for i in range(n)]
+
+        def walk_chains(u):
+            for e in range(indptr[u], indptr[u + 1]):
+                if targets[e] == u:
+                    continue
+                prev, current = u, targets[e]
+                chain, edges = [], [e]
+
+                while not is_node[current]:
+                    chain.append(current)
+                    row = range(indptr[current], indptr[current + 1])
+                    nxt = next(f for f in row if targets[f] != prev or len(row) == 1)
+                    edges.append(nxt)
+                    prev, current = current, targets[nxt]
+
+                chains.append((u, current, chain, edges))
+
+        chains = []
+        for u in range(n):
+            if is_node[u]:
+                walk_chains(u)
+
+        # Rings made only of interior nodes have no junction to start from
+        on_chain = np.zeros(n, dtype=bool)
+        for chain in chains:
+            on_chain[chain[2]] = True
+        for u in np.flatnonzero(~on_chain & ~np.array(is_node, dtype=bool)).tolist():
+            if not on_chain[u]:
+                is_node[u] = True
+                first = len(chains)
+                walk_chains(u)
+                for chain in chains[first:]:
+                    on_chain[chain[2]] = True
+
+        chains.sort(key=lambda chain: chain[0])
+        counts = np.fromiter((len(chain[2]) for chain in chains), dtype=np.int64, count=len(chains))
+
+        self.sources = np.fromiter((chain[0] for chain in chains), dtype=np.int32, count=len(chains))
+        self.targets = np.fromiter((chain[1] for chain in chains), dtype=np.int32, count=len(chains))
+        self.target_ids = c.node_ids[self.targets]
+        self.indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.sources, minlength=n), out=self.indptr[1:])
+
+        # Edge e's interior nodes are chain_nodes[chain_offsets[e]:chain_offsets[e + 1]]; the original
+        # edges it runs along are chain_edges[chain_offsets[e] + e:chain_offsets[e + 1] + e + 1]
+        self.chain_offsets = np.zeros(len(chains) + 1, dtype=np.int64)
+        np.cumsum(counts, out=self.chain_offsets[1:])
+        self.chain_nodes = np.fromiter((i for chain in chains for i in chain[2]), dtype=np.int32,
+                                       count=int(self.chain_offsets[-1]))
+        self.chain_edges = np.fromiter((e for chain in chains for e in chain[3]), dtype=np.int64,
+                                       count=int(self.chain_offsets[-1]) + len(chains))
+
+        # Interior node -> (compressed edge, position in its chain) for every edge it lies on
+        flat_edges = np.repeat(np.arange(len(chains), dtype=np.int64), counts)
+        order = np.argsort(self.chain_nodes, kind="stable")
+        self.through_edges = flat_edges[order]
+        self.through_pos = (order - self.chain_offsets[flat_edges[order]]).astype(np.int32)
+        self.through_indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.chain_nodes, minlength=n), out=self.through_indptr[1:])
+
+        self.is_node = np.array(is_node, dtype=bool)
+        self.num_nodes = int(self.is_node.sum())
+        self.num_edges = len(chains)
+        self.original_nodes = n
+        self.original_edges = c.num_edges
+
+        # WeightSnapshot -> {profile: (edge weights, chain prefix weights), None: closed chains}
+        self._sums = weakref.WeakKeyDictionary()
+
+        print(
+            f"🔗 Chain compression: {self.original_nodes:,} → {self.num_nodes:,} nodes, "
+            f"{self.original_edges:,} → {self.num_edges:,} edges"
+        )
+
+    def profile_weights(self, profile: str = DEFAULT_PROFILE, snapshot=None):
+        """
+        (weights, prefix) for a profile: each compressed edge's total, and for
+        every chain node the weight from its edge's source up to it.
+        """
+        sums = self._snapshot_sums(snapshot)
+        if profile not in sums:
+            per_edge = (snapshot or self.compiled.snapshot).weights[profile][self.chain_edges]
+            runs = np.diff(self.chain_offsets) + 1
+            ends = np.cumsum(runs)
+            totals = np.concatenate([[0.0], np.cumsum(per_edge)])
+            along = totals[1:] - np.repeat(totals[ends - runs], runs)
+
+            is_last = np.zeros(len(per_edge), dtype=bool)
+            is_last[ends - 1] = True
+            sums[profile] = (along[is_last], along[~is_last])
+        return sums[profile]
+
+    def closed_chains(self, snapshot=None):
+        """Mask of the compressed edges with a closed edge on them."""
+        return self._snapshot_sums(snapshot)[None]
+
+    def _snapshot_sums(self, snapshot=None):
+        snapshot = snapshot or self.compiled.snapshot
+        sums = self._sums.get(snapshot)
+        if sums is None:
+            closed = np.zeros(self.num_edges, dtype=bool)
+            if snapshot.num_closed and self.num_edges:
+                runs = np.diff(self.chain_offsets) + 1
+                closed = np.logical_or.reduceat(snapshot.closed[self.chain_edges], np.cumsum(runs) - runs)
+            sums = self._sums.setdefault(snapshot, {None: closed})
+        return sums
+
+    @contextmanager
+    def query(self, start, goal, snaps=None, profile: str = DEFAULT_PROFILE, snapshot=None):
+        """
+        Yield a search graph over the compressed edges with start/goal inserted
+        when they sit inside a chain.
+
+        Split edges cut the chains at start (start → chain end) and goal
+        (chain start → goal); they belong to the yielded CompressedQuery, so
+        concurrent queries do not see each other's endpoints. `snaps` maps
+        virtual endpoint ids to the EdgeSnap they stand for. The weights come
+        from `snapshot`, the latest one by default.
+        """
+        snaps = snaps or {}
+        q = CompressedQuery(self, profile, snapshot or self.compiled.snapshot)
+        start_splits = self._splits(q, start, snaps.get(start))
+        goal_splits = self._splits(q, goal, snaps.get(goal))
+
+        for e, _, after, offset in start_splits:
+            q.add_split_edge(start, int(self.target_ids[e]), e, after, self._chain_size(e), offset, float(q.weights[e]))
+
+        for e, before, _, offset in goal_splits:
+            q.add_split_edge(int(self.compiled.node_ids[self.sources[e]]), goal, e, 0, before, 0.0, offset)
+
+            # start and goal on the same chain, start first
+            for s_e, _, s_after, s_offset in start_splits:
+                if s_e == e and s_offset < offset and s_after <= before:
+                    q.add_split_edge(start, goal, e, s_after, before, s_offset, offset)
+
+        yield q
+
+    def _splits(self, q, node, snap=None):
+        """
+        (edge, before, after, offset) for each compressed edge that `node` cuts:
+        chain[:before] lies behind it, chain[after:] ahead, `offset` (profile
+        weight) from its source.
+        """
+        if snap is None:
+            i = self.index.get(node)
+            if i is None:
+                return []
+            return [
+                (e, pos, pos + 1, float(q.prefix[self.chain_offsets[e] + pos]))
+                for e, pos in self._through(i)
+            ]
+
+        splits = []
+        for a, b, t, _ in snap.directions():
+            e, position, offset = self._locate(q, self.index[a], self.index[b])
+            weight = self.compiled.edge_weight(a, b, q.profile, q.snapshot)
+            splits.append((e, position, position, offset + t * weight))
+        return splits
+
+    def _locate(self, q, a, b):
+        """The compressed edge containing original edge a → b (dense indices), where a sits in its chain, and a's offset."""
+        for e, i in self._through(a):
+            start = int(self.chain_offsets[e])
+            nxt = self.chain_nodes[start + i + 1] if i + 1 < self._chain_size(e) else self.targets[e]
+            if nxt == b:
+                return e, i + 1, float(q.prefix[start + i])
+
+        for e, i in self._through(b):
+            if i == 0 and self.sources[e] == a:
+                return e, 0, 0.0
+
+        for e in range(self.indptr[a], self.indptr[a + 1]):
+            if self.targets[e] == b and self._chain_size(e) == 0:
+                return e, 0, 0.0
+        raise KeyError(f"No edge {a} → {b} in the compressed graph")
+
+    def _through(self, i):
+        start, end = self.through_indptr[i], self.through_indptr[i + 1]
+        return list(zip(self.through_edges[start:end].tolist(), self.through_pos[start:end].tolist()))
+
+    def _chain_size(self, e):
+        return int(self.chain_offsets[e + 1] - self.chain_offsets[e])
+
+
+class CompressedQuery:
+    """One query's view of a ChainCompressedGraph: a profile's weights in one snapshot plus that query's split edges."""
+
+    def __init__(self, compressed: ChainCompressedGraph, profile: str, snapshot):
+        self.compressed = compressed
+        self.profile = profile
+        self.snapshot = snapshot
+        self.index = compressed.index
+        self.weights, self.prefix = compressed.profile_weights(profile, snapshot)
+        self.heuristic_scale = compressed.compiled.heuristic_scale(profile, snapshot)
+        self.any_closed = bool(snapshot.num_closed)
+        self.closed = compressed.closed_chains(snapshot)
+        self._closed = memoryview(self.closed)
+
+        self._row_ptr = memoryview(compressed.indptr)
+        self._row_ids = memoryview(compressed.target_ids)
+        self._row_weights = memoryview(self.weights)
+
+        # Split edges: {u: {v: (weight, interior node ids)}}
+        self._extra = {}
+
+    def __getitem__(self, node):
+        return self.neighbors(node)
+
+    def neighbors(self, node):
+        i = self.index.get(node)
+        if i is None:
+            nbrs = []
+        else:
+            start = self._row_ptr[i]
+            nbrs = self._row_ids[start:self._row_ptr[i + 1]].tolist()
+            if self.any_closed:
+                nbrs = [v for e, v in enumerate(nbrs, start) if not self._closed[e]]
+
+        extra = self._extra.get(node)
+        if extra:
+            nbrs.extend(extra)
+        return nbrs
+
+    def weighted_neighbors(self, node):
+        """[(neighbour, weight)], parallel chains included; see core.utils.weighted_neighbors."""
+        i = self.index.get(node)
+        if i is None:
+            pairs = []
+        else:
+            start, end = self._row_ptr[i], self._row_ptr[i + 1]
+            pairs = list(zip(self._row_ids[start:end].tolist(), self._row_weights[start:end].tolist()))
+            if self.any_closed:
+                pairs = [pair for e, pair in enumerate(pairs, start) if not self._closed[e]]
+
+        extra = self._extra.get(node)
+        if extra:
+            pairs.extend((v, weight) for v, (weight, _) in extra.items())
+        return pairs
+
+    def add_split_edge(self, u, v, e, chain_from, chain_to, start_offset, end_offset):
+        """Edge u→v covering chain[chain_from:chain_to] of compressed edge e, from start_offset to end_offset along it."""
+        c = self.compressed
+        start = int(c.chain_offsets[e])
+        if self.any_closed and self.snapshot.closed[c.chain_edges[start + e + chain_from:start + e + chain_to + 1]].any():
+            return
+        chain = c.compiled.node_ids[c.chain_nodes[start + chain_from:start + chain_to]].tolist()
+        weight = end_offset - start_offset
+
+        edges = self._extra.setdefault(u, {})
+        if v not in edges or weight < edges[v][0]:
+            edges[v] = (weight, chain)
+
+    def expand_path(self, path):
+        """Full node sequence for a path found on this query's graph."""
+        if not path:
+            return []
+
+        full = [path[0]]
+        for u, v in zip(path[:-1], path[1:]):
+            full.extend(self._cheapest_chain(u, v))
+            full.append(v)
+        return full
+
+    def _cheapest_chain(self, u, v):
+        c = self.compressed
+        best = self._extra.get(u, {}).get(v)
+        i, j = self.index.get(u), self.index.get(v)
+        if i is not None and j is not None:
+            for e in range(c.indptr[i], c.indptr[i + 1]):
+                if c.targets[e] == j and not self.closed[e] and (best is None or self.weights[e] < best[0]):
+                    start, end = c.chain_offsets[e], c.chain_offsets[e + 1]
+                    best = (self.weights[e], c.compiled.node_ids[c.chain_nodes[start:end]].tolist())
+        return best[1]
@@ -0,0 +1,425 @@
+from __future__ import annotations
+
+import hashlib
+import threading
+import weakref
+from collections import deque
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from core.spatial_index import EARTH_RADIUS_KM, LocalProjection
+from core.weight_profiles import DEFAULT_SPEED_KPH, EdgeTable, evaluate_profile, uses_speed
+from core.weight_snapshot import WeightSnapshot
+
+if TYPE_CHECKING:
+    from networkx import MultiDiGraph
+
+
+class CompiledGraph:
+    """
+    Array form of a road graph: sorted node ids, CSR adjacency and packed edge geometry.
+
+    Parallel edges are collapsed to one edge per (u, v) pair, keeping the
+    shortest one's geometry; each weight profile column (see add_profile)
+    holds the minimum over the parallel edges. Every edge's
+    geometry is stored as its "tail" (all points except the first, which is the
+    source node) in one flat (P, 2) lat/lon array, so a path's coordinates are
+    the start node followed by the tails of its edges. N extra tail entries (one
+    per node, holding just that node) cover consecutive path nodes without an edge.
+
+    Weights live in an immutable WeightSnapshot; add_profile, apply_edits
+    and ingest_speeds publish a new one instead of changing arrays that
+    running searches read. Methods taking `snapshot` default to the latest.
+    """
+
+    EDIT_LOG_SIZE = 32  # published updates edited_since() can look back over
+    EDIT_LOG_SHARE = 0.1  # updates changing more of the edges are logged without their ids
+
+    def __init__(self, node_ids, coords, indptr, indices, lengths, geom_offsets, geom_coords, edge_table=None):
+        self.node_ids = node_ids          # int64 (N,), sorted
+        self.coords = coords              # float64 (N, 2) lat/lon
+        self.indptr = indptr              # int64 (N + 1,)
+        self.indices = indices            # int32 (E,), sorted within each row
+        self.lengths = lengths            # float64 (E,)
+        self.geom_offsets = geom_offsets  # int64 (E + N + 1,)
+        self.geom_coords = geom_coords    # float64 (P, 2) lat/lon
+
+        self.num_nodes = len(node_ids)
+        self.num_edges = len(indices)
+
+        self.edge_sources = np.repeat(np.arange(self.num_nodes, dtype=np.int64), np.diff(indptr))
+        self.target_ids = node_ids[indices]
+        self._edge_keys = self.edge_sources * self.num_nodes + indices
+
+        if edge_table is None:
+            edge_table = EdgeTable(
+                edge=np.arange(self.num_edges, dtype=np.int64),
+                length=lengths,
+                speed_kph=np.full(self.num_edges, float(DEFAULT_SPEED_KPH)),
+                highway=np.zeros(self.num_edges, dtype=np.int16),
+                highway_names=["unclassified"],
+            )
+        self.edge_table = edge_table
+
+        self._polyline_lengths = None
+        self._reverse = None
+
+        # profile name -> expression, re-evaluated when traffic speeds change
+        self.expressions = {"length": "length"}
+        self.snapshot = WeightSnapshot.initial({"length": lengths.copy()}, self.num_edges)
+
+        # Updates are serialised; each one logs the edges it changed
+        self._writer = threading.Lock()
+        self._edit_log = deque(maxlen=self.EDIT_LOG_SIZE)
+        self._live = weakref.WeakValueDictionary({0: self.snapshot})
+
+    @classmethod
+    def from_graph(cls, graph: MultiDiGraph):
+        node_ids = np.fromiter(graph.nodes, dtype=np.int64, count=graph.number_of_nodes())
+        node_ids.sort()
+        n = len(node_ids)
+        index = {int(node): i for i, node in enumerate(node_ids)}
+
+        coords = np.empty((n, 2), dtype=np.float64)
+        for node, data in graph.nodes(data=True):
+            coords[index[node]] = (data["y"], data["x"])
+
+        edges, row_pairs, rows = {}, [], []
+        for u, v, key, data in graph.edges(keys=True, data=True):
+            pair = (index[u], index[v])
+            row_pairs.append(pair)
+            rows.append(data)
+            # The shortest parallel edge (lowest key on ties) gives the geometry
+            rank = (float(data.get("length", 0)), key)
+            if pair not in edges or rank < edges[pair][0]:
+                edges[pair] = (rank, data)
+
+        pairs = sorted(edges)
+        edge_of = {pair: e for e, pair in enumerate(pairs)}
+        edge_table = EdgeTable.from_rows([edge_of[pair] for pair in row_pairs], rows)
+        sources = np.fromiter((p[0] for p in pairs), dtype=np.int64, count=len(pairs))
+        indices = np.fromiter((p[1] for p in pairs), dtype=np.int32, count=len(pairs))
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=n), out=indptr[1:])
+
+        lengths = np.empty(len(pairs), dtype=np.float64)
+        tails = []
+        for e, pair in enumerate(pairs):
+            rank, data = edges[pair]
+            lengths[e] = rank[0]
+            if "geometry" in data:
+                tails.append([(lat, lon) for lon, lat in data["geometry"].coords][1:])
+            else:
+                tails.append([tuple(coords[pair[1]])])
+
+        counts = np.fromiter((len(t) for t in tails), dtype=np.int64, count=len(tails))
+        counts = np.concatenate([counts, np.ones(n, dtype=np.int64)])
+        geom_offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+        np.cumsum(counts, out=geom_offsets[1:])
+
+        geom_coords = np.empty((geom_offsets[-1], 2), dtype=np.float64)
+        points = [p for tail in tails for p in tail]
+        if points:
+            geom_coords[:geom_offsets[len(tails)]] = points
+        geom_coords[geom_offsets[len(tails)]:] = coords
+
+        return cls(node_ids, coords, indptr, indices, lengths, geom_offsets, geom_coords, edge_table)
+
+    def __getstate__(self):
+        # Pickled for worker processes: the arrays and the current snapshot, without the update machinery
+        state = self.__dict__.copy()
+        for name in ("_writer", "_edit_log", "_live"):
+            del state[name]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._writer = threading.Lock()
+        self._edit_log = deque(maxlen=self.EDIT_LOG_SIZE)
+        self._live = weakref.WeakValueDictionary({self.snapshot.version: self.snapshot})
+
+    @property
+    def weights(self):
+        return self.snapshot.weights
+
+    @property
+    def closed(self):
+        return self.snapshot.closed
+
+    @property
+    def num_closed(self):
+        return self.snapshot.num_closed
+
+    @property
+    def factors(self):
+        return self.snapshot.factors
+
+    @property
+    def version(self):
+        return self.snapshot.version
+
+    def add_profile(self, name: str, expression: str):
+        """Compile a weight profile (see core.weight_profiles) into a column; the others are shared."""
+        with self._writer:
+            snap = self.snapshot
+            weights = evaluate_profile(expression, self.edge_table, self.num_edges, snap.traffic)
+            base = snap.base
+            if base is not None:
+                base = {**base, name: weights}
+                weights = weights * snap.factors
+
+            # Routes on a replaced profile have to re-check every edge
+            changed = np.arange(self.num_edges) if name in snap.weights else np.empty(0, dtype=np.int64)
+            self.expressions[name] = expression
+            self._publish(snap.derive(weights={**snap.weights, name: weights}, base=base), changed)
+
+    def apply_edits(self, edits):
+        """
+        Publish a snapshot with RoadEdits applied; returns the ids of the edges they changed.
+
+        Closed edges keep their weights and are skipped by the graph views.
+        Factors rescale every profile column from its unscaled copy. The A*
+        scales carry over unless a factor went down.
+        """
+        if not edits:
+            return np.empty(0, dtype=np.int64)
+
+        u = self.node_index([edit.u for edit in edits])
+        v = self.node_index([edit.v for edit in edits])
+        ids = self.edge_ids(np.minimum(u, self.num_nodes - 1), np.minimum(v, self.num_nodes - 1))
+        for edit, e in zip(edits, ids.tolist()):
+            if e < 0 or self.node_ids[self.edge_sources[e]] != edit.u or self.target_ids[e] != edit.v:
+                raise KeyError(f"No edge {edit.u} → {edit.v}")
+            if edit.factor is not None and not (edit.factor > 0 and np.isfinite(edit.factor)):
+                raise ValueError(f"Weight factor must be positive and finite, got {edit.factor}")
+
+        with self._writer:
+            snap = self.snapshot
+            closed, factors, weights, base = snap.closed, snap.factors, snap.weights, snap.base
+
+            closing = [(e, edit.closed) for edit, e in zip(edits, ids.tolist()) if edit.closed is not None]
+            if closing:
+                closed = closed.copy()
+                for e, value in closing:
+                    closed[e] = value
+
+            scaling = [(e, edit.factor) for edit, e in zip(edits, ids.tolist()) if edit.factor is not None]
+            lowered = False
+            if scaling:
+                factors = factors.copy()
+                for e, value in scaling:
+                    lowered |= value < factors[e]
+                    factors[e] = value
+                base = base if base is not None else weights
+                weights = {name: column * factors for name, column in base.items()}
+
+            published = snap.derive(closed=closed, factors=factors, weights=weights, base=base)
+            if not lowered:
+                published.heuristics.update(snap.heuristics)
+            ids = np.unique(ids)
+            self._publish(published, ids)
+        return ids
+
+    def ingest_speeds(self, u, v, speed_kph):
+        """
+        Publish a traffic snapshot: speeds (km/h) for the edges u → v (OSM id
+        arrays). Edges the snapshot leaves out go back to their mapped speed
+        and every profile that reads speeds is re-evaluated, all vectorized.
+        Returns (ids of the edges whose weights changed, rows matching no edge).
+        """
+        u = np.asarray(u, dtype=np.int64)
+        v = np.asarray(v, dtype=np.int64)
+        speed_kph = np.asarray(speed_kph, dtype=np.float64)
+
+        ui = np.minimum(self.node_index(u), self.num_nodes - 1)
+        vi = np.minimum(self.node_index(v), self.num_nodes - 1)
+        ids = self.edge_ids(ui, vi)
+        valid = (ids >= 0) & (self.node_ids[ui] == u) & (self.node_ids[vi] == v) & (speed_kph > 0)
+        valid &= np.isfinite(speed_kph)
+
+        traffic = np.full(self.num_edges, np.nan)
+        traffic[ids[valid]] = speed_kph[valid]
+
+        with self._writer:
+            snap = self.snapshot
+            weights = dict(snap.weights)
+            base = dict(snap.base) if snap.base is not None else None
+            changed = np.zeros(self.num_edges, dtype=bool)
+            for name, expression in self.expressions.items():
+                if name not in weights or not uses_speed(expression):
+                    continue
+                column = evaluate_profile(expression, self.edge_table, self.num_edges, traffic)
+                changed |= column != snap.unscaled(name)
+                if base is not None:
+                    base[name] = column
+                    column = column * snap.factors
+                weights[name] = column
+
+            changed = np.flatnonzero(changed)
+            self._publish(snap.derive(weights=weights, base=base, traffic=traffic), changed)
+        return changed, int((~valid).sum())
+
+    def _publish(self, snapshot, changed):
+        if len(changed) > self.EDIT_LOG_SHARE * self.num_edges:
+            changed = None
+        self._edit_log.append((snapshot.version, changed))
+        self._live[snapshot.version] = snapshot
+        self.snapshot = snapshot
+
+    def live_versions(self):
+        """Versions of the snapshots still referenced (the latest plus any pinned by searches or views)."""
+        return sorted(self._live.keys())
+
+    def edited_since(self, version: int):
+        """
+        Ids of the edges changed by updates published after `version`, or None
+        when that is further back than the log reaches or takes in an update
+        too large to list.
+        """
+        log = list(self._edit_log)
+        if version >= self.version:
+            return np.empty(0, dtype=np.int64)
+        if not log or log[0][0] > version + 1:
+            return None
+        changed = np.zeros(self.num_edges, dtype=bool)
+        for v, ids in log:
+            if v <= version:
+                continue
+            if ids is None:
+                return None
+            changed[ids] = True
+        return np.flatnonzero(changed)
+
+    def heuristic_scale(self, profile: str = "length", snapshot: WeightSnapshot = None):
+        """
+        (per degree of latitude, per degree of longitude) multipliers turning a
+        coordinate difference into a lower bound on the profile's path weight.
+
+        The scale is the smallest weight per metre of any edge's projected
+        polyline, so by the triangle inequality no path (or part of an edge,
+        for snapped endpoints) can cost less than scale x straight-line metres.
+        """
+        snapshot = snapshot or self.snapshot
+        if profile not in snapshot.heuristics:
+            planar = self.polyline_lengths()
+            positive = planar > 0
+            ratios = snapshot.weights[profile][positive] / planar[positive]
+            scale = float(ratios.min()) if len(ratios) else 0.0
+
+            metres_per_degree = np.radians(1.0) * EARTH_RADIUS_KM * 1000
+            cos_lat0 = LocalProjection(self.coords).cos_lat0
+            snapshot.heuristics[profile] = (float(scale * metres_per_degree), float(scale * metres_per_degree * cos_lat0))
+        return snapshot.heuristics[profile]
+
+    def reverse_csr(self):
+        """(indptr, source ids, edge ids) of the edges into each node, built on first use."""
+        if self._reverse is None:
+            order = np.argsort(self.indices, kind="stable")
+            indptr = np.zeros(self.num_nodes + 1, dtype=np.int64)
+            np.cumsum(np.bincount(self.indices, minlength=self.num_nodes), out=indptr[1:])
+            self._reverse = (indptr, self.node_ids[self.edge_sources[order]], order)
+        return self._reverse
+
+    def polyline_lengths(self):
+        """Length (m) of every edge's geometry in the local projection used for snapping."""
+        if self._polyline_lengths is None:
+            e = self.num_edges
+            projection = LocalProjection(self.coords)
+            counts = np.diff(self.geom_offsets[:e + 1])
+            ends = projection.project(*self.geom_coords[:self.geom_offsets[e]].T)
+            starts = np.empty_like(ends)
+            starts[1:] = ends[:-1]
+            firsts = self.geom_offsets[:e][counts > 0]
+            starts[firsts] = projection.project(*self.coords[self.edge_sources[counts > 0]].T)
+            steps = np.hypot(*(ends - starts).T)
+            self._polyline_lengths = np.bincount(np.repeat(np.arange(e), counts), weights=steps, minlength=e)
+        return self._polyline_lengths
+
+    def edge_weight(self, u, v, profile: str = "length", snapshot: WeightSnapshot = None):
+        """Weight of edge u → v (OSM ids) under a profile; closures are not taken into account."""
+        i, j = self.index_of(u), self.index_of(v)
+        e = int(self.edge_ids([i], [j])[0]) if i >= 0 and j >= 0 else -1
+        if e < 0:
+            raise KeyError(f"No edge {u} → {v}")
+        return float((snapshot or self.snapshot).weights[profile][e])
+
+    @property
+    def num_source_edges(self):
+        """Edges of the graph this was compiled from, parallel edges counted separately."""
+        return len(self.edge_table.edge)
+
+    def fingerprint(self):
+        """Content hash of the topology and lengths, used to key persisted artefacts."""
+        digest = hashlib.sha1()
+        for array in (self.node_ids, self.indptr, self.indices, self.lengths):
+            digest.update(np.ascontiguousarray(array).tobytes())
+        return digest.hexdigest()
+
+    def node_index(self, node_ids):
+        """Map OSM ids to dense indices (vectorized, ids must exist)."""
+        return np.searchsorted(self.node_ids, np.asarray(node_ids, dtype=np.int64))
+
+    def index_of(self, node_id):
+        """Dense index of one OSM id, or -1 if it is not in the graph."""
+        i = int(np.searchsorted(self.node_ids, node_id))
+        if i < self.num_nodes and self.node_ids[i] == node_id:
+            return i
+        return -1
+
+    def edge_ids(self, u_idx, v_idx):
+        """Edge index for each (u, v) index pair, or -1 where there is no edge."""
+        keys = np.asarray(u_idx, dtype=np.int64) * self.num_nodes + np.asarray(v_idx, dtype=np.int64)
+        pos = np.searchsorted(self._edge_keys, keys)
+        pos = np.minimum(pos, max(self.num_edges - 1, 0))
+        found = self._edge_keys[pos] == keys if self.num_edges else np.zeros(len(keys), dtype=bool)
+        return np.where(found, pos, -1)
+
+    def path_length(self, path, profile: str = None, snapshot: WeightSnapshot = None):
+        return float(self.batch_path_lengths([path], profile, snapshot)[0])
+
+    def path_coords(self, path):
+        """(K, 2) lat/lon array of the full path geometry."""
+        return self.batch_path_coords([path])[0]
+
+    def batch_path_lengths(self, paths, profile: str = None, snapshot: WeightSnapshot = None):
+        """Total weight of each path under a profile, or its length in metres (edits ignored) without one."""
+        sizes, _, edges = self._path_steps(paths)
+        weights = self.lengths if profile is None else (snapshot or self.snapshot).weights[profile]
+        step_lengths = np.where(edges >= 0, weights[np.maximum(edges, 0)], 0.0)
+        totals = np.concatenate([[0.0], np.cumsum(step_lengths)])
+        ends = np.cumsum(sizes)
+        return totals[ends] - totals[ends - sizes]
+
+    def batch_path_coords(self, paths):
+        """Coordinates for many paths with one gather; returns a list of (K, 2) arrays."""
+        if len(paths) == 0:
+            return []
+        sizes, idx, edges = self._path_steps(paths)
+
+        # The first node of each path (and any step without an edge) uses its node entry
+        segments = np.where(edges >= 0, edges, self.num_edges + idx)
+        starts = self.geom_offsets[segments]
+        counts = self.geom_offsets[segments + 1] - starts
+
+        # Concatenated ranges [start, start + count) for every segment
+        run_starts = np.cumsum(counts) - counts
+        gather = np.repeat(starts - run_starts, counts) + np.arange(counts.sum())
+        points = self.geom_coords[gather]
+
+        point_ends = np.concatenate([[0], np.cumsum(counts)])[np.cumsum(sizes)]
+        return np.split(points, point_ends[:-1])
+
+    def _path_steps(self, paths):
+        """Flattened node indices of all paths plus the edge id leading into each node (-1 at path starts)."""
+        sizes = np.fromiter((len(p) for p in paths), dtype=np.int64, count=len(paths))
+        flat = [np.asarray(p, dtype=np.int64).ravel() for p in paths]
+        idx = self.node_index(np.concatenate(flat) if flat else np.empty(0, dtype=np.int64))
+
+        edges = np.full(len(idx), -1, dtype=np.int64)
+        if len(idx) > 1:
+            edges[1:] = self.edge_ids(idx[:-1], idx[1:])
+        firsts = (np.cumsum(sizes) - sizes)[sizes > 0]
+        edges[firsts] = -1
+
+        return sizes, idx, edges
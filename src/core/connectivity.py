@@ -0,0 +1,257 @@
+import numpy as np
+
+from core.compiled_graph import CompiledGraph
+
+BITSET_MAX_COMPONENTS = 16384  # full transitive closure up to 32 MB
+GRAIL_TRAVERSALS = 3
+
+
+def component_labels(indptr, indices, n: int):
+    """
+    One pass over CSR arrays: iterative Tarjan for strong components with a
+    union-find on every scanned edge for weak components.
+
+    Returns ((scc int32, count), (wcc int32, count)). Strong components are
+    numbered in the order Tarjan completes them, which is a reverse topological
+    order of the condensation: every edge between two components goes from a
+    higher label to a lower one. Weak component 0 is the largest.
+    """
+    indptr = indptr.tolist()
+    indices = indices.tolist()
+
+    order = [-1] * n
+    low = [0] * n
+    on_stack = [False] * n
+    labels = [-1] * n
+    uf = list(range(n))
+    stack = []
+    counter = 0
+    count = 0
+
+    for root in range(n):
+        if order[root] != -1:
+            continue
+
+        order[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = True
+        work = [(root, indptr[root])]
+
+        while work:
+            v, ptr = work[-1]
+            end = indptr[v + 1]
+
+            while ptr < end:
+                w = indices[ptr]
+                ptr += 1
+
+                # union(v, w) with path halving
+                a, b = v, w
+                while uf[a] != a:
+                    uf[a] = uf[uf[a]]
+                    a = uf[a]
+                while uf[b] != b:
+                    uf[b] = uf[uf[b]]
+                    b = uf[b]
+                if a != b:
+                    if a < b:
+                        uf[b] = a
+                    else:
+                        uf[a] = b
+
+                if order[w] == -1:
+                    work[-1] = (v, ptr)
+                    order[w] = low[w] = counter
+                    counter += 1
+                    stack.append(w)
+                    on_stack[w] = True
+                    work.append((w, indptr[w]))
+                    break
+                if on_stack[w] and order[w] < low[v]:
+                    low[v] = order[w]
+            else:
+                work.pop()
+                if low[v] == order[v]:
+                    while True:
+                        w = stack.pop()
+                        on_stack[w] = False
+                        labels[w] = count
+                        if w == v:
+                            break
+                    count += 1
+                if work:
+                    parent = work[-1][0]
+                    if low[v] < low[parent]:
+                        low[parent] = low[v]
+
+    roots = np.asarray(uf, dtype=np.int64)
+    while True:
+        jumped = roots[roots]
+        if np.array_equal(jumped, roots):
+            break
+        roots = jumped
+
+    unique_roots, inverse, sizes = np.unique(roots, return_inverse=True, return_counts=True)
+    rank = np.empty(len(unique_roots), dtype=np.int64)
+    rank[np.argsort(-sizes, kind="stable")] = np.arange(len(unique_roots))
+
+    scc = (np.asarray(labels, dtype=np.int32), count)
+    wcc = (rank[inverse].astype(np.int32), len(unique_roots))
+    return scc, wcc
+
+
+class ConnectivityIndex:
+    """
+    Strong/weak component labels plus a reachability index over the SCC condensation.
+
+    Small condensations get a full transitive closure as packed bitsets, so
+    reaches() is one array lookup. Larger ones use GRAIL interval labels
+    (several random DFS post-order intervals per component) that answer most
+    negative queries outright and prune the DFS for the rest.
+    """
+
+    def __init__(self, compiled: CompiledGraph, scc=None, wcc=None):
+        if scc is None or wcc is None:
+            scc, wcc = component_labels(compiled.indptr, compiled.indices, compiled.num_nodes)
+
+        self.compiled = compiled
+        self.scc, self.num_strong = scc
+        self.wcc, self.num_weak = wcc
+
+        self._build_condensation()
+
+        if self.num_strong <= BITSET_MAX_COMPONENTS:
+            self._build_bitsets()
+        else:
+            self.closure = None
+            self._build_intervals()
+
+    def _build_condensation(self):
+        cu = self.scc[self.compiled.edge_sources].astype(np.int64)
+        cv = self.scc[self.compiled.indices].astype(np.int64)
+        keys = np.unique(cu[cu != cv] * self.num_strong + cv[cu != cv])
+
+        dag_sources = keys // self.num_strong
+        self.dag_indices = (keys % self.num_strong).astype(np.int32)
+        self.dag_indptr = np.zeros(self.num_strong + 1, dtype=np.int64)
+        np.cumsum(np.bincount(dag_sources, minlength=self.num_strong), out=self.dag_indptr[1:])
+
+    def _build_bitsets(self):
+        c = self.num_strong
+        closure = np.zeros((c, (c + 7) // 8), dtype=np.uint8)
+        indptr, indices = self.dag_indptr, self.dag_indices
+
+        # Successors always have smaller labels, so their rows are final already
+        for comp in range(c):
+            row = closure[comp]
+            row[comp >> 3] |= np.uint8(1 << (comp & 7))
+            for succ in indices[indptr[comp]:indptr[comp + 1]]:
+                row |= closure[succ]
+
+        self.closure = closure
+
+    def _build_intervals(self):
+        c = self.num_strong
+        rng = np.random.default_rng(0)
+        indptr = self.dag_indptr
+        dag_sources = np.repeat(np.arange(c), np.diff(indptr))
+
+        self.post = np.empty((GRAIL_TRAVERSALS, c), dtype=np.int32)
+        self.low = np.empty((GRAIL_TRAVERSALS, c), dtype=np.int32)
+
+        for t in range(GRAIL_TRAVERSALS):
+            # Shuffle children within each row and the root order for this traversal
+            children = self.dag_indices[np.lexsort((rng.random(len(self.dag_indices)), dag_sources))].tolist()
+            post = self._post_order(indptr.tolist(), children, rng.permutation(c).tolist())
+
+            low = post.copy()
+            for comp in range(c):
+                succ = self.dag_indices[indptr[comp]:indptr[comp + 1]]
+                if len(succ):
+                    low[comp] = min(low[comp], low[succ].min())
+
+            self.post[t] = post
+            self.low[t] = low
+
+    @staticmethod
+    def _post_order(indptr, children, roots):
+        post = np.empty(len(roots), dtype=np.int32)
+        seen = [False] * len(roots)
+        rank = 0
+
+        for root in roots:
+            if seen[root]:
+                continue
+            seen[root] = True
+            work = [(root, indptr[root])]
+            while work:
+                v, ptr = work[-1]
+                if ptr < indptr[v + 1]:
+                    work[-1] = (v, ptr + 1)
+                    w = children[ptr]
+                    if not seen[w]:
+                        seen[w] = True
+                        work.append((w, indptr[w]))
+                else:
+                    work.pop()
+                    post[v] = rank
+                    rank += 1
+
+        return post
+
+    def _may_reach(self, cs, ct):
+        return bool(np.all(self.low[:, cs] <= self.low[:, ct]) and np.all(self.post[:, ct] <= self.post[:, cs]))
+
+    def component_reaches(self, cs: int, ct: int):
+        if cs == ct:
+            return True
+        if ct > cs:
+            return False  # edges only go from higher to lower labels
+        if self.closure is not None:
+            return bool(self.closure[cs, ct >> 3] >> (ct & 7) & 1)
+        if not self._may_reach(cs, ct):
+            return False
+
+        stack, seen = [cs], {cs}
+        while stack:
+            comp = stack.pop()
+            for succ in self.dag_indices[self.dag_indptr[comp]:self.dag_indptr[comp + 1]].tolist():
+                if succ == ct:
+                    return True
+                if succ not in seen and succ > ct and self._may_reach(succ, ct):
+                    seen.add(succ)
+                    stack.append(succ)
+        return False
+
+    def reaches(self, u_idx: int, v_idx: int):
+        return self.component_reaches(int(self.scc[u_idx]), int(self.scc[v_idx]))
+
+    def reaches_many(self, u_idx, v_idx):
+        """Vectorized reaches() for arrays of node indices."""
+        cs = self.scc[np.asarray(u_idx)].astype(np.int64)
+        ct = self.scc[np.asarray(v_idx)].astype(np.int64)
+        if self.closure is not None:
+            return (cs == ct) | ((self.closure[cs, ct >> 3] >> (ct & 7)) & 1).astype(bool)
+        return np.fromiter((self.component_reaches(a, b) for a, b in zip(cs.tolist(), ct.tolist())), dtype=bool, count=len(cs))
+
+    def same_weak_component(self, u_idx: int, v_idx: int):
+        return self.wcc[u_idx] == self.wcc[v_idx]
+
+    def save_labels(self, path: str, fingerprint: str):
+        np.savez(
+            path, fingerprint=fingerprint, scc=self.scc, wcc=self.wcc,
+            counts=np.array([self.num_strong, self.num_weak]),
+        )
+
+    @staticmethod
+    def load_labels(path: str, fingerprint: str):
+        """Persisted ((scc, count), (wcc, count)) if they match the fingerprint, else None."""
+        try:
+            with np.load(path) as data:
+                if str(data["fingerprint"]) != fingerprint:
+                    return None
+                num_strong, num_weak = data["counts"].tolist()
+                return (data["scc"], num_strong), (data["wcc"], num_weak)
+        except (OSError, KeyError, ValueError):
+            return None
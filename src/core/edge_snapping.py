@@ -0,0 +1,346 @@
+import heapq
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+from core.compiled_graph import CompiledGraph
+from core.spatial_index import LocalProjection, haversine_km
+
+NODE_CAPACITY = 16  # segments per leaf and children per inner node
+
+# Ids for endpoints placed on an edge; OSM node ids are positive
+VIRTUAL_START = -1
+VIRTUAL_GOAL = -2
+
+
+@dataclass
+class EdgeSnap:
+    """
+    A point on edge u → v: `fraction` of the way along its geometry.
+
+    Costs split in proportion, so u → snap costs fraction * length. When the
+    road is two-way, `reverse_length` is the length of v → u.
+    """
+    u: int
+    v: int
+    fraction: float
+    length: float
+    reverse_length: Optional[float]
+    lat: float
+    lon: float
+    distance_km: float
+    geometry: np.ndarray  # (K, 2) lat/lon of u → v
+    cumulative: np.ndarray  # (K,) distance along the geometry to each point, metres
+
+    @property
+    def two_way(self):
+        return self.reverse_length is not None
+
+    def directions(self):
+        """(from, to, fraction from `from`, edge length) for every directed edge through the point."""
+        directions = [(self.u, self.v, self.fraction, self.length)]
+        if self.two_way:
+            directions.append((self.v, self.u, 1.0 - self.fraction, self.reverse_length))
+        return directions
+
+    def nearest_exit(self):
+        """Closest node the snap point can drive to."""
+        return self.u if self.two_way and self.fraction < 0.5 else self.v
+
+    def nearest_entry(self):
+        """Closest node that can drive to the snap point."""
+        return self.v if self.two_way and self.fraction >= 0.5 else self.u
+
+    def partial(self, t_from, t_to):
+        """(K, 2) lat/lon along the geometry between two fractions, in travel order."""
+        total = self.cumulative[-1]
+        lo, hi = sorted((t_from * total, t_to * total))
+        inner = (self.cumulative > lo) & (self.cumulative < hi)
+        points = np.vstack([self._point_at(lo), self.geometry[inner], self._point_at(hi)])
+        return points if t_from <= t_to else points[::-1]
+
+    def _point_at(self, distance):
+        i = int(np.clip(np.searchsorted(self.cumulative, distance, side="right") - 1, 0, len(self.cumulative) - 2))
+        span = self.cumulative[i + 1] - self.cumulative[i]
+        t = (distance - self.cumulative[i]) / span if span > 0 else 0.0
+        return self.geometry[i] + t * (self.geometry[i + 1] - self.geometry[i])
+
+
+class SegmentIndex(LocalProjection):
+    """
+    STR-packed R-tree over the straight segments of every edge geometry.
+
+    Segments are sorted into leaves of NODE_CAPACITY by x-slices then y, and
+    each level above is packed the same way, so the tree is a handful of flat
+    arrays. Two-way roads are indexed once, through their lower-id direction.
+    """
+
+    def __init__(self, compiled: CompiledGraph):
+        super().__init__(compiled.coords)
+        self.compiled = compiled
+
+        e = compiled.num_edges
+        sources = compiled.edge_sources
+        targets = compiled.indices.astype(np.int64)
+        reverse = compiled.edge_ids(targets, sources)
+        keep = (sources != targets) & ((reverse < 0) | (sources < targets))
+
+        # Segment ends are the geometry tails; each starts at the previous point, or the source node
+        counts = np.diff(compiled.geom_offsets[:e + 1])
+        seg_edges = np.repeat(np.arange(e), counts)
+        ends = self.project(*compiled.geom_coords[:compiled.geom_offsets[e]].T)
+        starts = np.empty_like(ends)
+        starts[1:] = ends[:-1]
+        firsts = compiled.geom_offsets[:e][counts > 0]
+        starts[firsts] = self.project(*compiled.coords[sources[counts > 0]].T)
+
+        seg_lengths = np.hypot(*(ends - starts).T)
+        along = np.cumsum(seg_lengths) - seg_lengths
+        along -= np.repeat(along[firsts], counts[counts > 0])
+
+        mask = keep[seg_edges]
+        self.seg_edges = seg_edges[mask]
+        self.seg_starts = starts[mask]
+        self.seg_ends = ends[mask]
+        self.seg_along = along[mask]
+        self.edge_totals = np.bincount(seg_edges, weights=seg_lengths, minlength=e)
+        self.size = len(self.seg_edges)
+
+        self._build_tree()
+
+    def _build_tree(self):
+        lo = np.minimum(self.seg_starts, self.seg_ends)
+        hi = np.maximum(self.seg_starts, self.seg_ends)
+        order = _str_order((lo + hi) / 2)
+
+        self.seg_edges, self.seg_starts, self.seg_ends, self.seg_along = (
+            a[order] for a in (self.seg_edges, self.seg_starts, self.seg_ends, self.seg_along)
+        )
+        lo, hi = lo[order], hi[order]
+
+        # levels[0] are leaves over segments; each level's nodes cover [child_start, child_end) one level down
+        self.levels = []
+        count = self.size
+        while True:
+            child_start = np.arange(0, count, NODE_CAPACITY)
+            child_end = np.minimum(child_start + NODE_CAPACITY, count)
+            box_lo = np.minimum.reduceat(lo, child_start, axis=0) if count else np.empty((0, 2))
+            box_hi = np.maximum.reduceat(hi, child_start, axis=0) if count else np.empty((0, 2))
+
+            if len(child_start) > 1:
+                order = _str_order((box_lo + box_hi) / 2)
+                box_lo, box_hi, child_start, child_end = box_lo[order], box_hi[order], child_start[order], child_end[order]
+
+            self.levels.append((box_lo, box_hi, child_start, child_end))
+            if len(child_start) <= 1:
+                break
+            lo, hi, count = box_lo, box_hi, len(child_start)
+
+    def nearest_segment(self, x, y):
+        """(segment, clamped position along it in [0, 1], squared distance) for a projected point."""
+        p = np.array([x, y])
+        best = (-1, 0.0, np.inf)
+        top = len(self.levels) - 1
+        heap = [(0.0, top, i) for i in range(len(self.levels[top][2]))]
+
+        while heap:
+            d2, level, node = heapq.heappop(heap)
+            if d2 >= best[2]:
+                break
+
+            _, _, child_start, child_end = self.levels[level]
+            start, end = child_start[node], child_end[node]
+
+            if level == 0:
+                t, seg_d2 = self._segment_distances(p, slice(start, end))
+                i = int(seg_d2.argmin())
+                if seg_d2[i] < best[2]:
+                    best = (start + i, float(t[i]), float(seg_d2[i]))
+            else:
+                box_lo, box_hi = self.levels[level - 1][:2]
+                gap = np.maximum(np.maximum(box_lo[start:end] - p, p - box_hi[start:end]), 0.0)
+                child_d2 = (gap * gap).sum(axis=1)
+                for child in np.flatnonzero(child_d2 < best[2]).tolist():
+                    heapq.heappush(heap, (float(child_d2[child]), level - 1, start + child))
+
+        return best
+
+    def segments_near(self, xy, radius):
+        """
+        Every segment within `radius` metres of each projected point (P, 2):
+        (point, segment, clamped position along it, squared distance) arrays.
+        The tree is walked one level at a time for all points together.
+        """
+        xy = np.asarray(xy, dtype=np.float64).reshape(-1, 2)
+        r2 = radius * radius
+        if self.size == 0 or not len(xy):
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0), np.empty(0)
+
+        # (point, node) pairs still in range, starting from the root
+        points = np.arange(len(xy))
+        nodes = np.zeros(len(xy), dtype=np.int64)
+        for level in range(len(self.levels) - 1, -1, -1):
+            _, _, child_start, child_end = self.levels[level]
+            counts = child_end[nodes] - child_start[nodes]
+            points = np.repeat(points, counts)
+            first = np.repeat(np.cumsum(counts) - counts, counts)
+            nodes = np.repeat(child_start[nodes], counts) + np.arange(len(points)) - first
+            if level == 0:
+                break
+
+            box_lo, box_hi = self.levels[level - 1][:2]
+            p = xy[points]
+            gap = np.maximum(np.maximum(box_lo[nodes] - p, p - box_hi[nodes]), 0.0)
+            near = (gap * gap).sum(axis=1) <= r2
+            points, nodes = points[near], nodes[near]
+
+        t, d2 = self._segment_distances(xy[points], nodes)
+        near = d2 <= r2
+        return points[near], nodes[near], t[near], d2[near]
+
+    def _segment_distances(self, p, segments):
+        """(clamped position along, squared distance) from point(s) p to the given segments."""
+        a, b = self.seg_starts[segments], self.seg_ends[segments]
+        ab = b - a
+        denom = (ab * ab).sum(axis=1)
+        t = np.clip(((p - a) * ab).sum(axis=1) / np.where(denom > 0, denom, 1.0), 0.0, 1.0)
+        return t, ((a + t[:, None] * ab - p) ** 2).sum(axis=1)
+
+    def snap(self, lat: float, lon: float):
+        """EdgeSnap for the closest point on any road, or None for an empty graph."""
+        if self.size == 0:
+            return None
+
+        x, y = self.project(lat, lon)[0]
+        seg, t, _ = self.nearest_segment(x, y)
+
+        edge = int(self.seg_edges[seg])
+        point = self.seg_starts[seg] + t * (self.seg_ends[seg] - self.seg_starts[seg])
+        snap_lat, snap_lon = self.unproject(point)[0]
+
+        total = self.edge_totals[edge]
+        seg_length = np.hypot(*(self.seg_ends[seg] - self.seg_starts[seg]))
+        fraction = (self.seg_along[seg] + t * seg_length) / total if total > 0 else 0.0
+
+        c = self.compiled
+        u_idx, v_idx = int(c.edge_sources[edge]), int(c.indices[edge])
+        reverse = int(c.edge_ids([v_idx], [u_idx])[0])
+
+        geometry = np.vstack([c.coords[u_idx], c.geom_coords[c.geom_offsets[edge]:c.geom_offsets[edge + 1]]])
+        steps = np.hypot(*np.diff(self.project(*geometry.T), axis=0).T)
+
+        return EdgeSnap(
+            u=int(c.node_ids[u_idx]),
+            v=int(c.node_ids[v_idx]),
+            fraction=float(min(max(fraction, 0.0), 1.0)),
+            length=float(c.lengths[edge]),
+            reverse_length=float(c.lengths[reverse]) if reverse >= 0 else None,
+            lat=float(snap_lat),
+            lon=float(snap_lon),
+            distance_km=float(haversine_km(lat, lon, snap_lat, snap_lon)),
+            geometry=geometry,
+            cumulative=np.concatenate([[0.0], np.cumsum(steps)]),
+        )
+
+
+def _str_order(centres):
+    """Sort-Tile-Recursive order: vertical slices by x, then y within each slice."""
+    n = len(centres)
+    leaves = -(-n // NODE_CAPACITY)
+    per_slice = int(np.ceil(np.sqrt(leaves))) * NODE_CAPACITY
+    by_x = np.argsort(centres[:, 0], kind="stable")
+    slices = np.empty(n, dtype=np.int64)
+    slices[by_x] = np.arange(n) // per_slice
+    return np.lexsort((centres[:, 1], slices))
+
+
+@contextmanager
+def virtual_nodes(graph, node_coords, snaps):
+    """
+    Temporarily add snapped endpoints ({virtual id: EdgeSnap}) as nodes.
+
+    Each one splits its edge(s) with proportional weights (the graph's profile
+    weight when it has one, else the length); two endpoints on the same edge
+    also get a direct edge. With graph=None only node_coords is touched (the
+    compressed search graph splits its own edges).
+    """
+    snaps = snaps or {}
+    weight = getattr(graph, "edge_weight", None)
+
+    for node, snap in snaps.items():
+        node_coords[node] = (snap.lat, snap.lon)
+
+        if graph is not None:
+            for u, v, t, length in snap.directions():
+                w = weight(u, v) if weight else length
+                if w == float("inf"):
+                    continue  # closed road
+                graph.add_edge(u, node, length=t * w)
+                graph.add_edge(node, v, length=(1.0 - t) * w)
+
+    if graph is not None:
+        for a, snap_a in snaps.items():
+            for b, snap_b in snaps.items():
+                for u, v, t_a, length in snap_a.directions():
+                    for u2, v2, t_b, _ in snap_b.directions():
+                        if a != b and (u, v) == (u2, v2) and t_a < t_b:
+                            w = weight(u, v) if weight else length
+                            if w != float("inf"):
+                                graph.add_edge(a, b, length=(t_b - t_a) * w)
+
+    try:
+        yield
+    finally:
+        for node in snaps:
+            node_coords.pop(node, None)
+        if graph is not None:
+            graph.remove_nodes_from(list(snaps))
+
+
+def snapped_path_parts(compiled: CompiledGraph, path, snaps, profile: str = None, snapshot=None):
+    """
+    Split a path with virtual ends into (head coords, real node path, tail coords, extra weight).
+
+    Head/tail are the partial edge geometries from the snap points to the
+    first/last real node (excluding that node, which the real path starts/ends
+    with); the extra weight of those partial edges is in `profile` units, or
+    metres without one.
+    """
+    snaps = snaps or {}
+
+    def weight(u, v, length):
+        return length if profile is None else compiled.edge_weight(u, v, profile, snapshot)
+
+    head = tail = np.empty((0, 2))
+    extra = 0.0
+
+    if len(path) == 2 and path[0] in snaps and path[1] in snaps:
+        # Straight along one edge: both fractions are measured on the same u → v geometry
+        a, b = snaps[path[0]], snaps[path[1]]
+        if a.fraction <= b.fraction:
+            w = weight(a.u, a.v, a.length)
+        else:
+            w = weight(a.v, a.u, a.reverse_length)
+        return a.partial(a.fraction, b.fraction), [], tail, abs(b.fraction - a.fraction) * w
+
+    if path and path[0] in snaps:
+        snap = snaps[path[0]]
+        nxt = path[1]
+        for u, v, t, length in snap.directions():
+            if v == nxt:
+                extra += (1.0 - t) * weight(u, v, length)
+        head = snap.partial(snap.fraction, 1.0 if nxt == snap.v else 0.0)[:-1]
+        path = path[1:]
+
+    if path and path[-1] in snaps:
+        snap = snaps[path[-1]]
+        prev = path[-2]
+        for u, v, t, length in snap.directions():
+            if u == prev:
+                extra += t * weight(u, v, length)
+        tail = snap.partial(0.0 if prev == snap.u else 1.0, snap.fraction)[1:]
+        path = path[:-1]
+
+    return head, list(path), tail, extra
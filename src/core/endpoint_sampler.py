@@ -0,0 +1,94 @@
+import numpy as np
+
+from core.compiled_graph import CompiledGraph
+from core.connectivity import ConnectivityIndex
+from core.spatial_index import SpatialIndex, haversine_km
+
+
+class EndpointSampler:
+    """
+    Seeded bulk sampling of (start, goal) pairs that are guaranteed routable.
+
+    Pairs are drawn inside one strongly connected component (`component`, an
+    SCC label of the connectivity index; the largest by default), so every
+    pair is mutually reachable without any search. With a distance band, each
+    start gets a goal proposed at a random point of the annulus around it,
+    snapped to the nearest component node through a spatial index; pairs whose
+    snapped straight-line distance leaves the band are redrawn.
+    """
+
+    def __init__(self, compiled: CompiledGraph, connectivity: ConnectivityIndex, component: int = None):
+        self.compiled = compiled
+        self.connectivity = connectivity
+
+        if component is None:
+            sizes = np.bincount(connectivity.scc, minlength=connectivity.num_strong)
+            component = int(sizes.argmax()) if len(sizes) else -1
+        elif not 0 <= component < connectivity.num_strong:
+            raise ValueError(f"No strongly connected component {component} (the graph has {connectivity.num_strong})")
+        self.component = component
+        self.members = np.flatnonzero(connectivity.scc == self.component)
+        self.index = SpatialIndex(compiled.coords[self.members])
+
+    def sample(self, count: int, min_km: float = 0.0, max_km: float = None, seed=None, max_rounds: int = 50):
+        """
+        Returns (start_ids, goal_ids, distances_km) arrays. May return fewer than
+        `count` pairs if the band cannot be satisfied on this graph.
+        """
+        rng = np.random.default_rng(seed)
+        starts, goals = [], []
+        remaining = count
+
+        if len(self.members) < 2:
+            return self._result([], [])
+
+        for _ in range(max_rounds):
+            if remaining <= 0:
+                break
+
+            batch = max(2 * remaining, 16)
+            s = rng.integers(len(self.members), size=batch)
+
+            if max_km is None:
+                g = rng.integers(len(self.members), size=batch)
+            else:
+                g = self._propose_in_band(rng, s, min_km, max_km)
+
+            dist = self._distance_km(s, g)
+            ok = (s != g) & (dist >= min_km)
+            if max_km is not None:
+                ok &= dist <= max_km
+
+            starts.append(s[ok][:remaining])
+            goals.append(g[ok][:remaining])
+            remaining -= len(starts[-1])
+
+        return self._result(starts, goals)
+
+    def sample_one(self, min_km: float = 0.0, max_km: float = None, seed=None):
+        starts, goals, _ = self.sample(1, min_km, max_km, seed)
+        if len(starts) == 0:
+            return None, None
+        return int(starts[0]), int(goals[0])
+
+    def _propose_in_band(self, rng, s, min_km, max_km):
+        # Uniform over the annulus area, then snapped to the closest member node
+        r = np.sqrt(rng.uniform(min_km ** 2, max_km ** 2, size=len(s))) * 1000
+        theta = rng.uniform(0, 2 * np.pi, size=len(s))
+
+        start_xy = self.index.project(self.compiled.coords[self.members[s], 0], self.compiled.coords[self.members[s], 1])
+        targets = self.index.unproject(start_xy + np.column_stack([r * np.cos(theta), r * np.sin(theta)]))
+
+        g, _ = self.index.nearest(targets[:, 0], targets[:, 1])
+        return g
+
+    def _distance_km(self, s, g):
+        a = self.compiled.coords[self.members[s]]
+        b = self.compiled.coords[self.members[g]]
+        return haversine_km(a[:, 0], a[:, 1], b[:, 0], b[:, 1])
+
+    def _result(self, starts, goals):
+        s = np.concatenate(starts) if starts else np.empty(0, dtype=np.int64)
+        g = np.concatenate(goals) if goals else np.empty(0, dtype=np.int64)
+        ids = self.compiled.node_ids
+        return ids[self.members[s]], ids[self.members[g]], self._distance_km(s, g)
@@ -0,0 +1,215 @@
+from core.compiled_graph import CompiledGraph
+from core.weight_profiles import DEFAULT_PROFILE
+
+
+class GraphView:
+    """
+    The part of the networkx MultiDiGraph API that the searches and chain
+    compression use, served by OSM id straight from a CompiledGraph's arrays.
+
+    Nodes are interned once: `index` maps an OSM id to its dense index, and
+    everything else (neighbours, lengths, coordinates) is read from the
+    compiled arrays through memoryviews, which index like lists without
+    copying. Edges added with add_edge (snapped endpoints) live in a small
+    overlay until remove_nodes_from drops them again.
+
+    Searches read the weight column of `profile` from the WeightSnapshot the
+    view was made with, so updates published meanwhile do not reach them;
+    with_profile() gives a view of the latest snapshot (and with its own
+    overlay). Closed edges are left out of every adjacency list.
+    """
+
+    def __init__(self, compiled: CompiledGraph, profile: str = DEFAULT_PROFILE, index=None, snapshot=None):
+        self.compiled = compiled
+        self.profile = profile
+        self.snapshot = snapshot or compiled.snapshot
+        self.index = index if index is not None else dict(zip(compiled.node_ids.tolist(), range(compiled.num_nodes)))
+        self.heuristic_scale = compiled.heuristic_scale(profile, self.snapshot)
+        self.num_closed = self.snapshot.num_closed
+
+        self._ids = memoryview(compiled.node_ids)
+        self._indptr = memoryview(compiled.indptr)
+        self._target_ids = memoryview(compiled.target_ids)
+        self._lengths = memoryview(compiled.lengths)
+        self._weights = memoryview(self.snapshot.weights[profile])
+        self._closed = memoryview(self.snapshot.closed)
+        self._reverse = None
+        self._extra = {}
+
+    def with_profile(self, profile: str = None, snapshot=None):
+        return GraphView(self.compiled, profile or self.profile, self.index, snapshot)
+
+    @property
+    def succ(self):
+        # Built per access: holding bound methods would make a cycle, and keep unused snapshots until a GC pass
+        return _Adjacency(self.neighbors)
+
+    @property
+    def pred(self):
+        return _Adjacency(self.predecessors)
+
+    def __len__(self):
+        return self.compiled.num_nodes
+
+    def __contains__(self, node):
+        return node in self.index or node in self._extra
+
+    def __getitem__(self, node):
+        return self.neighbors(node)
+
+    @property
+    def nodes(self):
+        return self._ids
+
+    def number_of_nodes(self):
+        return self.compiled.num_nodes
+
+    def number_of_edges(self):
+        return self.compiled.num_edges
+
+    def neighbors(self, node):
+        i = self.index.get(node)
+        if i is None:
+            nbrs = []
+        elif self.num_closed:
+            start = self._indptr[i]
+            row = self._target_ids[start:self._indptr[i + 1]].tolist()
+            nbrs = [v for e, v in enumerate(row, start) if not self._closed[e]]
+        else:
+            nbrs = self._target_ids[self._indptr[i]:self._indptr[i + 1]].tolist()
+
+        extra = self._extra.get(node)
+        if extra:
+            nbrs.extend(extra)
+        return nbrs
+
+    def weighted_neighbors(self, node):
+        """[(neighbour, weight)] in one read of the row; see core.utils.weighted_neighbors."""
+        i = self.index.get(node)
+        if i is None:
+            pairs = []
+        else:
+            start, end = self._indptr[i], self._indptr[i + 1]
+            pairs = list(zip(self._target_ids[start:end].tolist(), self._weights[start:end].tolist()))
+            if self.num_closed:
+                pairs = [pair for e, pair in enumerate(pairs, start) if not self._closed[e]]
+
+        extra = self._extra.get(node)
+        if extra:
+            pairs.extend(extra.items())
+        return pairs
+
+    def predecessors(self, node):
+        return [u for u, _ in self.weighted_predecessors(node)]
+
+    def weighted_predecessors(self, node):
+        """[(predecessor, weight)] of the edges into `node`, overlay edges included."""
+        if self._reverse is None:
+            self._reverse = tuple(memoryview(array) for array in self.compiled.reverse_csr())
+
+        indptr, sources, edges = self._reverse
+        i = self.index.get(node)
+        pairs = []
+        if i is not None:
+            start, end = indptr[i], indptr[i + 1]
+            pairs = [
+                (u, self._weights[e])
+                for u, e in zip(sources[start:end].tolist(), edges[start:end].tolist())
+                if not self._closed[e]
+            ]
+        pairs.extend((u, extra[node]) for u, extra in self._extra.items() if node in extra)
+        return pairs
+
+    def get_edge_data(self, u, v):
+        """
+        {0: {"length": metres, "weight": profile weight}} like a MultiDiGraph
+        with parallel edges collapsed, or None. Overlay edges only have a weight.
+        """
+        extra = self._extra.get(u)
+        if extra and v in extra:
+            return {0: {"weight": extra[v]}}
+
+        e = self._edge(u, v)
+        if e is None or self._closed[e]:
+            return None
+        return {0: {"length": self._lengths[e], "weight": self._weights[e]}}
+
+    def edge_weight(self, u, v):
+        """Profile weight of real edge u → v (inf while closed), e.g. to split it at a snapped endpoint."""
+        e = self._edge(u, v)
+        if e is None:
+            raise KeyError(f"No edge {u} → {v}")
+        return float("inf") if self._closed[e] else self._weights[e]
+
+    def _edge(self, u, v):
+        i = self.index.get(u)
+        if i is None:
+            return None
+
+        start = self._indptr[i]
+        row = self._target_ids[start:self._indptr[i + 1]].tolist()
+        return start + row.index(v) if v in row else None
+
+    def add_edge(self, u, v, length):
+        # `length` as in networkx, where the searches read it; here it is the profile weight
+        self._extra.setdefault(u, {})[v] = length
+        self._extra.setdefault(v, {})
+        return 0
+
+    def overlay_edges(self):
+        """(u, v) of every edge added with add_edge."""
+        return [(u, v) for u, extra in self._extra.items() for v in extra]
+
+    def remove_nodes_from(self, nodes):
+        nodes = set(nodes)
+        for node in nodes:
+            self._extra.pop(node, None)
+        for u in list(self._extra):
+            for node in nodes:
+                self._extra[u].pop(node, None)
+            if not self._extra[u]:
+                del self._extra[u]
+
+
+class NodeCoords:
+    """
+    (lat, lon) by OSM id, read from the compiled coordinate array. Snapped
+    endpoints (negative virtual ids) are set here by virtual_nodes for the
+    duration of a search and popped again afterwards.
+    """
+
+    def __init__(self, view: GraphView):
+        self.index = view.index
+        self._flat = memoryview(view.compiled.coords.reshape(-1))
+        self._extra = {}
+
+    def __getitem__(self, node):
+        i = self.index.get(node)
+        if i is None:
+            return self._extra[node]
+        return self._flat[2 * i], self._flat[2 * i + 1]
+
+    def __setitem__(self, node, value):
+        self._extra[node] = value
+
+    def __contains__(self, node):
+        return node in self.index or node in self._extra
+
+    def __len__(self):
+        return len(self.index) + len(self._extra)
+
+    def get(self, node, default=None):
+        return self[node] if node in self else default
+
+    def pop(self, node, default=None):
+        return self._extra.pop(node, default)
+
+
+class _Adjacency:
+    """graph.succ[n] / graph.pred[n] as neighbour lists."""
+
+    def __init__(self, lookup):
+        self._lookup = lookup
+
+    def __getitem__(self, node):
+        return self._lookup(node)
@@ -1,90 +1,397 @@
 import os
 import random
-import osmnx as ox
+import threading
+import time
+import numpy as np
+from core.region_cache import RegionCache, DEFAULT_BUDGET_BYTES
+from core.compiled_graph import CompiledGraph
+from core.graph_view import GraphView, NodeCoords
+from core.chain_compression import ChainCompressedGraph
+from core.connectivity import ConnectivityIndex
+from core.map_diagnostics import compute_graph_stats, load_stats, save_stats
+from core.endpoint_sampler import EndpointSampler
+from core.spatial_index import SpatialIndex, haversine_km
+from core.edge_snapping import SegmentIndex, snapped_path_parts
+from core.weight_profiles import DEFAULT_PROFILE, PROFILES
+from core.road_edits import RoadEdit
+from core.traffic import read_speed_csv
+from core.map_matching import MapMatcher, match_traces
+
+
+class LoadCancelled(Exception):
+    pass
+
 
 class Map:
-    def __init__(self, filename: str = "map_data.graphml"):
+    def __init__(self, cache_budget_bytes: int = DEFAULT_BUDGET_BYTES, network_type: str = "drive", data_dir: str = None):
 
         current_dir = os.path.dirname(os.path.abspath(__file__))
         project_root = os.path.dirname(os.path.dirname(current_dir))
 
-        self.data_dir = os.path.join(project_root, "data")
+        # The region cache lives under data_dir (<project>/data unless given)
+        self.data_dir = data_dir or os.path.join(project_root, "data")
         os.makedirs(self.data_dir, exist_ok=True)
 
-        self.filename = os.path.join(self.data_dir, filename)
+        self.cache = RegionCache(os.path.join(self.data_dir, "regions"), cache_budget_bytes)
+        self.network_type = network_type
+        self.region_key = None
+        self.filename = None
 
         self.graph = None
-        self.node_keys = []
+        self.compiled = None
+        self.search_graph = None
+        self.connectivity = None
+        self.stats = None
+        self.sampler = None
+        self.spatial_index = None
+        self.segment_index = None
+        self.matcher = None
+        self.node_keys = np.empty(0, dtype=np.int64)
         self.node_coords = {}
 
-    def load_map(self, location: str, force_download: bool = False):
+        # Weight profile name -> expression, compiled for every map that is loaded
+        self.profiles = dict(PROFILES)
+
+        # Loads may run on a worker thread; results are swapped in under this lock
+        self.lock = threading.Lock()
+
+    def load_map(self, location: str, force_download: bool = False, progress=None, cancel=None, defer_indexes=False):
+        """
+        Load a region in stages: read, parse, compile, then index and stats.
+
+        `progress(stage, message)` is called as each stage starts and `cancel`
+        (a threading.Event) is checked between them. With defer_indexes the call
+        returns once the map can be shown and clicked; build_indexes() then adds
+        the search graph, connectivity, sampler and stats.
+        """
+        step = _stepper(progress, cancel)
 
         try:
-            if os.path.exists(self.filename) and not force_download:
-                print(f"📂 Loading cached map from: {self.filename}")
-                self.graph = ox.load_graphml(self.filename)
-                status = f"Loaded cached map data from {os.path.basename(self.filename)}"
+            step("read", f"Locating {location}")
+            # osmnx drags in geopandas, shapely and matplotlib; only pay for it once a map is read
+            import osmnx as ox
+            from core.osm_importer import is_osm_file, import_to_cache
+
+            key = self.cache.region_key(location, self.network_type)
+            filename = self.cache.graph_path(key)
+
+            if self.cache.has_graph(key) and not force_download:
+                step("parse", "Parsing cached map")
+                print(f"📂 Loading cached map from: {filename}")
+                graph = ox.load_graphml(filename)
+                self.cache.touch(key)
+                status = f"Loaded cached map data for {location}"
+            elif is_osm_file(location):
+                step("parse", "Importing OSM extract")
+                print(f"📦 Importing local OSM extract: {location}")
+                graph, key = import_to_cache(location, self.cache, location, self.network_type)
+                status = f"Imported and cached map data from {os.path.basename(location)}"
             else:
+                step("read", "Downloading map data")
                 print(f"🌍 Downloading map data for: {location}")
-                self.graph = ox.graph_from_place(location, network_type="drive")
+                graph = ox.graph_from_place(location, network_type=self.network_type)
+
+                step("parse", "Saving map data")
+                print(f"💾 Saving to: {filename}")
+                self.cache.prepare(key)
+                ox.save_graphml(graph, filename)
+                self.cache.register(key, location, self.network_type)
+                status = f"Downloaded and cached map data for {location}"
+
+            self._install_graph(graph, key, filename, step)
+
+        except LoadCancelled:
+            print("⏹ Map loading cancelled")
+            return False, "Loading cancelled"
+        except Exception as e:
+            error_msg = f"Error loading map: {str(e)}"
+            print(f"❌ {error_msg}")
+            return False, error_msg
+
+        if not defer_indexes:
+            success, msg = self.build_indexes(progress, cancel)
+            if not success:
+                return False, msg
+
+        return True, status
+
+    def load_graph(self, graph, name: str = "in-memory graph", progress=None, cancel=None, defer_indexes=False):
+        """
+        Use an already built osmnx-style MultiDiGraph (e.g. a synthetic one) as
+        the map. Nothing is read from or written to the region cache.
+        """
+        step = _stepper(progress, cancel)
+        try:
+            self._install_graph(graph, None, None, step)
+        except LoadCancelled:
+            return False, "Loading cancelled"
+
+        if not defer_indexes:
+            success, msg = self.build_indexes(progress, cancel)
+            if not success:
+                return False, msg
+
+        return True, f"Loaded {name}"
+
+    def _install_graph(self, graph, key, filename, step):
+        # Only the compiled arrays are kept; the networkx graph is dropped once this returns
+        step("compile", "Compiling graph arrays")
+        compiled = CompiledGraph.from_graph(graph)
+        for name, expression in self.profiles.items():
+            if name not in compiled.weights:
+                compiled.add_profile(name, expression)
+        view = GraphView(compiled)
+
+        step("compile", "Building spatial indexes")
+        spatial_index = SpatialIndex(compiled.coords)
+        segment_index = SegmentIndex(compiled)
+
+        with self.lock:
+            step("compile", "Swapping in the new map")
+            self.region_key = key
+            self.filename = filename
+            self.graph = view
+            self.node_keys = compiled.node_ids
+            self.node_coords = NodeCoords(view)
+            self.compiled = compiled
+            self.spatial_index = spatial_index
+            self.segment_index = segment_index
+            self.search_graph = self.connectivity = self.sampler = self.stats = self.matcher = None
+
+        print(f"✅ Map loaded: {compiled.num_nodes} nodes, {compiled.num_edges} edges")
+
+    def build_indexes(self, progress=None, cancel=None):
+        """
+        Chain-compressed search graph, component labels, endpoint sampler and stats.
+        Labels and stats are reused from the region cache when the graph is unchanged
+        (graphs given to load_graph have no region and are never persisted).
+        """
+        step = _stepper(progress, cancel)
+        graph, compiled, region_key = self.graph, self.compiled, self.region_key
+
+        try:
+            step("index", "Compressing degree-2 chains")
+            search_graph = ChainCompressedGraph(graph)
+
+            step("index", "Labelling connected components")
+            persist = region_key is not None
+            fingerprint = compiled.fingerprint()
+            labels_path = self.cache.artefact_path(region_key, "components.npz") if persist else None
+            stats_path = self.cache.artefact_path(region_key, "stats.json") if persist else None
+
+            labels = ConnectivityIndex.load_labels(labels_path, fingerprint) if persist else None
+            if labels is not None:
+                connectivity = ConnectivityIndex(compiled, *labels)
+            else:
+                connectivity = ConnectivityIndex(compiled)
+                if persist:
+                    self._save_artefact(region_key, connectivity.save_labels, labels_path, fingerprint)
 
-                print(f"💾 Saving to: {self.filename}")
-                ox.save_graphml(self.graph, self.filename)
-                status = f"Downloaded and cached map data to data/{os.path.basename(self.filename)}"
+            sampler = EndpointSampler(compiled, connectivity)
 
-            self.node_keys = list(self.graph.nodes)
-            self.node_coords = {
-                n: (data["y"], data["x"]) for n, data in self.graph.nodes(data=True)
-            }
+            step("stats", "Computing graph statistics")
+            stats = load_stats(stats_path, fingerprint) if persist else None
+            if stats is None:
+                stats = compute_graph_stats(connectivity, compiled.num_source_edges)
+                if persist:
+                    self._save_artefact(region_key, save_stats, stats_path, fingerprint, stats)
 
-            print(f"✅ Map loaded: {len(self.node_keys)} nodes, {self.graph.number_of_edges()} edges")
+            with self.lock:
+                step("stats", "Swapping in the indexes")
+                if self.compiled is not compiled:
+                    return False, "Indexing cancelled (a newer map was loaded)"
+                self.search_graph = search_graph
+                self.connectivity = connectivity
+                self.sampler = sampler
+                self.stats = stats
 
-            return True, status
+            if persist:
+                self.cache.refresh_size(region_key)
+            return True, "Indexes ready"
 
+        except LoadCancelled:
+            print("⏹ Indexing cancelled")
+            return False, "Indexing cancelled"
         except Exception as e:
-            error_msg = f"Error loading map: {str(e)}"
+            error_msg = f"Error indexing map: {str(e)}"
             print(f"❌ {error_msg}")
             return False, error_msg
 
+    def _save_artefact(self, region_key, save, *args):
+        # Skipped when the region was evicted while indexing; the indexes are still used, just not persisted
+        try:
+            if self.cache.prepare_artefact(region_key):
+                save(*args)
+        except OSError as e:
+            print(f"⚠️ Could not cache index for {region_key}: {e}")
+
+    def add_profile(self, name: str, expression: str):
+        """
+        Register a weight profile (an expression over length, speed_kph,
+        travel_time and highway) and compile it for the current map.
+        """
+        with self.lock:
+            try:
+                if self.compiled is not None:
+                    self.compiled.add_profile(name, expression)
+                    self._repin()
+            except Exception as e:
+                return False, f"Invalid profile {name}: {e}"
+            self.profiles[name] = expression
+
+        print(f"⚖️ Weight profile added: {name} = {expression}")
+        return True, f"Added profile {name}"
+
+    def apply_edits(self, edits: list[RoadEdit]):
+        """
+        Close/reopen roads or scale their weights on the loaded map, in one
+        batch and without a reload. Searches started afterwards route around
+        the closures; DynamicRoute.repair() updates an existing route.
+        """
+        with self.lock:
+            if self.compiled is None:
+                return False, "No map loaded"
+            try:
+                changed = self.compiled.apply_edits(edits)
+            except (KeyError, ValueError) as e:
+                return False, f"Invalid road edit: {e}"
+            self._repin()
+            closed = self.compiled.num_closed
+
+        print(f"🚧 Applied {len(edits)} road edit(s) to {len(changed)} edge(s), {closed} closed")
+        return True, f"Edited {len(changed)} edge(s) | {closed} closed"
+
+    def ingest_traffic(self, path: str):
+        """
+        Read a traffic snapshot CSV (see core.traffic) and publish its speeds as
+        new weights for every profile that uses speed. Edges it leaves out go
+        back to their mapped speed. Searches already running finish on the
+        weights they started with.
+        """
+        if self.compiled is None:
+            return False, "No map loaded"
+
+        start = time.perf_counter()
+        try:
+            u, v, speeds = read_speed_csv(path)
+        except (OSError, ValueError) as e:
+            return False, f"Invalid traffic snapshot: {e}"
+
+        with self.lock:
+            if self.compiled is None:
+                return False, "No map loaded"
+            changed, unmatched = self.compiled.ingest_speeds(u, v, speeds)
+            self._repin()
+            version = self.compiled.version
+
+        duration = (time.perf_counter() - start) * 1000
+        print(
+            f"🚦 Traffic snapshot v{version}: {len(u) - unmatched:,} edge speed(s), "
+            f"{len(changed):,} weight(s) changed in {duration:.0f} ms"
+        )
+        return True, f"Traffic v{version}: {len(u) - unmatched:,} edge(s) | {unmatched:,} unmatched"
+
+    def _repin(self):
+        # Map.graph follows the latest weight snapshot; older ones live on only in the searches using them
+        self.graph = self.graph.with_profile()
+
+    def clear_edits(self):
+        """Reopen every road and restore all weights."""
+        if self.compiled is None:
+            return False, "No map loaded"
+        return self.apply_edits([RoadEdit(u, v, closed=False, factor=1.0) for u, v, _, _ in self.edited_roads()])
+
+    def edited_roads(self):
+        """(u, v, closed, factor) for every edge that is closed or re-weighted."""
+        c = self.compiled
+        if c is None:
+            return []
+        edges = np.flatnonzero(c.closed | (c.factors != 1.0))
+        return [
+            (int(c.node_ids[c.edge_sources[e]]), int(c.target_ids[e]), bool(c.closed[e]), float(c.factors[e]))
+            for e in edges.tolist()
+        ]
+
     def get_random_endpoints(self):
 
-        start = random.choice(self.node_keys)
-        end = random.choice(self.node_keys)
+        start = int(random.choice(self.node_keys))
+        end = int(random.choice(self.node_keys))
 
         while end == start:
-            end = random.choice(self.node_keys)
+            end = int(random.choice(self.node_keys))
 
         return start, end
 
     def get_node_coords(self, node_id: int):
         return self.node_coords[node_id]
 
-    def get_path_length(self, path: list[int]):
-        total_length = 0
-        for i in range(len(path) - 1):
-            u, v = path[i], path[i + 1]
-            edge_data = self.graph.get_edge_data(u, v)[0]
-            total_length += edge_data.get("length", 0)
-        return total_length
+    def nearest_node(self, lat: float, lon: float):
+        """Closest node to a point as (node_id, distance_km), or (None, inf) without a map."""
+        if self.spatial_index is None or self.spatial_index.size == 0:
+            return None, float("inf")
+        idx, _ = self.spatial_index.nearest(lat, lon)
+        n_lat, n_lon = self.compiled.coords[idx[0]]
+        return int(self.compiled.node_ids[idx[0]]), float(haversine_km(lat, lon, n_lat, n_lon))
+
+    def nearest_nodes(self, lats, lons):
+        """Bulk snap: node id and distance (km) arrays for arrays of points."""
+        idx, _ = self.spatial_index.nearest(lats, lons)
+        coords = self.compiled.coords[idx]
+        return self.compiled.node_ids[idx], haversine_km(lats, lons, coords[:, 0], coords[:, 1])
 
-    def get_path_coords(self, path: list[int]):
+    def k_nearest_nodes(self, lat: float, lon: float, k: int):
+        """The k closest nodes to a point, nearest first, as (node_ids, distances_km)."""
+        idx, _ = self.spatial_index.k_nearest(lat, lon, k)
+        coords = self.compiled.coords[idx]
+        return self.compiled.node_ids[idx], haversine_km(lat, lon, coords[:, 0], coords[:, 1])
+
+    def snap_to_edge(self, lat: float, lon: float):
+        """EdgeSnap for the closest point on any road, or None without a map."""
+        if self.segment_index is None:
+            return None
+        return self.segment_index.snap(lat, lon)
+
+    def get_path_length(self, path: list[int], snaps=None):
+        """Length in metres; `snaps` resolves virtual endpoints placed on edges."""
+        _, nodes, _, extra = snapped_path_parts(self.compiled, path, snaps)
+        return (self.compiled.path_length(nodes) if nodes else 0.0) + extra
+
+    def get_path_weight(self, path: list[int], profile: str = DEFAULT_PROFILE, snaps=None, snapshot=None):
+        """Total weight of a path under a profile (metres for "length", seconds for "travel_time")."""
+        _, nodes, _, extra = snapped_path_parts(self.compiled, path, snaps, profile, snapshot)
+        return (self.compiled.path_length(nodes, profile, snapshot) if nodes else 0.0) + extra
+
+    def match_traces(self, traces, workers: int = None):
+        """
+        Align GPS traces ((P, 2) lat/lon fixes each) to the loaded roads; yields
+        a MatchedTrace per trace, in order (see core.map_matching).
+        """
+        if self.compiled is None:
+            raise RuntimeError("No map loaded")
+        if self.matcher is None or self.matcher.compiled is not self.compiled:
+            self.matcher = MapMatcher(self.compiled, self.segment_index)
+        return match_traces(self.matcher, traces, workers)
+
+    def get_path_coords(self, path: list[int], snaps=None):
         if not path:
             return []
+        head, nodes, tail, _ = snapped_path_parts(self.compiled, path, snaps)
+        middle = self.compiled.path_coords(nodes) if nodes else head[:0]
+        return [tuple(c) for c in np.vstack([head, middle, tail]).tolist()]
 
-        coords = [self.node_coords[path[0]]]
+    def get_paths_lengths(self, paths: list[list[int]]):
+        return self.compiled.batch_path_lengths(paths)
 
-        for i in range(len(path) - 1):
-            u, v = path[i], path[i + 1]
-            edge_data = self.graph.get_edge_data(u, v)
-            if edge_data is None:
-                coords.append(self.node_coords[v])
-                continue
+    def get_paths_coords(self, paths: list[list[int]]):
+        """Coordinate arrays ((K, 2) lat/lon) for a batch of paths."""
+        return self.compiled.batch_path_coords(paths)
 
-            edge_data = edge_data[0]
 
-            if "geometry" in edge_data:
-                curve_points = [(lat, lon) for lon, lat in edge_data["geometry"].coords]
-                coords.extend(curve_points[1:])  # Skip first point (already added)
-            else:
-                coords.append(self.node_coords[v])
-        return coords
+def _stepper(progress, cancel):
+    """step(stage, message): raises LoadCancelled once `cancel` is set, then reports progress."""
+    def step(stage, message):
+        if cancel is not None and cancel.is_set():
+            raise LoadCancelled()
+        if progress is not None:
+            progress(stage, message)
+    return step
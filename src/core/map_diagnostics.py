@@ -1,16 +1,51 @@
-import networkx as nx
-from networkx import MultiDiGraph
+import json
+import numpy as np
+from core.connectivity import ConnectivityIndex
 
+STATS_VERSION = 2  # bumped when a stat changes meaning, so stats persisted before are recomputed
+
+
+def check_connectivity(connectivity: ConnectivityIndex, start: int, goal: int, start_snap=None, goal_snap=None):
+    """
+    (path exists, diagnostic dict) for start → goal. With an EdgeSnap the
+    endpoint is the point on its edge: the start leaves through the heads of
+    its edge's directions and the goal is reached through their tails, or
+    directly when both sit on one directed edge with the goal ahead.
+    """
+    if start_snap is None and goal_snap is None:
+        return _check_nodes(connectivity, start, goal)
+
+    exits = [v for _, v, _, _ in start_snap.directions()] if start_snap else [start]
+    entries = [u for u, _, _, _ in goal_snap.directions()] if goal_snap else [goal]
+
+    checks = [_check_nodes(connectivity, s, g) for s in exits for g in entries]
+    is_connected, result = next((check for check in checks if check[0]), checks[0])
+
+    if not is_connected and start_snap and goal_snap and _ahead_on_edge(start_snap, goal_snap):
+        result["path_exists"] = result["is_connected"] = True
+    return result["is_connected"], result
+
+
+def _ahead_on_edge(start_snap, goal_snap):
+    for u, v, start_fraction, _ in start_snap.directions():
+        for gu, gv, goal_fraction, _ in goal_snap.directions():
+            if (u, v) == (gu, gv) and goal_fraction >= start_fraction:
+                return True
+    return False
+
+
+def _check_nodes(connectivity: ConnectivityIndex, start: int, goal: int):
+    start_idx = connectivity.compiled.index_of(start)
+    goal_idx = connectivity.compiled.index_of(goal)
 
-def check_connectivity(graph: MultiDiGraph, start: int, goal: int):
     result = {
-        "start_exists": start in graph.nodes,
-        "goal_exists": goal in graph.nodes,
+        "start_exists": start_idx >= 0,
+        "goal_exists": goal_idx >= 0,
         "is_connected": False,
-        "is_strongly_connected": False,
+        "is_strongly_connected": connectivity.num_strong == 1,
         "same_component": False,
         "path_exists": False,
-        "components_count": 0,
+        "components_count": connectivity.num_weak,
         "start_component": None,
         "goal_component": None,
     }
@@ -18,70 +53,79 @@ def check_connectivity(graph: MultiDiGraph, start: int, goal: int):
     if not result["start_exists"] or not result["goal_exists"]:
         return False, result
 
-    result["is_strongly_connected"] = nx.is_strongly_connected(graph)
+    result["start_component"] = int(connectivity.wcc[start_idx])
+    result["goal_component"] = int(connectivity.wcc[goal_idx])
+    result["same_component"] = (result["start_component"] == result["goal_component"])
 
-    weak_components = list(nx.weakly_connected_components(graph))
-    result["components_count"] = len(weak_components)
+    result["path_exists"] = connectivity.reaches(start_idx, goal_idx)
+    result["is_connected"] = result["path_exists"]
 
-    for i, component in enumerate(weak_components):
-        if start in component:
-            result["start_component"] = i
-        if goal in component:
-            result["goal_component"] = i
+    return result["is_connected"], result
 
-    result["same_component"] = (result["start_component"] == result["goal_component"])
 
-    try:
-        result["path_exists"] = nx.has_path(graph, start, goal)
-        result["is_connected"] = result["path_exists"]
-    except:
-        result["path_exists"] = False
-        result["is_connected"] = False
+def compute_graph_stats(connectivity: ConnectivityIndex, num_edges: int):
+    """
+    All graph statistics from the precomputed component labels and CSR degrees, no traversal.
+    `num_edges` is reported as is: the loaded graph's edge count, parallel edges included.
+    """
+    compiled = connectivity.compiled
+    n = compiled.num_nodes
 
-    return result["is_connected"], result
+    weak_sizes = np.bincount(connectivity.wcc, minlength=connectivity.num_weak)
+    strong_sizes = np.bincount(connectivity.scc, minlength=connectivity.num_strong)
+    largest = int(weak_sizes.max()) if n else 0
 
+    out_degree = np.diff(compiled.indptr)
+    in_degree = np.bincount(compiled.indices, minlength=n)
 
-def get_graph_stats(graph: MultiDiGraph):
     stats = {
-        "nodes": graph.number_of_nodes(),
-        "edges": graph.number_of_edges(),
-        "is_directed": graph.is_directed(),
-        "is_strongly_connected": nx.is_strongly_connected(graph),
-        "weak_components": nx.number_weakly_connected_components(graph),
-        "strong_components": nx.number_strongly_connected_components(graph),
+        "nodes": n,
+        "edges": num_edges,
+        "is_directed": True,
+        "is_strongly_connected": connectivity.num_strong == 1,
+        "weak_components": connectivity.num_weak,
+        "strong_components": connectivity.num_strong,
+        "largest_component_size": largest,
+        "largest_component_pct": (largest / n) * 100 if n else 100.0,
+        "largest_strong_component_size": int(strong_sizes.max()) if n else 0,
+        "out_degree_hist": np.bincount(out_degree).tolist() if n else [],
+        "in_degree_hist": np.bincount(in_degree).tolist() if n else [],
+        "weak_size_dist": _size_distribution(weak_sizes),
+        "strong_size_dist": _size_distribution(strong_sizes),
     }
 
-    if stats["weak_components"] > 1:
-        largest = max(nx.weakly_connected_components(graph), key=len)
-        stats["largest_component_size"] = len(largest)
-        stats["largest_component_pct"] = (len(largest) / stats["nodes"]) * 100
-    else:
-        stats["largest_component_size"] = stats["nodes"]
-        stats["largest_component_pct"] = 100.0
-
     return stats
 
 
-def find_valid_endpoints(graph: MultiDiGraph, max_attempts=100):
-    import random
-
-    strong_components = list(nx.strongly_connected_components(graph))
-    if not strong_components:
-        return None, None, 0
+def load_stats(path: str, fingerprint: str):
+    """Persisted stats for this exact graph, or None."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if data.get("fingerprint") != fingerprint or data.get("version") != STATS_VERSION:
+        return None
+    return data["stats"]
 
-    largest_component = max(strong_components, key=len)
-    component_nodes = list(largest_component)
 
-    if len(component_nodes) < 2:
-        return None, None, 0
+def save_stats(path: str, fingerprint: str, stats):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"fingerprint": fingerprint, "version": STATS_VERSION, "stats": stats}, f)
 
-    for attempt in range(max_attempts):
-        start, goal = random.sample(component_nodes, 2)
 
-        if nx.has_path(graph, start, goal):
-            return start, goal, attempt + 1
+def _size_distribution(sizes):
+    """Component counts per power-of-two size bucket: {"1": .., "2-3": .., "4-7": ..}."""
+    dist = {}
+    if len(sizes) == 0:
+        return dist
 
-    return None, None, max_attempts
+    buckets = np.floor(np.log2(sizes)).astype(np.int64)
+    for b, count in enumerate(np.bincount(buckets).tolist()):
+        if count:
+            lo, hi = 2 ** b, 2 ** (b + 1) - 1
+            dist[str(lo) if lo == hi else f"{lo}-{hi}"] = count
+    return dist
 
 
 def suggest_fixes(diagnostic_result):
@@ -132,6 +176,27 @@ def format_diagnostic_report(stats, diagnostic=None):
     )
     report.append(f"Fully Connected: {'Yes' if stats['is_strongly_connected'] else 'No'}")
 
+    if "out_degree_hist" in stats:
+        report.append("\n📈 DEGREE HISTOGRAM")
+        report.append("=" * 50)
+        report.append(f"{'Degree':<8} {'In':>10} {'Out':>10}")
+        in_hist, out_hist = stats["in_degree_hist"], stats["out_degree_hist"]
+        for degree in range(max(len(in_hist), len(out_hist))):
+            in_count = in_hist[degree] if degree < len(in_hist) else 0
+            out_count = out_hist[degree] if degree < len(out_hist) else 0
+            report.append(f"{degree:<8} {in_count:>10,} {out_count:>10,}")
+
+        report.append("\n🧩 COMPONENT SIZES")
+        report.append("=" * 50)
+        report.append(f"{'Size':<12} {'Weak':>10} {'Strong':>10}")
+        buckets = list(dict.fromkeys(list(stats["strong_size_dist"]) + list(stats["weak_size_dist"])))
+        buckets.sort(key=lambda b: int(b.split("-")[0]))
+        for bucket in buckets:
+            report.append(
+                f"{bucket:<12} {stats['weak_size_dist'].get(bucket, 0):>10,} "
+                f"{stats['strong_size_dist'].get(bucket, 0):>10,}"
+            )
+
     if diagnostic:
         report.append("\n🔍 PATH ANALYSIS")
         report.append("=" * 50)
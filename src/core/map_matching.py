@@ -0,0 +1,366 @@
+import heapq
+import itertools
+import math
+import os
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+
+from core.compiled_graph import CompiledGraph
+from core.edge_snapping import SegmentIndex
+
+GPS_SIGMA_M = 10.0  # standard deviation of the GPS noise
+TRANSITION_BETA_M = 30.0  # typical gap between road and straight-line distance of consecutive fixes
+SEARCH_RADIUS_M = 50.0  # candidate roads are looked for this close to a fix
+MAX_CANDIDATES = 4  # closest roads kept per fix (two states each on two-way roads)
+MAX_DETOUR_M = 300.0  # longest detour over the straight line considered between two fixes
+TREE_CACHE_SIZE = 4096  # shortest-path trees kept per matcher
+BATCH_SIZE = 32  # traces per job sent to a worker process
+CHUNK_ROWS = 200_000  # CSV rows parsed at a time by read_traces_csv
+
+TRACE_COLUMNS = ("trace_id", "lat", "lon")
+TRACE_DTYPE = [("trace_id", "U64"), ("lat", np.float64), ("lon", np.float64)]
+
+
+@dataclass
+class MatchedTrace:
+    """
+    One trace aligned to the roads. `paths` are OSM node paths ready for
+    Map.get_path_coords, one per stretch the matcher could follow without a
+    break; `edges` (P, 2) and `offsets` (P,) give each fix's road u → v and
+    its position along it in metres (-1 / NaN where no road was in range).
+    """
+    paths: list
+    edges: np.ndarray
+    offsets: np.ndarray
+
+    @property
+    def matched(self):
+        return int((self.edges[:, 0] >= 0).sum())
+
+
+class MapMatcher:
+    """
+    Hidden Markov model map matcher (Newson & Krumm) over a CompiledGraph.
+
+    Every GPS fix gets candidate states, positions on the directed edges
+    within `radius_m`, found for a whole trace at once in the SegmentIndex
+    R-tree and scored by their distance to the fix (Gaussian, `sigma_m`).
+    Moving between the candidates of consecutive fixes is scored by how far
+    the road distance strays from the straight line (exponential, `beta_m`).
+    Road distances come from Dijkstra trees grown from each candidate
+    edge's head only as far as the queries need, bounded by the straight
+    line plus `max_detour_m`. The trees stay in an LRU cache, so later fixes
+    and traces over the same roads reuse them. Viterbi picks the likeliest
+    sequence; where no candidate pair connects, the trace breaks into
+    stretches matched separately. Fixes closer than 2 sigma to the previous
+    one take its match, so jitter at a standstill is not read as driving.
+    """
+
+    def __init__(self, compiled: CompiledGraph, segment_index: SegmentIndex = None, sigma_m: float = GPS_SIGMA_M,
+                 beta_m: float = TRANSITION_BETA_M, radius_m: float = SEARCH_RADIUS_M,
+                 max_candidates: int = MAX_CANDIDATES, max_detour_m: float = MAX_DETOUR_M,
+                 cache_size: int = TREE_CACHE_SIZE):
+        self.compiled = compiled
+        self.segment_index = segment_index or SegmentIndex(compiled)
+        self.sigma_m = sigma_m
+        self.beta_m = beta_m
+        self.radius_m = radius_m
+        self.max_candidates = max_candidates
+        self.max_detour_m = max_detour_m
+        self.cache_size = cache_size
+        self._setup()
+
+    def _setup(self):
+        c = self.compiled
+        self._indptr = memoryview(c.indptr)
+        self._targets = memoryview(c.indices)
+        self._lengths = memoryview(c.lengths)
+        self._reverse = c.edge_ids(c.indices, c.edge_sources)
+        self._trees = OrderedDict()  # head node index -> _Tree
+
+    def __getstate__(self):
+        # Sent to worker processes once each; memoryviews and the tree cache are rebuilt there
+        state = self.__dict__.copy()
+        for name in ("_indptr", "_targets", "_lengths", "_reverse", "_trees"):
+            del state[name]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._setup()
+
+    def match(self, trace):
+        """Match one trace, (P, 2) lat/lon fixes in time order."""
+        fixes = np.asarray(trace, dtype=np.float64).reshape(-1, 2)
+        xy = self.segment_index.project(*fixes.T)
+        point, edge, offset, emission = self._candidates(xy)
+        starts = np.searchsorted(point, np.arange(len(fixes) + 1)).tolist()
+        edge, offset, emission = edge.tolist(), offset.tolist(), emission.tolist()
+        x, y = xy[:, 0].tolist(), xy[:, 1].tolist()
+
+        chosen = [-1] * len(fixes)  # state per fix
+        paths, piece, back, followers = [], [], {}, []
+        score, last = None, -1
+        for i in range(len(fixes)):
+            a, b = starts[i], starts[i + 1]
+            if a == b:
+                continue  # no road in range; the fix stays unmatched
+
+            if score is not None:
+                gap = math.hypot(x[i] - x[last], y[i] - y[last])
+                if gap < 2 * self.sigma_m:
+                    followers.append((i, last))
+                    continue
+
+                prev = starts[last]
+                total = score[:, None] + self._transitions(edge, offset, prev, starts[last + 1], a, b, gap)
+                best = total.argmax(axis=0)
+                step = total[best, np.arange(b - a)] + emission[a:b]
+                if np.isneginf(step).all():
+                    paths.append(self._decode(piece, score, back, starts, edge, offset, chosen))
+                    piece, score = [], None
+                else:
+                    back[i] = best.tolist()
+                    score = step
+
+            if score is None:
+                score = np.array(emission[a:b])
+            piece.append(i)
+            last = i
+
+        if piece:
+            paths.append(self._decode(piece, score, back, starts, edge, offset, chosen))
+        for i, leader in followers:
+            chosen[i] = chosen[leader]
+
+        c = self.compiled
+        states = np.array(chosen, dtype=np.int64)
+        matched = states >= 0
+        edges = np.full((len(fixes), 2), -1, dtype=np.int64)
+        offsets = np.full(len(fixes), np.nan)
+        if matched.any():
+            ids = np.array(edge, dtype=np.int64)[states[matched]]
+            edges[matched] = np.column_stack([c.node_ids[c.edge_sources[ids]], c.target_ids[ids]])
+            offsets[matched] = np.array(offset)[states[matched]]
+        return MatchedTrace(paths, edges, offsets)
+
+    def _candidates(self, xy):
+        """(fix, directed edge, offset along it in metres, log emission) per state, grouped by fix."""
+        si, c = self.segment_index, self.compiled
+        points, segments, t, d2 = si.segments_near(xy, self.radius_m)
+        edges = si.seg_edges[segments]
+        seg_lengths = np.hypot(*(si.seg_ends[segments] - si.seg_starts[segments]).T)
+        totals = si.edge_totals[edges]
+        fraction = np.clip((si.seg_along[segments] + t * seg_lengths) / np.where(totals > 0, totals, 1.0), 0.0, 1.0)
+
+        # The closest segment of each edge, then the closest edges of each fix
+        order = np.lexsort((d2, edges, points))
+        points, edges, fraction, d2 = points[order], edges[order], fraction[order], d2[order]
+        first = np.ones(len(points), dtype=bool)
+        first[1:] = (points[1:] != points[:-1]) | (edges[1:] != edges[:-1])
+        points, edges, fraction, d2 = points[first], edges[first], fraction[first], d2[first]
+
+        order = np.lexsort((d2, points))
+        points, edges, fraction, d2 = points[order], edges[order], fraction[order], d2[order]
+        rank = np.arange(len(points)) - np.searchsorted(points, points)
+        keep = rank < self.max_candidates
+        points, edges, fraction, d2 = points[keep], edges[keep], fraction[keep], d2[keep]
+
+        # Two-way roads are indexed through one direction; the other is a state too
+        reverse = self._reverse[edges]
+        two_way = reverse >= 0
+        point = np.concatenate([points, points[two_way]])
+        edge = np.concatenate([edges, reverse[two_way]])
+        offset = np.concatenate([fraction * c.lengths[edges], (1.0 - fraction[two_way]) * c.lengths[reverse[two_way]]])
+        emission = -0.5 * np.concatenate([d2, d2[two_way]]) / (self.sigma_m * self.sigma_m)
+
+        order = np.argsort(point, kind="stable")
+        return point[order], edge[order], offset[order], emission[order]
+
+    def _transitions(self, edge, offset, prev_start, prev_end, start, end, gap):
+        """(previous states, states) log probabilities of driving between two fixes `gap` metres apart."""
+        c = self.compiled
+        sources, indices = c.edge_sources, c.indices
+        tails = [int(sources[edge[j]]) for j in range(start, end)]
+        bound = gap + 2 * self.radius_m + self.max_detour_m
+
+        trans = np.full((prev_end - prev_start, end - start), -np.inf)
+        for row, i in enumerate(range(prev_start, prev_end)):
+            e, o = edge[i], offset[i]
+            settled = self._tree(int(indices[e])).grow(tails, bound, self)
+            rest = self._lengths[e] - o
+            for col, j in enumerate(range(start, end)):
+                if edge[j] == e and offset[j] >= o:
+                    route = offset[j] - o
+                else:
+                    d = settled.get(tails[col])
+                    if d is None:
+                        continue
+                    route = rest + d + offset[j]
+                if route - gap <= self.max_detour_m:
+                    trans[row, col] = -abs(route - gap) / self.beta_m
+        return trans
+
+    def _decode(self, piece, score, back, starts, edge, offset, chosen):
+        """Backtrack one unbroken stretch of fixes, record their states and return its node path."""
+        state = int(np.argmax(score))
+        states = [state]
+        for i in reversed(piece[1:]):
+            state = back[i][state]
+            states.append(state)
+        states.reverse()
+
+        c = self.compiled
+        sources, indices = c.edge_sources, c.indices
+        nodes = []
+        for i, state in zip(piece, states):
+            j = starts[i] + state
+            chosen[i] = j
+            e = edge[j]
+            if not nodes:
+                nodes = [int(sources[e]), int(indices[e])]
+            elif e != prev_edge or offset[j] < prev_offset:
+                head = int(indices[prev_edge])
+                tree = self._tree(head)
+                tree.grow([int(sources[e])], math.inf, self)
+                nodes.extend(tree.path_to(int(sources[e]))[1:])
+                nodes.append(int(indices[e]))
+            prev_edge, prev_offset = e, offset[j]
+        return c.node_ids[nodes].tolist()
+
+    def _tree(self, node):
+        tree = self._trees.get(node)
+        if tree is None:
+            tree = self._trees[node] = _Tree(node)
+            if len(self._trees) > self.cache_size:
+                self._trees.popitem(last=False)
+        else:
+            self._trees.move_to_end(node)
+        return tree
+
+
+class _Tree:
+    """Dijkstra by length from one node, settled lazily: each query grows it only as far as it needs."""
+
+    __slots__ = ("source", "settled", "best", "pred", "heap")
+
+    def __init__(self, source):
+        self.source = source
+        self.settled = {}  # node -> final distance
+        self.best = {source: 0.0}
+        self.pred = {source: -1}
+        self.heap = [(0.0, source)]
+
+    def grow(self, targets, bound, matcher):
+        """Settle nodes until every target is or the next one is further than `bound`; returns `settled`."""
+        settled, best, pred, heap = self.settled, self.best, self.pred, self.heap
+        pending = {t for t in targets if t not in settled}
+        indptr, targets_of, lengths = matcher._indptr, matcher._targets, matcher._lengths
+
+        while pending and heap and heap[0][0] <= bound:
+            d, u = heapq.heappop(heap)
+            if u in settled:
+                continue
+            settled[u] = d
+            pending.discard(u)
+
+            start, end = indptr[u], indptr[u + 1]
+            for v, w in zip(targets_of[start:end].tolist(), lengths[start:end].tolist()):
+                nd = d + w
+                if nd < best.get(v, math.inf):
+                    best[v] = nd
+                    pred[v] = u
+                    heapq.heappush(heap, (nd, v))
+        return settled
+
+    def path_to(self, node):
+        """Dense node indices from the source to a settled node."""
+        path = [node]
+        while path[-1] != self.source:
+            path.append(self.pred[path[-1]])
+        return path[::-1]
+
+
+def match_traces(matcher: MapMatcher, traces, workers: int = None, batch_size: int = BATCH_SIZE):
+    """
+    Match an iterable of traces, yielding a MatchedTrace per trace in order.
+
+    Traces are read lazily and sent in batches to `workers` processes (one
+    per CPU by default), each with its own copy of the matcher and its tree
+    cache. At most two batches per worker are in flight, so an unbounded
+    stream is matched in bounded memory. workers=1 matches in this process.
+    """
+    workers = workers or os.cpu_count() or 1
+    batches = _batched(traces, batch_size)
+    if workers <= 1:
+        for batch in batches:
+            for trace in batch:
+                yield matcher.match(trace)
+        return
+
+    with ProcessPoolExecutor(workers, initializer=_start_worker, initargs=(matcher,)) as pool:
+        pending = deque()
+        for batch in batches:
+            pending.append(pool.submit(_match_batch, batch))
+            if len(pending) >= 2 * workers:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def read_traces_csv(path, chunk_rows: int = CHUNK_ROWS):
+    """
+    Yield (trace id, (P, 2) lat/lon fixes) from a CSV with trace_id, lat and
+    lon columns, a trace's rows consecutive and in time order. The file is
+    parsed by numpy a chunk at a time, so it streams whatever its size.
+    """
+    with open(path, newline="") as f:
+        header = [name.strip() for name in f.readline().split(",")]
+        missing = [name for name in TRACE_COLUMNS if name not in header]
+        if missing:
+            raise ValueError(f"Trace CSV has no {', '.join(missing)} column")
+        columns = [header.index(name) for name in TRACE_COLUMNS]
+
+        trace_id, parts = None, []
+        while True:
+            lines = list(itertools.islice(f, chunk_rows))
+            if not lines:
+                break
+            rows = np.loadtxt(lines, delimiter=",", dtype=TRACE_DTYPE, usecols=columns, ndmin=1)
+            ids = rows["trace_id"]
+            fixes = np.column_stack([rows["lat"], rows["lon"]])
+
+            starts = np.flatnonzero(np.concatenate([[True], ids[1:] != ids[:-1]])).tolist() + [len(rows)]
+            for a, b in zip(starts[:-1], starts[1:]):
+                if ids[a] != trace_id:
+                    if parts:
+                        yield trace_id, np.concatenate(parts)
+                    trace_id, parts = str(ids[a]), []
+                parts.append(fixes[a:b])
+
+        if parts:
+            yield trace_id, np.concatenate(parts)
+
+
+def _batched(items, size):
+    items = iter(items)
+    while True:
+        batch = list(itertools.islice(items, size))
+        if not batch:
+            return
+        yield batch
+
+
+_worker_matcher = None
+
+
+def _start_worker(matcher):
+    global _worker_matcher
+    _worker_matcher = matcher
+
+
+def _match_batch(traces):
+    return [_worker_matcher.match(trace) for trace in traces]
@@ -0,0 +1,223 @@
+import os
+import re
+import xml.etree.ElementTree as ET
+
+import networkx as nx
+import osmnx as ox
+
+# Mirrors osmnx's overpass filter for network_type="drive" (see ox._overpass._get_network_filter).
+# Overpass "!~" is an unanchored regex test, so plain re.search reproduces it exactly.
+DRIVE_EXCLUDE = {
+    "area": re.compile("yes"),
+    "access": re.compile("private"),
+    "highway": re.compile(
+        "abandoned|bridleway|bus_guideway|construction|corridor|cycleway|elevator|"
+        "escalator|footway|no|path|pedestrian|planned|platform|proposed|raceway|razed|"
+        "rest_area|service|services|steps|track"
+    ),
+    "motor_vehicle": re.compile("no"),
+    "motorcar": re.compile("no"),
+    "service": re.compile("alley|driveway|emergency_access|parking|parking_aisle|private"),
+}
+
+# osmnx's oneway semantics (see ox.graph._add_paths)
+ONEWAY_VALUES = {"yes", "true", "1", "-1", "reverse", "T", "F"}
+REVERSED_VALUES = {"-1", "reverse", "T"}
+
+SUPPORTED_EXTENSIONS = (".osm", ".xml", ".osm.pbf", ".pbf")
+
+
+def is_osm_file(path: str):
+    return path.lower().endswith(SUPPORTED_EXTENSIONS) and os.path.isfile(path)
+
+
+def is_drivable_way(tags: dict[str, str]):
+    if "highway" not in tags:
+        return False
+
+    for key, pattern in DRIVE_EXCLUDE.items():
+        value = tags.get(key)
+        if value is not None and pattern.search(value):
+            return False
+
+    return True
+
+
+def import_osm_file(path: str, network_type: str = "drive", simplify: bool = True, retain_all: bool = False):
+    """
+    Build the drivable road graph from a local .osm / .osm.pbf extract.
+
+    Runs two streaming passes over the file: the first keeps only drivable ways
+    (and remembers which node ids they reference), the second reads coordinates
+    for just those nodes. The result is post-processed the same way
+    ox.graph_from_place does (edge lengths, largest component, simplification).
+    """
+    if network_type != "drive":
+        raise ValueError(f"Offline import only supports network_type='drive', got '{network_type}'")
+
+    if path.lower().endswith(".pbf"):
+        ways, needed = _read_ways_pbf(path)
+        nodes = _read_nodes_pbf(path, needed)
+    else:
+        ways, needed = _read_ways_xml(path)
+        nodes = _read_nodes_xml(path, needed)
+
+    print(f"📦 Parsed {len(ways):,} drivable ways, {len(nodes):,} nodes from {os.path.basename(path)}")
+
+    graph = _build_graph(ways, nodes)
+    if graph.number_of_edges() == 0:
+        raise ValueError("No drivable roads found in extract")
+
+    graph = ox.distance.add_edge_lengths(graph)
+
+    if not retain_all:
+        graph = _largest_component(graph)
+
+    if simplify:
+        graph = ox.simplify_graph(graph)
+
+    return graph
+
+
+def import_to_cache(path: str, cache, location: str = None, network_type: str = "drive"):
+    """Import an extract and store it in the region cache as if it had been downloaded."""
+    location = location or os.path.basename(path)
+    graph = import_osm_file(path, network_type)
+
+    key = cache.region_key(location, network_type)
+    filename = cache.graph_path(key)
+
+    print(f"💾 Saving to: {filename}")
+    cache.prepare(key)
+    ox.save_graphml(graph, filename)
+    cache.register(key, location, network_type)
+
+    return graph, key
+
+
+def _largest_component(graph):
+    # ox.truncate.largest_component is osmnx >= 1.9; older releases only have the utils_graph name
+    largest_component = getattr(getattr(ox, "truncate", None), "largest_component", None)
+    if largest_component is None:
+        return ox.utils_graph.get_largest_component(graph, strongly=False)
+    return largest_component(graph, strongly=False)
+
+
+def _way_record(way_id: int, tags: dict[str, str], refs: list[int]):
+    record = {k: v for k, v in tags.items() if k in ox.settings.useful_tags_way}
+    record["osmid"] = way_id
+    record["nodes"] = refs
+    return record
+
+
+def _iter_xml(path: str, tag: str):
+    """Stream top-level OSM elements of one type, discarding everything once handled."""
+    context = ET.iterparse(path, events=("start", "end"))
+    _, root = next(context)
+
+    for event, elem in context:
+        if event != "end" or elem.tag not in ("node", "way", "relation"):
+            continue
+        if elem.tag == tag:
+            yield elem
+        root.clear()
+
+
+def _read_ways_xml(path: str):
+    ways = []
+    needed = set()
+
+    for elem in _iter_xml(path, "way"):
+        tags = {t.get("k"): t.get("v") for t in elem.iter("tag")}
+        if is_drivable_way(tags):
+            refs = [int(nd.get("ref")) for nd in elem.iter("nd")]
+            if len(refs) > 1:
+                ways.append(_way_record(int(elem.get("id")), tags, refs))
+                needed.update(refs)
+
+    return ways, needed
+
+
+def _read_nodes_xml(path: str, needed: set[int]):
+    nodes = {}
+
+    for elem in _iter_xml(path, "node"):
+        node_id = int(elem.get("id"))
+        if node_id in needed:
+            data = {"y": float(elem.get("lat")), "x": float(elem.get("lon"))}
+            for t in elem.iter("tag"):
+                if t.get("k") in ox.settings.useful_tags_node:
+                    data[t.get("k")] = t.get("v")
+            nodes[node_id] = data
+
+    return nodes
+
+
+def _read_ways_pbf(path: str):
+    osmium = _import_osmium()
+    ways = []
+    needed = set()
+
+    class WayHandler(osmium.SimpleHandler):
+        def way(self, w):
+            tags = {t.k: t.v for t in w.tags}
+            if is_drivable_way(tags):
+                refs = [n.ref for n in w.nodes]
+                if len(refs) > 1:
+                    ways.append(_way_record(w.id, tags, refs))
+                    needed.update(refs)
+
+    WayHandler().apply_file(path)
+    return ways, needed
+
+
+def _read_nodes_pbf(path: str, needed: set[int]):
+    osmium = _import_osmium()
+    nodes = {}
+
+    class NodeHandler(osmium.SimpleHandler):
+        def node(self, n):
+            if n.id in needed:
+                data = {"y": n.location.lat, "x": n.location.lon}
+                for t in n.tags:
+                    if t.k in ox.settings.useful_tags_node:
+                        data[t.k] = t.v
+                nodes[n.id] = data
+
+    NodeHandler().apply_file(path)
+    return nodes
+
+
+def _import_osmium():
+    try:
+        import osmium
+    except ImportError as e:
+        raise ImportError("Reading .osm.pbf files requires pyosmium: pip install osmium") from e
+    return osmium
+
+
+def _build_graph(ways: list[dict], nodes: dict[int, dict]):
+    graph = nx.MultiDiGraph(crs=ox.settings.default_crs)
+
+    for way in ways:
+        # Ways clipped at the extract boundary can reference nodes that are not in the file
+        refs = [n for n in way.pop("nodes") if n in nodes]
+        if len(refs) < 2:
+            continue
+
+        is_one_way = way.get("oneway") in ONEWAY_VALUES or way.get("junction") == "roundabout"
+        if is_one_way and way.get("oneway") in REVERSED_VALUES:
+            refs.reverse()
+
+        way["oneway"] = is_one_way
+        edges = list(zip(refs[:-1], refs[1:]))
+
+        for n in refs:
+            if n not in graph:
+                graph.add_node(n, **nodes[n])
+
+        graph.add_edges_from(edges, **way, reversed=False)
+        if not is_one_way:
+            graph.add_edges_from([(v, u) for u, v in edges], **way, reversed=True)
+
+    return graph
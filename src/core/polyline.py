@@ -0,0 +1,90 @@
+import numpy as np
+
+MAX_ZOOM = 22
+TOLERANCE_PX = 0.75  # vertices that move the line by less than this on screen are dropped
+TILE_SIZE = 256
+
+
+def to_mercator_px(coords):
+    """Lat/lon (K, 2) -> Web Mercator pixel coordinates at zoom 0 (same projection as the map tiles)."""
+    coords = np.asarray(coords, dtype=np.float64)
+    lat = np.radians(np.clip(coords[:, 0], -85.0511, 85.0511))
+    x = (coords[:, 1] + 180.0) / 360.0 * TILE_SIZE
+    y = (1.0 - np.log(np.tan(lat) + 1.0 / np.cos(lat)) / np.pi) / 2.0 * TILE_SIZE
+    return np.column_stack([x, y])
+
+
+def douglas_peucker_significance(points):
+    """
+    Douglas-Peucker run to completion, recording for every vertex the tolerance
+    below which it is kept. Simplifying at tolerance t is then `sig > t`.
+    Endpoints get infinity. Significance never exceeds the parent split's, so
+    the levels are nested.
+    """
+    points = np.asarray(points, dtype=np.float64)
+    n = len(points)
+    sig = np.zeros(n, dtype=np.float64)
+    if n == 0:
+        return sig
+    sig[0] = sig[-1] = np.inf
+
+    stack = [(0, n - 1, np.inf)]
+    while stack:
+        first, last, parent_sig = stack.pop()
+        if last - first < 2:
+            continue
+
+        a, b = points[first], points[last]
+        inner = points[first + 1:last]
+        ab = b - a
+        ab_len = np.hypot(ab[0], ab[1])
+        if ab_len == 0:
+            dists = np.hypot(inner[:, 0] - a[0], inner[:, 1] - a[1])
+        else:
+            dists = np.abs(ab[0] * (inner[:, 1] - a[1]) - ab[1] * (inner[:, 0] - a[0])) / ab_len
+
+        k = int(np.argmax(dists))
+        split = first + 1 + k
+        sig[split] = min(dists[k], parent_sig)
+
+        stack.append((first, split, sig[split]))
+        stack.append((split, last, sig[split]))
+
+    return sig
+
+
+class ZoomLevels:
+    """Pre-simplified copies of one polyline, one per map zoom level (0..MAX_ZOOM)."""
+
+    def __init__(self, coords, tolerance_px: float = TOLERANCE_PX, max_zoom: int = MAX_ZOOM):
+        coords = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+        self.full = coords
+        self.px = to_mercator_px(coords)
+        self.significance = douglas_peucker_significance(self.px)
+
+        self.levels = []
+        self.indices = []  # vertex indices of each level, for its zoom-0 pixels
+        last_count, last_level, last_indices = None, None, None
+        for zoom in range(max_zoom + 1):
+            # tolerance in zoom-0 pixels shrinks by 2x per zoom level
+            keep = self.significance > tolerance_px / (2 ** zoom)
+            count = int(keep.sum())
+            if count != last_count:
+                last_level = [tuple(c) for c in coords[keep].tolist()]
+                last_indices = np.flatnonzero(keep)
+                last_count = count
+            self.levels.append(last_level)
+            self.indices.append(last_indices)
+
+    def for_zoom(self, zoom):
+        return self.levels[self._level(zoom)]
+
+    def px_for_zoom(self, zoom):
+        """Zoom-0 Mercator pixels of the level for_zoom(zoom) returns."""
+        return self.px[self.indices[self._level(zoom)]]
+
+    def _level(self, zoom):
+        return min(max(int(round(zoom)), 0), len(self.levels) - 1)
+
+    def sizes(self):
+        return [len(level) for level in self.levels]
@@ -0,0 +1,166 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+
+DEFAULT_BUDGET_BYTES = 2 * 1024 ** 3  # 2 GB
+INDEX_FILENAME = "index.json"
+GRAPH_FILENAME = "graph.graphml"
+
+
+class RegionCache:
+    """
+    Disk cache of downloaded regions, one sub-directory per (location, network type).
+
+    Each region directory holds the graph plus any derived artefacts (stats,
+    indexes, ...). An index file tracks sizes and last-access times so the
+    least recently used regions can be evicted once the budget is exceeded.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int = DEFAULT_BUDGET_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        self.index_path = os.path.join(self.cache_dir, INDEX_FILENAME)
+        self.index = self._load_index()
+
+    @staticmethod
+    def normalize_location(location: str):
+        location = location.strip().lower()
+        location = re.sub(r"\s*,\s*", ", ", location)
+        location = re.sub(r"\s+", " ", location)
+        return location.strip(", ")
+
+    def region_key(self, location: str, network_type: str = "drive"):
+        normalized = self.normalize_location(location)
+        slug = re.sub(r"[^a-z0-9]+", "_", normalized).strip("_")[:48] or "region"
+        digest = hashlib.sha1(f"{normalized}|{network_type}".encode("utf-8")).hexdigest()[:10]
+        return f"{slug}-{network_type}-{digest}"
+
+    def region_dir(self, key: str):
+        return os.path.join(self.cache_dir, key)
+
+    def artefact_path(self, key: str, name: str):
+        """Where a region's artefact lives; see prepare_artefact() before writing it."""
+        return os.path.join(self.region_dir(key), name)
+
+    def prepare(self, key: str):
+        """Create a new region's directory so its graph can be written before register()."""
+        os.makedirs(self.region_dir(key), exist_ok=True)
+
+    def prepare_artefact(self, key: str):
+        """
+        Create a registered region's directory for a derived artefact. Returns
+        False, creating nothing, once the region was evicted: a directory
+        outside the index would never be measured or evicted again.
+        """
+        if key not in self.index:
+            return False
+        os.makedirs(self.region_dir(key), exist_ok=True)
+        return True
+
+    def graph_path(self, key: str):
+        return self.artefact_path(key, GRAPH_FILENAME)
+
+    def has_graph(self, key: str):
+        return key in self.index and os.path.exists(self.graph_path(key))
+
+    def touch(self, key: str):
+        entry = self.index.get(key)
+        if entry is None:
+            return
+        entry["last_access"] = time.time()
+        self._save_index()
+
+    def register(self, key: str, location: str, network_type: str = "drive"):
+        """Record (or refresh) a region after its files were written, then enforce the budget."""
+        now = time.time()
+        entry = self.index.setdefault(key, {"created": now})
+        entry["location"] = self.normalize_location(location)
+        entry["network_type"] = network_type
+        entry["last_access"] = now
+        entry["size_bytes"] = self._dir_size(self.region_dir(key))
+
+        evicted = self.evict(protect=key)
+        self._save_index()
+        return evicted
+
+    def refresh_size(self, key: str):
+        """Re-measure a region after derived artefacts were added to it."""
+        entry = self.index.get(key)
+        if entry is None:
+            return []
+        entry["size_bytes"] = self._dir_size(self.region_dir(key))
+        evicted = self.evict(protect=key)
+        self._save_index()
+        return evicted
+
+    def evict(self, protect: str = None):
+        evicted = []
+        by_age = sorted(self.index, key=lambda k: self.index[k].get("last_access", 0))
+
+        for key in by_age:
+            if self.total_size() <= self.max_bytes:
+                break
+            if key == protect:
+                continue
+            print(f"🧹 Evicting cached region: {self.index[key].get('location', key)}")
+            self.remove(key, save=False)
+            evicted.append(key)
+
+        return evicted
+
+    def remove(self, key: str, save: bool = True):
+        shutil.rmtree(self.region_dir(key), ignore_errors=True)
+        self.index.pop(key, None)
+        if save:
+            self._save_index()
+
+    def total_size(self):
+        return sum(entry.get("size_bytes", 0) for entry in self.index.values())
+
+    def regions(self):
+        return dict(self.index)
+
+    def _load_index(self):
+        if not os.path.exists(self.index_path):
+            return {}
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                index = json.load(f).get("regions", {})
+        except (OSError, ValueError):
+            print("⚠️ Region cache index unreadable, starting fresh")
+            return {}
+
+        # Drop entries whose files were removed by hand
+        return {k: v for k, v in index.items() if os.path.isdir(self.region_dir(k))}
+
+    def _save_index(self):
+        # Copied first since other threads may still edit it; a private temp file per
+        # write, so overlapping saves never clobber each other's
+        regions = {key: dict(entry) for key, entry in dict(self.index).items()}
+        with tempfile.NamedTemporaryFile(
+            "w", encoding="utf-8", dir=self.cache_dir, prefix=INDEX_FILENAME, suffix=".tmp", delete=False
+        ) as f:
+            try:
+                json.dump({"regions": regions}, f, indent=2)
+            except BaseException:
+                f.close()
+                os.remove(f.name)
+                raise
+        os.replace(f.name, self.index_path)
+
+    @staticmethod
+    def _dir_size(path: str):
+        total = 0
+        for dirpath, _, filenames in os.walk(path):
+            for filename in filenames:
+                try:
+                    total += os.path.getsize(os.path.join(dirpath, filename))
+                except OSError:
+                    pass
+        return total
@@ -0,0 +1,25 @@
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass
+class RoadEdit:
+    """
+    A live change to directed edge u → v (OSM ids).
+
+    `closed` closes (True) or reopens (False) the edge; `factor` scales its
+    weight under every profile relative to the loaded map, so 1.0 restores
+    it. None leaves that part unchanged.
+    """
+    u: int
+    v: int
+    closed: Optional[bool] = None
+    factor: Optional[float] = None
+
+
+def road_edits(u, v, two_way=True, closed=None, factor=None):
+    """Edits for the road u → v, plus v → u when it is two-way."""
+    edits = [RoadEdit(u, v, closed, factor)]
+    if two_way:
+        edits.append(RoadEdit(v, u, closed, factor))
+    return edits
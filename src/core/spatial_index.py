@@ -0,0 +1,191 @@
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0
+POINTS_PER_CELL = 4
+BRUTE_FORCE_BLOCK = 4_000_000  # distances computed at once by the full-scan fallback
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Vectorized great-circle distance in km."""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(a, dtype=np.float64)) for a in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class LocalProjection:
+    """Equirectangular projection to metres around the centroid of a point set; accurate at city scale."""
+
+    def __init__(self, coords):
+        coords = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+        self.lat0 = float(coords[:, 0].mean()) if len(coords) else 0.0
+        self.lon0 = float(coords[:, 1].mean()) if len(coords) else 0.0
+        self.cos_lat0 = np.cos(np.radians(self.lat0))
+
+    def project(self, lat, lon):
+        lat = np.asarray(lat, dtype=np.float64)
+        lon = np.asarray(lon, dtype=np.float64)
+        x = np.radians(lon - self.lon0) * EARTH_RADIUS_KM * 1000 * self.cos_lat0
+        y = np.radians(lat - self.lat0) * EARTH_RADIUS_KM * 1000
+        return np.column_stack([np.atleast_1d(x), np.atleast_1d(y)])
+
+    def unproject(self, xy):
+        xy = np.asarray(xy, dtype=np.float64).reshape(-1, 2)
+        lat = self.lat0 + np.degrees(xy[:, 1] / (EARTH_RADIUS_KM * 1000))
+        lon = self.lon0 + np.degrees(xy[:, 0] / (EARTH_RADIUS_KM * 1000 * self.cos_lat0))
+        return np.column_stack([lat, lon])
+
+
+class SpatialIndex(LocalProjection):
+    """
+    Uniform grid hash over points projected to local metres.
+
+    Points are sorted by cell id, so each occupied cell is a contiguous range;
+    only occupied cells are stored, which keeps country-scale extents cheap.
+    Queries search rings of cells outward until no closer point can exist.
+    """
+
+    def __init__(self, coords):
+        super().__init__(coords)
+        coords = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+        self.coords = coords
+        self.size = len(coords)
+
+        xy = self.project(coords[:, 0], coords[:, 1])
+        self.origin = xy.min(axis=0) if self.size else np.zeros(2)
+        extent = (xy.max(axis=0) - self.origin) if self.size else np.ones(2)
+
+        area = max(float(extent[0] * extent[1]), 1.0)
+        self.cell_size = max(np.sqrt(area * POINTS_PER_CELL / max(self.size, 1)), 1.0)
+        self.grid_shape = (np.floor(extent / self.cell_size).astype(np.int64) + 1)
+
+        cells = self._cells(xy)
+        keys = self._keys(cells[:, 0], cells[:, 1])
+        self.order = np.argsort(keys, kind="stable")
+        self.xy = xy[self.order]
+        self.px, self.py = self.xy[:, 0].copy(), self.xy[:, 1].copy()  # separate columns gather much faster
+        self.cell_keys, self.cell_starts, counts = np.unique(keys[self.order], return_index=True, return_counts=True)
+        self.cell_ends = self.cell_starts + counts
+
+    def _cells(self, xy):
+        return np.floor((xy - self.origin) / self.cell_size).astype(np.int64)
+
+    def _keys(self, cx, cy):
+        return cy * self.grid_shape[0] + cx
+
+    def nearest(self, lat, lon):
+        """
+        Bulk nearest-point query. Returns (indices into the indexed points, distances in metres)
+        as arrays; a scalar lat/lon gives length-1 arrays.
+        """
+        qxy = self.project(lat, lon)
+        q = len(qxy)
+        best_d2 = np.full(q, np.inf)
+        best_i = np.full(q, -1, dtype=np.int64)
+        if self.size == 0:
+            return best_i, np.sqrt(best_d2)
+
+        # A query outside the grid starts from the nearest edge cell; points beyond ring r are still > r cells away
+        qcells = np.clip(self._cells(qxy), 0, self.grid_shape - 1)
+        qx, qy = qxy[:, 0].copy(), qxy[:, 1].copy()
+        active = np.arange(q)
+
+        for ring in range(self._max_ring() + 1):
+            if len(active) == 0:
+                break
+
+            query_ids, point_ids = self._ring_candidates(active, qcells[active], ring)
+            if len(point_ids):
+                dx = self.px[point_ids] - qx[query_ids]
+                dy = self.py[point_ids] - qy[query_ids]
+                d2 = dx * dx + dy * dy
+                # Candidates come grouped by query, so per-query minima are a segmented reduce
+                group_starts = np.flatnonzero(np.r_[True, query_ids[1:] != query_ids[:-1]])
+                group_sizes = np.diff(np.r_[group_starts, len(d2)])
+                group_min = np.minimum.reduceat(d2, group_starts)
+                is_min = np.flatnonzero(d2 == np.repeat(group_min, group_sizes))
+                first = np.r_[True, query_ids[is_min][1:] != query_ids[is_min][:-1]]
+                winners = is_min[first]
+                qw = query_ids[winners]
+                better = d2[winners] < best_d2[qw]
+                best_d2[qw[better]] = d2[winners][better]
+                best_i[qw[better]] = point_ids[winners][better]
+
+            # Anything outside rings 0..ring is at least ring * cell_size away
+            bound = ring * self.cell_size
+            active = active[best_d2[active] > bound * bound]
+
+        # Queries still unresolved (typically far outside the indexed extent) get a full scan
+        if len(active):
+            rows = max(BRUTE_FORCE_BLOCK // self.size, 1)
+            for lo in range(0, len(active), rows):
+                block = active[lo:lo + rows]
+                d2 = ((qxy[block, None, :] - self.xy[None, :, :]) ** 2).sum(axis=2)
+                best_i[block] = d2.argmin(axis=1)
+                best_d2[block] = d2[np.arange(len(block)), best_i[block]]
+
+        return self.order[best_i], np.sqrt(best_d2)
+
+    def k_nearest(self, lat: float, lon: float, k: int):
+        """The k closest points to one location, nearest first, as (indices, distances in metres)."""
+        k = min(k, self.size)
+        if k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+
+        qxy = self.project(lat, lon)
+        qcell = np.clip(self._cells(qxy), 0, self.grid_shape - 1)
+        owner = np.zeros(1, dtype=np.int64)
+        found = []
+        candidates = np.arange(self.size)
+
+        for ring in range(self._max_ring() + 1):
+            found.append(self._ring_candidates(owner, qcell, ring)[1])
+            ids = np.concatenate(found)
+            if len(ids) < k:
+                continue
+            d2 = ((self.xy[ids] - qxy[0]) ** 2).sum(axis=1)
+            bound = ring * self.cell_size
+            if np.partition(d2, k - 1)[k - 1] <= bound * bound:
+                candidates = ids
+                break
+
+        d2 = ((self.xy[candidates] - qxy[0]) ** 2).sum(axis=1)
+        top = np.argpartition(d2, k - 1)[:k] if k < len(d2) else np.arange(len(d2))
+        top = top[np.argsort(d2[top], kind="stable")]
+        return self.order[candidates[top]], np.sqrt(d2[top])
+
+    def _max_ring(self):
+        # Past this ring a full scan is cheaper than walking mostly empty cells
+        return min(int(self.grid_shape.max()), int(np.sqrt(self.size) / 8) + 2)
+
+    def _ring_candidates(self, query_ids, qcells, ring):
+        """All (query, point) pairs for points in cells at Chebyshev distance `ring` from each query cell."""
+        offsets = _ring_offsets(ring)
+        cx = (qcells[:, 0:1] + offsets[:, 0]).ravel()
+        cy = (qcells[:, 1:2] + offsets[:, 1]).ravel()
+        owners = np.repeat(query_ids, len(offsets))
+
+        inside = (cx >= 0) & (cy >= 0) & (cx < self.grid_shape[0]) & (cy < self.grid_shape[1])
+        keys = self._keys(cx[inside], cy[inside])
+        owners = owners[inside]
+
+        pos = np.searchsorted(self.cell_keys, keys)
+        pos = np.minimum(pos, len(self.cell_keys) - 1)
+        hit = self.cell_keys[pos] == keys
+        starts = self.cell_starts[pos[hit]]
+        counts = self.cell_ends[pos[hit]] - starts
+
+        run_starts = np.cumsum(counts) - counts
+        point_ids = np.repeat(starts - run_starts, counts) + np.arange(counts.sum())
+        return np.repeat(owners[hit], counts), point_ids
+
+
+def _ring_offsets(ring):
+    if ring == 0:
+        return np.zeros((1, 2), dtype=np.int64)
+    side = np.arange(-ring, ring + 1)
+    top = np.column_stack([side, np.full(len(side), -ring)])
+    bottom = np.column_stack([side, np.full(len(side), ring)])
+    inner = np.arange(-ring + 1, ring)
+    left = np.column_stack([np.full(len(inner), -ring), inner])
+    right = np.column_stack([np.full(len(inner), ring), inner])
+    return np.concatenate([top, bottom, left, right])
@@ -0,0 +1,252 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+from core.compiled_graph import CompiledGraph
+from core.spatial_index import EARTH_RADIUS_KM
+from core.weight_profiles import HIGHWAY_SPEEDS_KPH, EdgeTable
+
+DEFAULT_CENTER = (30.0444, 31.2357)  # lat/lon the network is laid out around
+BEND_OFFSET = 0.15  # bend points sit up to this fraction of the edge length off the straight line
+
+
+@dataclass
+class RoadNetwork:
+    """
+    A generated road network as flat arrays, convertible to a CompiledGraph
+    directly (any size) or to an osmnx-style MultiDiGraph (to_graph).
+
+    Edges are directed and unique per (u, v), with u/v as dense indices into
+    node_ids. Edge e's interior bend points are geom_coords[geom_offsets[e]:
+    geom_offsets[e + 1]] in travel order; lengths follow the bent geometry.
+    """
+    node_ids: np.ndarray     # int64 (N,), sorted, OSM-like (non-contiguous)
+    coords: np.ndarray       # float64 (N, 2) lat/lon
+    u: np.ndarray            # int64 (E,)
+    v: np.ndarray            # int64 (E,)
+    lengths: np.ndarray      # float64 (E,) metres
+    oneway: np.ndarray       # bool (E,)
+    arterial: np.ndarray     # bool (E,)
+    geom_offsets: np.ndarray  # int64 (E + 1,)
+    geom_coords: np.ndarray  # float64 (P, 2) lat/lon
+
+    @property
+    def num_nodes(self):
+        return len(self.node_ids)
+
+    @property
+    def num_edges(self):
+        return len(self.u)
+
+    def to_compiled(self):
+        """CompiledGraph without going through networkx."""
+        n, e = self.num_nodes, self.num_edges
+        order = np.lexsort((self.v, self.u))
+        u, v = self.u[order], self.v[order]
+
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(u, minlength=n), out=indptr[1:])
+
+        # Tails: the edge's bend points, then its target node; then one entry per node
+        counts = np.diff(self.geom_offsets)[order]
+        tail_counts = np.concatenate([counts + 1, np.ones(n, dtype=np.int64)])
+        geom_offsets = np.zeros(e + n + 1, dtype=np.int64)
+        np.cumsum(tail_counts, out=geom_offsets[1:])
+
+        geom_coords = np.empty((geom_offsets[-1], 2), dtype=np.float64)
+        starts = self.geom_offsets[order]
+        within = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        geom_coords[np.repeat(geom_offsets[:e], counts) + within] = self.geom_coords[np.repeat(starts, counts) + within]
+        geom_coords[geom_offsets[1:e + 1] - 1] = self.coords[v]
+        geom_coords[geom_offsets[e]:] = self.coords
+
+        # Same tags as to_graph: arterials are primary roads, the rest residential
+        arterial = self.arterial[order]
+        edge_table = EdgeTable(
+            edge=np.arange(e, dtype=np.int64),
+            length=self.lengths[order],
+            speed_kph=np.where(arterial, HIGHWAY_SPEEDS_KPH["primary"], HIGHWAY_SPEEDS_KPH["residential"]).astype(np.float64),
+            highway=arterial.astype(np.int16),
+            highway_names=["residential", "primary"],
+        )
+
+        return CompiledGraph(
+            self.node_ids, self.coords, indptr, v.astype(np.int32), self.lengths[order], geom_offsets, geom_coords,
+            edge_table,
+        )
+
+    def to_graph(self):
+        """
+        osmnx-compatible MultiDiGraph: nodes carry y/x, edges osmid, length,
+        highway, oneway and a shapely geometry when the edge bends. Building
+        it costs a few KB per edge, so keep to_compiled() for the largest sizes.
+        """
+        from networkx import MultiDiGraph
+        from shapely.geometry import LineString
+
+        graph = MultiDiGraph(crs="epsg:4326")
+        ids = self.node_ids.tolist()
+        degree = np.bincount(np.concatenate([self.u, self.v]), minlength=self.num_nodes).tolist()
+        graph.add_nodes_from(
+            (node, {"y": lat, "x": lon, "street_count": count})
+            for node, (lat, lon), count in zip(ids, self.coords.tolist(), degree)
+        )
+
+        lat_lon = self.coords
+        offsets = self.geom_offsets.tolist()
+
+        def edges():
+            for e, (u, v, length, oneway, arterial) in enumerate(zip(
+                self.u.tolist(), self.v.tolist(), self.lengths.tolist(), self.oneway.tolist(), self.arterial.tolist()
+            )):
+                data = {
+                    "osmid": e + 1,
+                    "length": length,
+                    "highway": "primary" if arterial else "residential",
+                    "oneway": oneway,
+                }
+                if offsets[e + 1] > offsets[e]:
+                    points = np.vstack([lat_lon[u], self.geom_coords[offsets[e]:offsets[e + 1]], lat_lon[v]])
+                    data["geometry"] = LineString(points[:, ::-1])
+                yield ids[u], ids[v], 0, data
+
+        graph.add_edges_from(edges())
+        return graph
+
+
+def generate_road_network(nodes: int = 10_000, seed=None, oneway_share: float = 0.2, arterials: int = 8,
+                          spacing_m: float = 120.0, jitter: float = 0.25, bend_share: float = 0.3,
+                          drop_share: float = 0.05, center=DEFAULT_CENTER):
+    """
+    A road-like network of about `nodes` junctions: a jittered street grid
+    with `drop_share` of its blocks merged (missing streets), `arterials`
+    two-way radial roads from the centre cutting across it, `oneway_share`
+    of the streets one-way in a random direction, and `bend_share` of the
+    streets bent through one or two extra geometry points. Fully vectorized;
+    10M nodes take seconds.
+    """
+    rng = np.random.default_rng(seed)
+    side = max(int(np.ceil(np.sqrt(nodes))), 2)
+    n = side * side
+
+    rows, cols = np.divmod(np.arange(n), side)
+    xy = (np.column_stack([cols, rows]) - (side - 1) / 2) * spacing_m
+    xy += rng.uniform(-jitter, jitter, size=(n, 2)) * spacing_m
+
+    # Grid streets: right and down neighbours, minus dropped ones
+    grid = np.arange(n).reshape(side, side)
+    a = np.concatenate([grid[:, :-1].ravel(), grid[:-1, :].ravel()])
+    b = np.concatenate([grid[:, 1:].ravel(), grid[1:, :].ravel()])
+    keep = rng.random(len(a)) >= drop_share
+    a, b = a[keep], b[keep]
+    is_arterial = np.zeros(len(a), dtype=bool)
+
+    if arterials > 0:
+        art_a, art_b = _radial_arterials(side, arterials, rng)
+        a = np.concatenate([a, art_a])
+        b = np.concatenate([b, art_b])
+        is_arterial = np.concatenate([is_arterial, np.ones(len(art_a), dtype=bool)])
+
+        # An arterial step between grid neighbours is the same street; keep one, as arterial
+        lo, hi = np.minimum(a, b), np.maximum(a, b)
+        order = np.lexsort((~is_arterial, hi, lo))
+        first = np.r_[True, (lo[order][1:] != lo[order][:-1]) | (hi[order][1:] != hi[order][:-1])]
+        unique = order[first]
+        a, b, is_arterial = a[unique], b[unique], is_arterial[unique]
+
+    # Bends, in the a → b direction
+    bent = rng.random(len(a)) < bend_share
+    bend_counts = np.where(bent, rng.integers(1, 3, size=len(a)), 0)
+    bend_xy, bend_offsets = _bends(xy, a, b, bend_counts, rng)
+    street_lengths = _polyline_lengths(xy, a, b, bend_xy, bend_offsets)
+
+    # Directions: one-way streets keep a random one, two-way get both
+    oneway = (rng.random(len(a)) < oneway_share) & ~is_arterial
+    flip = oneway & (rng.random(len(a)) < 0.5)
+    forward = ~flip
+    backward = ~oneway | flip
+
+    street = np.concatenate([np.flatnonzero(forward), np.flatnonzero(backward)])
+    reverse = np.concatenate([np.zeros(forward.sum(), dtype=bool), np.ones(backward.sum(), dtype=bool)])
+    u = np.where(reverse, b[street], a[street])
+    v = np.where(reverse, a[street], b[street])
+
+    counts = bend_counts[street]
+    geom_offsets = np.zeros(len(street) + 1, dtype=np.int64)
+    np.cumsum(counts, out=geom_offsets[1:])
+    within = np.arange(counts.sum()) - np.repeat(geom_offsets[:-1], counts)
+    run = np.repeat(counts, counts)
+    source = np.repeat(bend_offsets[street], counts) + np.where(np.repeat(reverse, counts), run - 1 - within, within)
+
+    lat0, lon0 = center
+    node_ids = 100_000_000 + np.cumsum(rng.integers(1, 40, size=n, dtype=np.int64))
+
+    return RoadNetwork(
+        node_ids=node_ids,
+        coords=_to_lat_lon(xy, lat0, lon0),
+        u=u.astype(np.int64),
+        v=v.astype(np.int64),
+        lengths=street_lengths[street],
+        oneway=oneway[street],
+        arterial=is_arterial[street],
+        geom_offsets=geom_offsets,
+        geom_coords=_to_lat_lon(bend_xy[source], lat0, lon0),
+    )
+
+
+def synthetic_graph(nodes: int = 10_000, seed=None, **options):
+    """generate_road_network(...).to_graph(), for code that needs a networkx graph (e.g. Map.load_graph)."""
+    return generate_road_network(nodes, seed, **options).to_graph()
+
+
+def _radial_arterials(side, count, rng):
+    """Consecutive grid nodes along `count` rays from the centre, as (a, b) street pairs."""
+    centre = (side - 1) / 2
+    angles = rng.uniform(0, 2 * np.pi) + np.arange(count) * 2 * np.pi / count
+    steps = np.arange(int(np.ceil(centre * np.sqrt(2))) + 1)
+
+    col = np.rint(centre + np.outer(np.cos(angles), steps)).astype(np.int64)
+    row = np.rint(centre + np.outer(np.sin(angles), steps)).astype(np.int64)
+    inside = (col >= 0) & (col < side) & (row >= 0) & (row < side)
+    node = np.where(inside, row * side + col, -1)
+
+    a, b = node[:, :-1].ravel(), node[:, 1:].ravel()
+    valid = (a >= 0) & (b >= 0) & (a != b)
+    return a[valid], b[valid]
+
+
+def _bends(xy, a, b, counts, rng):
+    """Bend points for each street (evenly spaced, pushed off the line), flat with offsets."""
+    offsets = np.zeros(len(a) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    street = np.repeat(np.arange(len(a)), counts)
+    k = np.arange(counts.sum()) - np.repeat(offsets[:-1], counts)
+    t = ((k + 1) / (counts[street] + 1))[:, None]
+
+    start, delta = xy[a[street]], xy[b[street]] - xy[a[street]]
+    normal = np.column_stack([-delta[:, 1], delta[:, 0]])
+    push = rng.uniform(-BEND_OFFSET, BEND_OFFSET, size=len(street))[:, None]
+    return start + t * delta + push * normal, offsets
+
+
+def _polyline_lengths(xy, a, b, bend_xy, bend_offsets):
+    counts = np.diff(bend_offsets)
+    straight = np.hypot(*(xy[b] - xy[a]).T)
+    if len(bend_xy) == 0:
+        return straight
+
+    # a → first bend, bend → bend, last bend → b
+    street = np.repeat(np.arange(len(a)), counts)
+    prev = np.where(np.r_[True, street[1:] != street[:-1]][:, None], xy[a[street]], np.roll(bend_xy, 1, axis=0))
+    lengths = np.where(counts > 0, 0.0, straight)
+    lengths += np.bincount(street, weights=np.hypot(*(bend_xy - prev).T), minlength=len(a))
+    last = bend_offsets[1:][counts > 0] - 1
+    lengths[counts > 0] += np.hypot(*(xy[b[counts > 0]] - bend_xy[last]).T)
+    return lengths
+
+
+def _to_lat_lon(xy, lat0, lon0):
+    metres_per_deg = np.radians(1.0) * EARTH_RADIUS_KM * 1000
+    lat = lat0 + xy[:, 1] / metres_per_deg
+    lon = lon0 + xy[:, 0] / (metres_per_deg * np.cos(np.radians(lat0)))
+    return np.column_stack([lat, lon])
@@ -0,0 +1,200 @@
+import math
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_TILE_SERVER = "https://mt0.google.com/vt/lyrs=m&hl=en&x={x}&y={y}&z={z}&s=Ga"
+DEFAULT_MAX_ZOOM = 22
+FETCH_TIMEOUT_S = 10
+INSERT_BATCH = 256
+PREFETCH_BATCH = 64  # tiles downloaded, then stored, between cancellation checks
+MAX_PREFETCH_TILES = 20_000  # about 300 MB of tiles; larger regions need a narrower zoom range
+
+
+def default_tile_db():
+    project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    return os.path.join(project_root, "data", "tiles.db")
+
+
+def is_mbtiles_file(path: str):
+    return path.lower().endswith(".mbtiles") and os.path.isfile(path)
+
+
+def tile_range(min_lat, min_lon, max_lat, max_lon, zoom: int):
+    """Inclusive (x0, y0, x1, y1) of the XYZ tiles covering a bounding box at one zoom."""
+    def to_tile(lat, lon):
+        lat = math.radians(min(max(lat, -85.0511), 85.0511))
+        n = 2 ** zoom
+        x = int((lon + 180.0) / 360.0 * n)
+        y = int((1.0 - math.log(math.tan(lat) + 1.0 / math.cos(lat)) / math.pi) / 2.0 * n)
+        return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+    x0, y0 = to_tile(max_lat, min_lon)
+    x1, y1 = to_tile(min_lat, max_lon)
+    return x0, y0, x1, y1
+
+
+class TileStore:
+    """
+    Local tile database in the schema TkinterMapView reads through its
+    database_path, so stored tiles are served without any network request.
+
+    Tiles come from MBTiles files (import_mbtiles) or are pre-fetched for a
+    bounding box and zoom range from the tile server (prefetch).
+    """
+
+    def __init__(self, path: str = None, server: str = DEFAULT_TILE_SERVER, max_zoom: int = DEFAULT_MAX_ZOOM):
+        self.path = path or default_tile_db()
+        self.server = server
+        self.max_zoom = max_zoom
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+        with self._connect() as db:
+            db.execute("CREATE TABLE IF NOT EXISTS server (url VARCHAR(300) PRIMARY KEY NOT NULL, max_zoom INTEGER NOT NULL);")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS tiles (zoom INTEGER NOT NULL, x INTEGER NOT NULL, y INTEGER NOT NULL, "
+                "server VARCHAR(300) NOT NULL, tile_image BLOB NOT NULL, "
+                "CONSTRAINT fk_server FOREIGN KEY (server) REFERENCES server (url), "
+                "CONSTRAINT pk_tiles PRIMARY KEY (zoom, x, y, server));"
+            )
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS sections (position_a VARCHAR(100) NOT NULL, position_b VARCHAR(100) NOT NULL, "
+                "zoom_a INTEGER NOT NULL, zoom_b INTEGER NOT NULL, server VARCHAR(300) NOT NULL, "
+                "CONSTRAINT fk_server FOREIGN KEY (server) REFERENCES server (url), "
+                "CONSTRAINT pk_tiles PRIMARY KEY (position_a, position_b, zoom_a, zoom_b, server));"
+            )
+            db.execute("INSERT OR IGNORE INTO server (url, max_zoom) VALUES (?, ?);", (server, max_zoom))
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def get_tile(self, zoom: int, x: int, y: int):
+        with self._connect() as db:
+            row = db.execute(
+                "SELECT tile_image FROM tiles WHERE zoom=? AND x=? AND y=? AND server=?;", (zoom, x, y, self.server)
+            ).fetchone()
+        return row[0] if row else None
+
+    def put_tiles(self, tiles):
+        """Store an iterable of (zoom, x, y, image bytes); returns how many were written."""
+        count = 0
+        with self._connect() as db:
+            batch = []
+            for zoom, x, y, data in tiles:
+                batch.append((zoom, x, y, self.server, data))
+                if len(batch) >= INSERT_BATCH:
+                    db.executemany("INSERT OR REPLACE INTO tiles VALUES (?, ?, ?, ?, ?);", batch)
+                    count += len(batch)
+                    batch = []
+            db.executemany("INSERT OR REPLACE INTO tiles VALUES (?, ?, ?, ?, ?);", batch)
+            count += len(batch)
+        return count
+
+    def count(self):
+        with self._connect() as db:
+            return db.execute("SELECT COUNT(*) FROM tiles WHERE server=?;", (self.server,)).fetchone()[0]
+
+    def import_mbtiles(self, mbtiles_path: str):
+        """Copy every tile of an MBTiles file into the store (MBTiles rows are TMS, flipped to XYZ)."""
+        source = sqlite3.connect(f"file:{mbtiles_path}?mode=ro", uri=True)
+        try:
+            rows = source.execute("SELECT zoom_level, tile_column, tile_row, tile_data FROM tiles;")
+            count = self.put_tiles((z, x, (1 << z) - 1 - row, data) for z, x, row, data in rows)
+        finally:
+            source.close()
+
+        print(f"🧱 Imported {count:,} tiles from {os.path.basename(mbtiles_path)}")
+        return count
+
+    def missing_tiles(self, bounds, min_zoom: int, max_zoom: int):
+        """(zoom, x, y) of the tiles covering bounds = (min_lat, min_lon, max_lat, max_lon) that are not stored."""
+        missing = []
+        with self._connect() as db:
+            for zoom in range(min_zoom, max_zoom + 1):
+                x0, y0, x1, y1 = tile_range(*bounds, zoom)
+                have = set(db.execute(
+                    "SELECT x, y FROM tiles WHERE zoom=? AND server=? AND x BETWEEN ? AND ? AND y BETWEEN ? AND ?;",
+                    (zoom, self.server, x0, x1, y0, y1),
+                ).fetchall())
+                missing.extend((zoom, x, y) for x in range(x0, x1 + 1) for y in range(y0, y1 + 1) if (x, y) not in have)
+        return missing
+
+    def prefetch(self, bounds, min_zoom: int, max_zoom: int, workers: int = 8, fetch=None, cancel=None,
+                 max_tiles: int = MAX_PREFETCH_TILES):
+        """
+        Download the missing tiles for a bounding box and zoom range.
+
+        `fetch(zoom, x, y)` returns image bytes or None; it defaults to an HTTP
+        GET on the tile server. Tiles are stored in batches as they arrive and
+        `cancel` (a threading.Event) is checked between batches. Raises
+        ValueError, fetching nothing, when more than max_tiles are missing.
+        Returns (stored, failed) for the tiles fetched before any cancel.
+        """
+        fetch = fetch or self._download
+        missing = self.missing_tiles(bounds, min_zoom, max_zoom)
+        if len(missing) > max_tiles:
+            raise ValueError(
+                f"{len(missing):,} tiles missing for zoom {min_zoom}-{max_zoom}, over the limit of {max_tiles:,}"
+            )
+        if not missing:
+            return 0, 0
+
+        print(f"🧱 Pre-fetching {len(missing):,} tiles (zoom {min_zoom}-{max_zoom})")
+        stored = fetched = 0
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for start in range(0, len(missing), PREFETCH_BATCH):
+                if cancel is not None and cancel.is_set():
+                    break
+                batch = missing[start:start + PREFETCH_BATCH]
+                results = pool.map(lambda t: (t, fetch(*t)), batch)
+                stored += self.put_tiles((z, x, y, data) for (z, x, y), data in results if data)
+                fetched += len(batch)
+
+        return stored, fetched - stored
+
+    def _download(self, zoom, x, y):
+        import requests
+
+        url = self.server.replace("{x}", str(x)).replace("{y}", str(y)).replace("{z}", str(zoom))
+        try:
+            response = requests.get(url, headers={"User-Agent": "TkinterMapView"}, timeout=FETCH_TIMEOUT_S)
+            return response.content if response.ok else None
+        except requests.RequestException:
+            return None
+
+
+class TileImageCache(OrderedDict):
+    """
+    Bounded LRU replacement for TkinterMapView.tile_image_cache.
+
+    The widget fills it from its loader thread and reads it on the Tk thread,
+    so every access holds a lock. A membership test already counts as a use,
+    so the `in` check the widget does before reading cannot race an eviction.
+    """
+
+    def __init__(self, max_tiles: int = 2048):
+        super().__init__()
+        self.max_tiles = max_tiles
+        self.lock = threading.RLock()
+
+    def __contains__(self, key):
+        with self.lock:
+            found = super().__contains__(key)
+            if found:
+                self.move_to_end(key)
+            return found
+
+    def __getitem__(self, key):
+        with self.lock:
+            value = super().__getitem__(key)
+            self.move_to_end(key)
+            return value
+
+    def __setitem__(self, key, value):
+        with self.lock:
+            super().__setitem__(key, value)
+            self.move_to_end(key)
+            while len(self) > self.max_tiles:
+                self.popitem(last=False)
@@ -1,7 +1,41 @@
+import math
+
+
 def reconstruct_path(parent, current):
+    if current not in parent:
+        return []  # never reached
+
     path = []
     while current is not None:
         path.append(current)
         current = parent[current]
 
     return path[::-1]
+
+
+def weighted_neighbors(graph):
+    """
+    neighbors(node) -> [(neighbour, length)] for the searches. A GraphView
+    reads its arrays directly; a networkx graph (e.g. the chain-compressed
+    one) gives the length of the key-0 edge to each neighbour.
+    """
+    if hasattr(graph, "weighted_neighbors"):
+        return graph.weighted_neighbors
+
+    def neighbors(node):
+        return [(n, graph.get_edge_data(node, n)[0].get("length", 1)) for n in graph.neighbors(node)]
+    return neighbors
+
+
+def heuristic_scale(graph, lat):
+    """
+    (per degree of latitude, per degree of longitude) multipliers for the A*
+    straight-line bound. Compiled views carry one calibrated to their weight
+    profile; plain networkx graphs are weighted in metres.
+    """
+    scale = getattr(graph, "heuristic_scale", None)
+    if scale is not None:
+        return scale
+
+    metres_per_degree = math.radians(1.0) * 6371000.0
+    return metres_per_degree, metres_per_degree * math.cos(math.radians(lat))
@@ -0,0 +1,231 @@
+import ast
+import re
+from dataclasses import dataclass
+
+import numpy as np
+
+# Typical urban limits (km/h) for ways without a usable maxspeed tag
+HIGHWAY_SPEEDS_KPH = {
+    "motorway": 100,
+    "motorway_link": 60,
+    "trunk": 80,
+    "trunk_link": 50,
+    "primary": 60,
+    "primary_link": 40,
+    "secondary": 50,
+    "secondary_link": 40,
+    "tertiary": 40,
+    "tertiary_link": 30,
+    "unclassified": 30,
+    "residential": 30,
+    "living_street": 10,
+}
+DEFAULT_SPEED_KPH = 30
+KPH_PER_MPH = 1.609344
+
+# Weight profiles are expressions over one edge: length (m), speed_kph,
+# travel_time (s) and highway (str). Only arithmetic, comparisons, `a if c
+# else b`, min/max/abs and the numpy functions below are allowed (see
+# compile_profile); strings may only be compared, e.g. highway == "primary"
+PROFILES = {
+    "length": "length",
+    "travel_time": "travel_time",
+}
+DEFAULT_PROFILE = "length"
+
+# (unit, factor) for showing a path's total cost
+PROFILE_UNITS = {
+    "length": ("km", 1 / 1000),
+    "travel_time": ("min", 1 / 60),
+}
+
+PROFILE_VARIABLES = ("length", "speed_kph", "travel_time", "highway")
+STRING_VARIABLES = ("highway",)
+PROFILE_FUNCTIONS = {"min": min, "max": max, "abs": abs}
+NUMPY_FUNCTIONS = ("where", "minimum", "maximum", "clip", "abs", "sqrt", "log", "exp")
+PROFILE_OPERATORS = (
+    ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.Pow, ast.UAdd, ast.USub, ast.Not,
+    ast.And, ast.Or, ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE, ast.In, ast.NotIn,
+)
+
+MAXSPEED = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*(mph)?\s*$")
+
+
+@dataclass
+class EdgeTable:
+    """
+    The attributes weight profiles read, one row per original edge (parallel
+    edges included), so new profiles can be compiled after the networkx graph
+    is gone. `edge` is the compiled edge each row collapses into.
+    """
+    edge: np.ndarray           # int64 (M,)
+    length: np.ndarray         # float64 (M,) metres
+    speed_kph: np.ndarray      # float64 (M,) maxspeed, or the highway default
+    highway: np.ndarray        # int16 (M,) index into highway_names
+    highway_names: list
+
+    @classmethod
+    def from_rows(cls, edge, rows):
+        """Table from the compiled edge ids and the networkx edge data dicts of every original edge."""
+        names, codes, lengths, speeds = {}, [], [], []
+        for data in rows:
+            highway = data.get("highway", "unclassified")
+            if isinstance(highway, list):
+                highway = highway[0]
+            codes.append(names.setdefault(highway, len(names)))
+            lengths.append(float(data.get("length", 0)))
+            speeds.append(edge_speed_kph(data.get("maxspeed"), highway))
+
+        return cls(
+            edge=np.asarray(edge, dtype=np.int64),
+            length=np.asarray(lengths, dtype=np.float64),
+            speed_kph=np.asarray(speeds, dtype=np.float64),
+            highway=np.asarray(codes, dtype=np.int16),
+            highway_names=list(names),
+        )
+
+    def columns(self, traffic=None):
+        """
+        The profile variables as arrays over all rows. `traffic` (km/h per
+        compiled edge, NaN where unknown) overrides the mapped speeds.
+        """
+        speed_kph = self.speed_kph
+        if traffic is not None:
+            live = traffic[self.edge]
+            speed_kph = np.where(np.isnan(live), speed_kph, live)
+        return {
+            "length": self.length,
+            "speed_kph": speed_kph,
+            "travel_time": self.length / (speed_kph / 3.6),
+            "highway": np.asarray(self.highway_names, dtype=object)[self.highway],
+        }
+
+
+def parse_maxspeed(value):
+    """km/h from an OSM maxspeed tag ("50", "30 mph", or a list of them), or None."""
+    if isinstance(value, list):
+        speeds = [s for s in (parse_maxspeed(v) for v in value) if s is not None]
+        return sum(speeds) / len(speeds) if speeds else None
+
+    match = MAXSPEED.match(str(value)) if value is not None else None
+    if match is None:
+        return None
+    speed = float(match.group(1)) * (KPH_PER_MPH if match.group(2) else 1)
+    return speed if speed > 0 else None
+
+
+def edge_speed_kph(maxspeed, highway):
+    speed = parse_maxspeed(maxspeed)
+    if speed is None:
+        speed = HIGHWAY_SPEEDS_KPH.get(highway, DEFAULT_SPEED_KPH)
+    return speed
+
+
+def compile_profile(expression: str):
+    """
+    Code object for a profile expression, after checking that its syntax
+    tree holds only what PROFILES allows; raises ValueError otherwise.
+    Evaluating it therefore cannot reach attributes, builtins or imports.
+    """
+    try:
+        tree = ast.parse(expression, mode="eval")
+    except SyntaxError as e:
+        raise ValueError(f"Profile {expression!r} is not an expression: {e.msg}") from None
+
+    _check_profile_node(tree.body, expression)
+    return compile(tree, f"<profile {expression!r}>", "eval")
+
+
+def _check_profile_node(node, expression, compared=False):
+    """Raise ValueError unless `node` is allowed; `compared` is set for the operands of a comparison."""
+    def reject(what):
+        raise ValueError(f"Profile {expression!r}: {what} is not allowed")
+
+    if isinstance(node, ast.Constant):
+        if isinstance(node.value, str) and not compared:
+            reject("a string outside a comparison")
+        if not isinstance(node.value, (int, float, str)):
+            reject(f"the literal {node.value!r}")
+    elif isinstance(node, ast.Name):
+        if node.id not in PROFILE_VARIABLES:
+            reject(f"the name {node.id!r}")
+        if node.id in STRING_VARIABLES and not compared:
+            reject(f"{node.id} outside a comparison")
+    elif isinstance(node, ast.Compare):
+        for op in node.ops:
+            if not isinstance(op, PROFILE_OPERATORS):
+                reject(f"the comparison {type(op).__name__}")
+        for operand in (node.left, *node.comparators):
+            _check_profile_node(operand, expression, compared=True)
+    elif isinstance(node, (ast.Tuple, ast.List)) and compared:
+        for element in node.elts:
+            _check_profile_node(element, expression, compared=True)
+    elif isinstance(node, ast.Call):
+        func = node.func
+        is_builtin = isinstance(func, ast.Name) and func.id in PROFILE_FUNCTIONS
+        is_numpy = (
+            isinstance(func, ast.Attribute) and isinstance(func.value, ast.Name)
+            and func.value.id == "np" and func.attr in NUMPY_FUNCTIONS
+        )
+        if not (is_builtin or is_numpy) or node.keywords:
+            reject(f"the call {ast.unparse(node)!r}")
+        for arg in node.args:
+            _check_profile_node(arg, expression)
+    elif isinstance(node, (ast.BinOp, ast.UnaryOp, ast.BoolOp)):
+        if not isinstance(node.op, PROFILE_OPERATORS):
+            reject(f"the operator {type(node.op).__name__}")
+        if isinstance(node.op, ast.Pow):
+            # A variable raised to a number literal: constant powers could build huge integers
+            exponent = node.right
+            if isinstance(exponent, ast.UnaryOp) and isinstance(exponent.op, ast.USub):
+                exponent = exponent.operand
+            literal = isinstance(exponent, ast.Constant) and type(exponent.value) in (int, float)
+            variable = any(isinstance(n, ast.Name) and n.id in PROFILE_VARIABLES for n in ast.walk(node.left))
+            if not literal or not variable:
+                reject(f"the power {ast.unparse(node)!r} (only a variable to a number literal)")
+        if isinstance(node, ast.BinOp):
+            operands = (node.left, node.right)
+        elif isinstance(node, ast.UnaryOp):
+            operands = (node.operand,)
+        else:
+            operands = node.values
+        for operand in operands:
+            _check_profile_node(operand, expression)
+    elif isinstance(node, ast.IfExp):
+        for part in (node.test, node.body, node.orelse):
+            _check_profile_node(part, expression)
+    else:
+        reject(f"{type(node).__name__} ({ast.unparse(node)!r})")
+
+
+def uses_speed(expression: str):
+    """Whether a profile depends on edge speeds, and so changes with traffic."""
+    names = compile_profile(expression).co_names
+    return "speed_kph" in names or "travel_time" in names
+
+
+def evaluate_profile(expression: str, table: EdgeTable, num_edges: int, traffic=None):
+    """
+    Weight column (num_edges,) for a profile: the expression evaluated on
+    every original edge, then the minimum over the parallel edges of each
+    compiled edge. Expressions are tried on whole columns first and fall
+    back to one evaluation per edge (e.g. for `a if highway == "x" else b`).
+    """
+    code = compile_profile(expression)
+    namespace = {"__builtins__": {}, "np": np, **PROFILE_FUNCTIONS}
+    columns = table.columns(traffic)
+
+    try:
+        values = np.broadcast_to(np.asarray(eval(code, namespace, columns), dtype=np.float64), table.length.shape)
+    except (TypeError, ValueError):
+        rows = zip(*(columns[name].tolist() for name in columns))
+        values = np.fromiter(
+            (eval(code, namespace, dict(zip(columns, row))) for row in rows), dtype=np.float64, count=len(table.edge)
+        )
+
+    if not np.all(np.isfinite(values)) or np.any(values < 0):
+        raise ValueError(f"Profile {expression!r} gives negative or non-finite edge weights")
+
+    weights = np.full(num_edges, np.inf)
+    np.minimum.at(weights, table.edge, values)
+    return weights
@@ -0,0 +1,49 @@
+import numpy as np
+
+
+class WeightSnapshot:
+    """
+    One published version of a CompiledGraph's per-edge weights.
+
+    Holds a column per weight profile, the closed-edge mask, the edit
+    factors and the per-edge traffic speeds (NaN where the map's own speed
+    applies). Every array is read-only. Updates build a new snapshot that
+    shares the columns they did not touch (copy-on-write) and swap it in with
+    one assignment. A search pins the snapshot it started with, and a
+    snapshot no search or view refers to any more is simply freed.
+    """
+
+    def __init__(self, version, weights, closed, factors, traffic, base=None):
+        for array in (*weights.values(), closed, factors, traffic, *(base or {}).values()):
+            array.flags.writeable = False
+
+        self.version = version
+        self.weights = weights    # profile name -> float64 (E,)
+        self.closed = closed      # bool (E,)
+        self.factors = factors    # float64 (E,), RoadEdit factors
+        self.traffic = traffic    # float64 (E,) km/h from the last traffic feed, NaN elsewhere
+        self.base = base          # weights before factors, or None while every factor is 1
+        self.num_closed = int(closed.sum())
+
+        # profile -> A* scales (see CompiledGraph.heuristic_scale), filled on first use
+        self.heuristics = {}
+
+    @classmethod
+    def initial(cls, weights, num_edges):
+        return cls(0, weights, np.zeros(num_edges, dtype=bool), np.ones(num_edges), np.full(num_edges, np.nan))
+
+    def derive(self, **changes):
+        """The next version: this snapshot with some of its arrays replaced."""
+        fields = {
+            "weights": self.weights,
+            "closed": self.closed,
+            "factors": self.factors,
+            "traffic": self.traffic,
+            "base": self.base,
+        }
+        fields.update(changes)
+        return WeightSnapshot(self.version + 1, **fields)
+
+    def unscaled(self, profile):
+        """A profile's weights without the edit factors."""
+        return self.weights[profile] if self.base is None else self.base[profile]
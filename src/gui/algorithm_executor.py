@@ -1,5 +1,12 @@
-import time
-from algorithms import ALGORITHMS, run_algorithm
+from algorithms import ALGORITHMS
+from core.weight_profiles import DEFAULT_PROFILE, PROFILE_UNITS
+from gui.lod_path import set_lod_path
+from gui.heatmap_overlay import ExplorationHeatmap
+from gui.search_worker import SearchJob
+from gui.frame_scheduler import ANIMATION_FPS
+
+POLL_MS = 1000 // ANIMATION_FPS
+COLORS = ["blue", "red", "green", "purple", "orange", "brown"]
 
 
 class AlgorithmExecutor:
@@ -7,174 +14,93 @@ class AlgorithmExecutor:
     def __init__(self, map_controller, root):
         self.map_controller = map_controller
         self.root = root
-        self.visited_markers = []
-        self.is_running = False
-        self.should_stop = False
-
-    def run_single_algorithm(self, algo_name, color="blue", width=5, animate=False, delay=0.0):
-
-        start_time = time.perf_counter()
-
-        self.should_stop = False
-        self.is_running = True
-
-        self._clear_visited_markers()
-
-        callback = None
-        if animate:
-            def animation_callback(current_node, visited_set):
-                if self.should_stop:
-                    raise StopIteration("Animation stopped by user")
-
-                self._draw_visited_node(current_node)
-                self.root.update()  # Update UI
-                if delay > 0:
-                    self.root.after(int(delay * 1000), lambda: None)
-                    time.sleep(delay)
-            callback = animation_callback
-
-        try:
-            path, visited = run_algorithm(
-                algo_name,
-                self.map_controller.map.graph,
-                self.map_controller.start_node,
-                self.map_controller.goal_node,
-                self.map_controller.map.node_coords,
-                callback=callback,
-                delay=0,
-            )
-        except StopIteration:
-
-            self.is_running = False
-            return {
-                "name": algo_name,
-                "time_ms": 0,
-                "visited": 0,
-                "length_km": None,
-                "path_nodes": 0,
-                "color": color,
-                "success": False,
-                "error": "Cancelled",
-            }
-        except Exception as e:
-            self.is_running = False
-            return {
-                "name": algo_name,
-                "time_ms": 0,
-                "visited": 0,
-                "length_km": None,
-                "path_nodes": 0,
-                "color": color,
-                "success": False,
-                "error": str(e),
-            }
-
-        duration = (time.perf_counter() - start_time) * 1000
-        self.is_running = False
-
-        result = {
-            "name": algo_name,
-            "time_ms": duration,
-            "visited": visited,
-            "length_km": None,
-            "path_nodes": 0,
-            "color": color,
-            "success": False,
-        }
-
-        if path and len(path) > 0:
-            coords = self.map_controller.map.get_path_coords(path)
-
-            if coords:
-
-                path_obj = self.map_controller.map_widget.set_path(
-                    coords, color=color, width=width
-                )
-                self.map_controller.current_paths.append(path_obj)
-
-
-                length = self.map_controller.map.get_path_length(path)
-                result["length_km"] = length / 1000
-                result["path_nodes"] = len(path)
-                result["success"] = True
-
-
-                self.map_controller.fit_bounds_to_path(coords)
-
-        return result
-
-    def run_comparison(self, animate=False, delay=0.0):
-
-        colors = ["blue", "red", "green", "purple", "orange", "brown"]
-        results = []
-
-        for i, algo_name in enumerate(ALGORITHMS.keys()):
-
-            self._clear_visited_markers()
-
-            result = self.run_single_algorithm(
-                algo_name,
-                color=colors[i % len(colors)],
-                width=4,
-                animate=animate,
-                delay=delay
-            )
-            results.append(result)
-
-            if animate:
-                time.sleep(0.5)
-                self.root.update()
-
-        return results
-
-    def _draw_visited_node(self, node_id):
-
-        try:
-            if len(self.visited_markers) > 1000:
-                for _ in range(100):
-                    if self.visited_markers:
-                        old_marker = self.visited_markers.pop(0)
-                        try:
-                            old_marker.delete()
-                        except:
-                            pass
-
-            lat, lon = self.map_controller.map.get_node_coords(node_id)
-            marker = self.map_controller.map_widget.set_marker(
-                lat, lon,
-                text="",
-                marker_color_circle="lightblue",
-                marker_color_outside="blue",
-            )
-            self.visited_markers.append(marker)
-        except Exception as e:
-            pass
+        self.heatmap = ExplorationHeatmap(map_controller.map_widget, max_fps=ANIMATION_FPS)
+        self.job = None
+
+    @property
+    def is_running(self):
+        return self.job is not None and self.job.is_running
+
+    def run_single_algorithm(self, algo_name, on_done, animate=False, rate=None, compress=False, instrument=False,
+                             profile=None):
+        """
+        Search on a worker thread; on_done(results) is called on the Tk thread.
+        When animating, `rate` caps expansions per second (None: unthrottled);
+        `profile` names the weight profile the weighted searches minimise.
+        """
+        self._start([algo_name], ["blue"], 5, on_done, animate, rate, compress, instrument, profile)
+
+    def run_comparison(self, on_done, animate=False, rate=None, compress=False, instrument=False, profile=None):
+        self._start(list(ALGORITHMS.keys()), COLORS, 4, on_done, animate, rate, compress, instrument, profile)
+
+    def _start(self, algo_names, colors, width, on_done, animate, rate, compress, instrument, profile):
+        # A cancelled job winds down on its own; _poll ignores its events from here on
+        self.stop_execution()
+        self.clear_exploration()
+
+        start, goal, snaps = self.map_controller.search_endpoints()
+        self.job = SearchJob(
+            self.map_controller.map, algo_names, start, goal, snaps, colors,
+            animate=animate, rate=rate, compress=compress, instrument=instrument, profile=profile,
+        ).start()
+        self.root.after(POLL_MS, self._poll, self.job, width, on_done)
+
+    def _poll(self, job, width, on_done):
+        # A stopped job is drained until its worker exits; it may drop its "done"
+        alive = job.is_running
+        events = job.poll()
+        stale = job is not self.job or job.cancelled.is_set()
+
+        for kind, *event in events:
+            if kind == "done":
+                if not stale:
+                    on_done(event[0])
+                return
+            if stale:
+                continue
+            if kind == "started":
+                self.clear_exploration()
+            elif kind == "explored":
+                self.heatmap.add_many(event[1])
+            elif kind == "finished":
+                self.heatmap.flush(force=True)
+                self._draw_result(event[0], width)
+
+        if not stale:
+            self.heatmap.flush()
+        elif not alive:
+            return
+        self.root.after(POLL_MS, self._poll, job, width, on_done)
+
+    def _draw_result(self, result, width):
+        coords = result.pop("coords", None)
+        if not coords:
+            return
+
+        path_obj = set_lod_path(
+            self.map_controller.map_widget, coords, color=result["color"], width=width
+        )
+        self.map_controller.current_paths.append(path_obj)
+        self.map_controller.fit_bounds_to_path(coords)
 
     def stop_execution(self):
-        """Stop the currently running algorithm."""
-        self.should_stop = True
-        self.is_running = False
+        """Ask the running search to stop; it returns at its next step."""
+        if self.job is not None:
+            self.job.cancel()
 
-        try:
-            self.root.update()
-        except:
-            pass
-
-    def _clear_visited_markers(self):
-        markers_to_delete = self.visited_markers[:]
-        self.visited_markers.clear()
-
-        for marker in markers_to_delete:
-            try:
-                marker.delete()
-            except:
-                pass
+    def clear_exploration(self):
+        self.heatmap.clear()
 
     @staticmethod
     def format_results(results):
         lines = []
+        profile = next((r.get("profile") for r in results if r.get("profile")), DEFAULT_PROFILE)
+        unit, factor = PROFILE_UNITS.get(profile, ("", 1.0))
+        show_cost = profile != DEFAULT_PROFILE
 
         header = f"{'Algorithm':<12} {'Time (ms)':<12} {'Nodes':<12} {'Path':<12} {'Distance (km)':<15} {'Status':<10} {'Color'}"
+        if show_cost:
+            header = f"{header:<90} Cost ({unit or profile})"
         lines.append(header)
         lines.append("=" * 95)
 
@@ -196,6 +122,8 @@ class AlgorithmExecutor:
                     f"{'✅ Found':<10} "
                     f"{r['color']}"
                 )
+                if show_cost and r.get("cost") is not None:
+                    line = f"{line:<90} {r['cost'] * factor:.2f}"
             else:
                 error_msg = r.get('error', 'Failed')
                 line = (
@@ -209,6 +137,29 @@ class AlgorithmExecutor:
                 )
             lines.append(line)
 
+        instrumented = [r for r in results_sorted if r.get("stats") is not None]
+        if instrumented:
+            lines.append("")
+            lines.append(
+                f"{'Algorithm':<12} {'Expanded':<10} {'Found':<10} {'Scanned':<10} {'Pushes':<10} "
+                f"{'Stale':<8} {'Peak frt':<10} {'Mem (KB)':<10} {'Heur ms':<9} {'Adj ms'}"
+            )
+            lines.append("=" * 105)
+            for r in instrumented:
+                st = r["stats"]
+                lines.append(
+                    f"{r['name']:<12} "
+                    f"{st.expansions:<10} "
+                    f"{st.discovered:<10} "
+                    f"{st.edges_scanned:<10} "
+                    f"{st.pushes:<10} "
+                    f"{st.stale_pops:<8} "
+                    f"{st.peak_frontier:<10} "
+                    f"{st.peak_memory_bytes / 1024:<10.0f} "
+                    f"{st.heuristic_ms:<9.2f} "
+                    f"{st.adjacency_ms:.2f}"
+                )
+
         if len(results) > 1:
             lines.append("")
             lines.append("─" * 95)
@@ -224,6 +175,11 @@ class AlgorithmExecutor:
                 shortest = min(successful, key=lambda x: x["length_km"])
                 lines.append(f"🎯 Shortest Path:  {shortest['name']:<15} ({shortest['length_km']:.2f} km)")
 
+                costed = [r for r in successful if r.get("cost") is not None]
+                if show_cost and costed:
+                    cheapest = min(costed, key=lambda x: x["cost"])
+                    lines.append(f"⚖️ Cheapest:       {cheapest['name']:<15} ({cheapest['cost'] * factor:.2f} {unit or profile})")
+
                 least_nodes = min(successful, key=lambda x: x["visited"])
                 lines.append(f"💡 Most Efficient: {least_nodes['name']:<15} ({least_nodes['visited']} nodes)")
 
@@ -0,0 +1,41 @@
+import time
+
+ANIMATION_FPS = 30
+
+
+class FrameScheduler:
+    """
+    Paces search expansions for animation: `rate` expansions per second,
+    grouped into frames of about 1 / fps seconds (one expansion per frame
+    when the rate is below the frame rate). tick() is called once per
+    expansion and returns True when the frame is complete, so the caller
+    publishes everything since the last frame as one redraw. With
+    rate=None expansions run unthrottled and frames close on the clock
+    alone.
+    """
+
+    def __init__(self, rate: float = None, fps: float = ANIMATION_FPS):
+        self.rate = rate
+        self.per_frame = max(1, round(rate / fps)) if rate else None
+        # Frame length follows the whole number of expansions, so the rate stays exact
+        self.frame_s = self.per_frame / rate if rate else 1.0 / fps
+        self.deadline = time.perf_counter() + self.frame_s
+        self.count = 0
+
+    def tick(self):
+        self.count += 1
+        if self.per_frame is not None:
+            if self.count < self.per_frame:
+                return False
+            remaining = self.deadline - time.perf_counter()
+            if remaining > 0:
+                time.sleep(remaining)
+        elif time.perf_counter() < self.deadline:
+            return False
+
+        # Deadlines advance by whole frames; after a stall the next frame gets a full
+        # frame from now instead of going out at once
+        now = time.perf_counter()
+        self.deadline = max(self.deadline + self.frame_s, now + self.frame_s)
+        self.count = 0
+        return True
@@ -0,0 +1,155 @@
+import time
+
+import numpy as np
+from PIL import Image, ImageTk
+
+from core.polyline import TILE_SIZE, to_mercator_px
+from gui.viewport import Viewport
+
+BUCKET_ZOOM = 12  # points are bucketed by the map tile they fall in at this zoom
+BUCKET_PX = TILE_SIZE / 2 ** BUCKET_ZOOM
+MAX_BUCKET_ROWS = 512  # beyond this many visible rows a full scan is cheaper than range lookups
+
+
+class ExplorationHeatmap:
+    """
+    Explored nodes drawn as one raster image over the visible map.
+
+    Points are kept in zoom-0 Mercator pixels and binned into a density grid
+    of `cell_px` screen cells, which is coloured on a log scale; at low zoom a
+    cell aggregates many nodes. While the view stays put only newly added
+    points are binned, so a frame costs the same after 200 or 200k explored
+    nodes. A pan or zoom rebins once, reading only the tile buckets on screen.
+    It registers as a map polygon, so the widget redraws it after every pan
+    and zoom and keeps it under paths and markers.
+    """
+
+    def __init__(self, map_widget, max_fps: float = 20.0, cell_px: int = 3, color=(30, 90, 255)):
+        self.map_widget = map_widget
+        self.min_interval = 1.0 / max_fps
+        self.cell_px = cell_px
+        self.color = np.array(color, dtype=np.uint8)
+
+        self.image = None
+        self.canvas_image = None
+        self.deleted = False
+        self.last_draw = 0.0
+        self._reset()
+
+        map_widget.canvas_polygon_list.append(self)
+
+    def _reset(self):
+        # Points bucketed at the last rebin (sorted by bucket key), then everything added since
+        self.sorted_px = np.empty((0, 2))
+        self.sorted_keys = np.empty(0, dtype=np.int64)
+        self.tail_px = np.empty((0, 2))
+        self.pending = []
+        self.binned = 0
+        self.view = None
+        self.density = None
+
+    def add(self, lat: float, lon: float):
+        self.pending.append((lat, lon))
+
+    def add_many(self, coords):
+        self._merge_pending()
+        self.tail_px = np.concatenate([self.tail_px, to_mercator_px(np.asarray(coords).reshape(-1, 2))])
+
+    def clear(self):
+        self._reset()
+        self.draw()
+
+    def flush(self, force: bool = False):
+        """Redraw if a frame is due (or forced); returns whether it drew."""
+        if not force and time.perf_counter() - self.last_draw < self.min_interval:
+            return False
+        self.draw()
+        return True
+
+    def _merge_pending(self):
+        if self.pending:
+            self.tail_px = np.concatenate([self.tail_px, to_mercator_px(self.pending)])
+            self.pending = []
+
+    def _bucket_tail(self):
+        px = np.concatenate([self.sorted_px, self.tail_px])
+        keys = np.concatenate([self.sorted_keys, _bucket_keys(self.tail_px)])
+        order = np.argsort(keys, kind="stable")
+        self.sorted_px, self.sorted_keys = px[order], keys[order]
+        self.tail_px = np.empty((0, 2))
+        self.binned = 0
+
+    def _visible(self, view):
+        """Bucketed points in the tiles the viewport overlaps."""
+        low, high = view.bounds()
+        (x0, y0), (x1, y1) = (np.clip(np.floor(b / BUCKET_PX), 0, 2 ** BUCKET_ZOOM - 1).astype(np.int64) for b in (low, high))
+        if y1 - y0 + 1 > MAX_BUCKET_ROWS:
+            return self.sorted_px
+
+        rows = np.arange(y0, y1 + 1) * 2 ** BUCKET_ZOOM
+        starts = np.searchsorted(self.sorted_keys, rows + x0)
+        ends = np.searchsorted(self.sorted_keys, rows + x1, side="right")
+        counts = ends - starts
+        run_starts = np.cumsum(counts) - counts
+        return self.sorted_px[np.repeat(starts - run_starts, counts) + np.arange(counts.sum())]
+
+    def draw(self, move=False):
+        if self.deleted:
+            return
+        self._merge_pending()
+        self.last_draw = time.perf_counter()
+
+        canvas = self.map_widget.canvas
+        view = Viewport(self.map_widget)
+        if len(self.sorted_px) + len(self.tail_px) == 0 or view.width <= 0 or view.height <= 0:
+            if self.canvas_image is not None:
+                canvas.delete(self.canvas_image)
+                self.canvas_image = None
+            return
+
+        cols, rows = -(-view.width // self.cell_px), -(-view.height // self.cell_px)
+        if view.key != self.view:
+            self.view = view.key
+            self.density = np.zeros(rows * cols, dtype=np.int64)
+            self._bucket_tail()
+            self._bin(view.to_canvas(self._visible(view)), cols, rows)
+
+        self._bin(view.to_canvas(self.tail_px[self.binned:]), cols, rows)
+        self.binned = len(self.tail_px)
+        density = self.density.reshape(rows, cols)
+
+        alpha = np.zeros(density.shape, dtype=np.uint8)
+        if density.max() > 0:
+            level = np.log1p(density) / np.log1p(density.max())
+            alpha[density > 0] = (80 + 175 * level[density > 0]).astype(np.uint8)
+
+        rgba = np.empty((rows, cols, 4), dtype=np.uint8)
+        rgba[..., :3] = self.color
+        rgba[..., 3] = alpha
+        image = Image.fromarray(rgba, "RGBA").resize((cols * self.cell_px, rows * self.cell_px), Image.NEAREST)
+
+        # Keep a reference, Tk does not
+        self.image = ImageTk.PhotoImage(image)
+        if self.canvas_image is None:
+            self.canvas_image = canvas.create_image(0, 0, anchor="nw", image=self.image, tag="polygon")
+        else:
+            canvas.itemconfig(self.canvas_image, image=self.image)
+        self.map_widget.manage_z_order()
+
+    def _bin(self, screen, cols, rows):
+        cells = np.floor(screen / self.cell_px).astype(np.int64)
+        visible = (cells[:, 0] >= 0) & (cells[:, 0] < cols) & (cells[:, 1] >= 0) & (cells[:, 1] < rows)
+        self.density += np.bincount(cells[visible, 1] * cols + cells[visible, 0], minlength=rows * cols)
+
+    def delete(self):
+        if self in self.map_widget.canvas_polygon_list:
+            self.map_widget.canvas_polygon_list.remove(self)
+        if self.canvas_image is not None:
+            self.map_widget.canvas.delete(self.canvas_image)
+            self.canvas_image = None
+        self.deleted = True
+
+
+def _bucket_keys(px):
+    cells = np.clip(np.floor(px / BUCKET_PX), 0, 2 ** BUCKET_ZOOM - 1).astype(np.int64)
+    return cells[:, 1] * 2 ** BUCKET_ZOOM + cells[:, 0]
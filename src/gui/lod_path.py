@@ -0,0 +1,69 @@
+import tkinter
+
+from tkintermapview.canvas_path import CanvasPath
+from core.polyline import ZoomLevels
+from gui.viewport import Viewport
+
+CULL_MARGIN_PX = 50  # keep segments this close to the edge so panning does not show cut ends
+
+
+class LodPath(CanvasPath):
+    """
+    Map path that draws a zoom-appropriate simplification of its geometry,
+    clipped to the viewport.
+
+    The widget calls draw() after every zoom and pan, so the level is swapped
+    in there. Only runs of segments that touch the visible area become canvas
+    lines, so a long route costs little when zoomed in on part of it.
+    """
+
+    def __init__(self, map_widget, coords, **kwargs):
+        self.zoom_levels = ZoomLevels(coords)
+        self.canvas_lines = []
+        super().__init__(map_widget, self.zoom_levels.for_zoom(map_widget.zoom), **kwargs)
+
+    def draw(self, move=False):
+        self.position_list = self.zoom_levels.for_zoom(self.map_widget.zoom)
+        if self.deleted:
+            return
+
+        view = Viewport(self.map_widget)
+        xy = view.to_canvas(self.zoom_levels.px_for_zoom(view.zoom))
+        runs = view.visible_runs(xy, margin=CULL_MARGIN_PX + self.width)
+
+        canvas = self.map_widget.canvas
+        while len(self.canvas_lines) > len(runs):
+            canvas.delete(self.canvas_lines.pop())
+
+        for i, (start, end) in enumerate(runs):
+            positions = xy[start:end].ravel().tolist()
+            if i < len(self.canvas_lines):
+                canvas.coords(self.canvas_lines[i], positions)
+                continue
+
+            line = canvas.create_line(
+                positions, width=self.width, fill=self.path_color,
+                capstyle=tkinter.ROUND, joinstyle=tkinter.ROUND, tag="path",
+            )
+            if self.command is not None:
+                canvas.tag_bind(line, "<Enter>", self.mouse_enter)
+                canvas.tag_bind(line, "<Leave>", self.mouse_leave)
+                canvas.tag_bind(line, "<Button-1>", self.click)
+            self.canvas_lines.append(line)
+
+        self.canvas_line = self.canvas_lines[0] if self.canvas_lines else None
+        self.map_widget.manage_z_order()
+
+    def delete(self):
+        for line in self.canvas_lines:
+            self.map_widget.canvas.delete(line)
+        self.canvas_lines = []
+        super().delete()
+
+
+def set_lod_path(map_widget, coords, **kwargs):
+    """Drop-in replacement for map_widget.set_path that takes the full-resolution coords."""
+    path = LodPath(map_widget, coords, **kwargs)
+    path.draw()
+    map_widget.canvas_path_list.append(path)
+    return path
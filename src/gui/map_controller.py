@@ -1,17 +1,30 @@
 import math
 from tkinter import messagebox
+from algorithms.dynamic_route import DynamicRoute
 from core.map import Map
-from core.map_diagnostics import check_connectivity, find_valid_endpoints
+from core.road_edits import road_edits
+from core.map_diagnostics import check_connectivity
+from core.edge_snapping import VIRTUAL_START, VIRTUAL_GOAL
+from core.tile_store import TileStore, is_mbtiles_file
+from gui.map_loader import MapLoadJob
+from gui.route_repair import RouteRepairJob
+from gui.tile_prefetch import TilePrefetchJob
+from gui.lod_path import set_lod_path
+
+PREFETCH_ZOOMS = (10, 14)  # tiles "Save map tiles for offline use" stores for the loaded region
 
 
 class MapController:
     def __init__(self, map_widget):
         self.map_widget = map_widget
         self.map = Map()
+        self.tile_store = TileStore(map_widget.database_path, map_widget.tile_server)
 
         # State
         self.start_node = None
         self.goal_node = None
+        self.start_snap = None  # EdgeSnap when the endpoint was clicked onto a road
+        self.goal_snap = None
         self.click_mode = "start"  # 'start' or 'goal'
 
         # Markers
@@ -19,30 +32,69 @@ class MapController:
         self.goal_marker = None
         self.debug_markers = []
         self.current_paths = []
+        self.edit_paths = []  # closed (red) and slowed (orange) roads
+
+        # Route kept current across road edits, for the endpoints and profile in route_key
+        self.route = None
+        self.route_key = None
+        self.route_path = None
+        self.publish_job = None  # RouteRepairJob of the last edit or traffic feed
+        self.prefetch_job = None  # TilePrefetchJob, at most one at a time
 
     def load_map(self, location, force_download=False):
+        self.stop_prefetch()
+        if is_mbtiles_file(location):
+            count = self.tile_store.import_mbtiles(location)
+            return True, f"Imported {count:,} map tiles"
+
         success, msg = self.map.load_map(location, force_download)
 
         if success:
-            # Center view on first node
-            center = self.map.node_keys[0]
-            lat, lon = self.map.get_node_coords(center)
-            self.map_widget.set_position(lat, lon)
-            self.map_widget.set_zoom(12)
+            self.show_loaded_map()
 
         return success, msg
 
-    def find_nearest_node(self, lat, lon):
-        min_dist = float('inf')
-        nearest = None
-
-        for node_id in self.map.node_keys:
-            n_lat, n_lon = self.map.get_node_coords(node_id)
-            dist = self._haversine_distance(lat, lon, n_lat, n_lon)
-            if dist < min_dist:
-                min_dist = dist
-                nearest = node_id
+    def load_map_async(self, location, force_download=False):
+        """Start loading on a worker thread; the caller polls the returned MapLoadJob."""
+        # Tiles of the previous region are no longer wanted
+        self.stop_prefetch()
+        return MapLoadJob(self.map, location, force_download, self.tile_store).start()
+
+    def show_loaded_map(self):
+        # Center view on first node
+        center = int(self.map.node_keys[0])
+        lat, lon = self.map.get_node_coords(center)
+        self.map_widget.set_position(lat, lon)
+        self.map_widget.set_zoom(12)
+
+    @property
+    def is_prefetching(self):
+        return self.prefetch_job is not None and self.prefetch_job.is_running
+
+    def prefetch_tiles(self, min_zoom, max_zoom):
+        """
+        Download the loaded region's missing tiles for a zoom range into the
+        tile store. Returns (True, TilePrefetchJob) for the caller to poll, or
+        (False, message).
+        """
+        if self.map.compiled is None:
+            return False, "Please load a map first!"
+        if self.map_widget.use_database_only:
+            return False, "Tile downloads are off (PATHFINDER_OFFLINE_TILES=1)"
+        if self.is_prefetching:
+            return False, "⏳ Still saving map tiles, try again when it finishes"
+
+        coords = self.map.compiled.coords
+        bounds = (*coords.min(axis=0), *coords.max(axis=0))
+        self.prefetch_job = TilePrefetchJob(self.tile_store, bounds, min_zoom, max_zoom).start()
+        return True, self.prefetch_job
+
+    def stop_prefetch(self):
+        if self.is_prefetching:
+            self.prefetch_job.cancel()
 
+    def find_nearest_node(self, lat, lon):
+        nearest, _ = self.map.nearest_node(lat, lon)
         return nearest
 
     def handle_map_click(self, coords, debug_mode=False):
@@ -59,16 +111,15 @@ class MapController:
             )
             self.debug_markers.append(click_marker)
 
-        # Find nearest node
-        nearest_node = self.find_nearest_node(lat, lon)
+        # Snap to the closest point on a road
+        snap = self.map.snap_to_edge(lat, lon)
 
-        if not nearest_node:
+        if not snap:
             if click_marker and not debug_mode:
                 click_marker.delete()
-            return False, "Could not find nearest road node!"
+            return False, "Could not find nearest road!"
 
-        node_lat, node_lon = self.map.get_node_coords(nearest_node)
-        snap_distance = self._haversine_distance(lat, lon, node_lat, node_lon)
+        snap_distance = snap.distance_km
 
         # Warn if far from road
         if snap_distance > 1.0:
@@ -85,10 +136,13 @@ class MapController:
         if click_marker and not debug_mode:
             click_marker.delete()
 
+        # The search starts/ends on the snap point; the nearest usable node stands in for diagnostics
         if self.click_mode == "start":
-            return self._set_start(nearest_node, node_lat, node_lon, snap_distance)
+            self.start_snap = snap
+            return self._set_start(snap.nearest_exit(), snap.lat, snap.lon, snap_distance)
         else:
-            return self._set_goal(nearest_node, node_lat, node_lon, snap_distance)
+            self.goal_snap = snap
+            return self._set_goal(snap.nearest_entry(), snap.lat, snap.lon, snap_distance)
 
     def _set_start(self, node_id, lat, lon, snap_distance):
         self.start_node = node_id
@@ -124,7 +178,10 @@ class MapController:
             marker_color_outside="darkred",
         )
 
-        s_lat, s_lon = self.map.get_node_coords(self.start_node)
+        if self.start_snap:
+            s_lat, s_lon = self.start_snap.lat, self.start_snap.lon
+        else:
+            s_lat, s_lon = self.map.get_node_coords(self.start_node)
         straight_dist = self._haversine_distance(s_lat, s_lon, lat, lon)
 
         status = "✅ Goal set"
@@ -141,6 +198,7 @@ class MapController:
 
         import random
         self.start_node, self.goal_node = self.map.get_random_endpoints()
+        self.start_snap = self.goal_snap = None
         self._update_markers()
 
         # Calculate distance
@@ -154,13 +212,17 @@ class MapController:
         if not self.map.graph:
             return False, "No map loaded"
 
-        start, goal, attempts = find_valid_endpoints(self.map.graph)
+        if self.map.sampler is None:
+            return False, "⏳ Still indexing the map, try again in a moment"
+
+        start, goal = self.map.sampler.sample_one()
 
         if not start or not goal:
             return False, "Could not find connected points"
 
         self.start_node = start
         self.goal_node = goal
+        self.start_snap = self.goal_snap = None
         self._update_markers()
 
         # Calculate distance
@@ -168,7 +230,7 @@ class MapController:
         g_pos = self.map.get_node_coords(self.goal_node)
         dist = self._haversine_distance(s_pos[0], s_pos[1], g_pos[0], g_pos[1])
 
-        return True, f"✅ Connected points found (attempt {attempts}) | Distance: {dist:.2f} km"
+        return True, f"✅ Connected points found | Distance: {dist:.2f} km"
 
     def _update_markers(self):
         if self.start_marker:
@@ -194,16 +256,110 @@ class MapController:
             marker_color_outside="darkred",
         )
 
+    def search_endpoints(self):
+        """(start, goal, snaps) for a search; clicked endpoints become virtual nodes on their edge."""
+        start, goal, snaps = self.start_node, self.goal_node, {}
+        if self.start_snap:
+            start = VIRTUAL_START
+            snaps[start] = self.start_snap
+        if self.goal_snap:
+            goal = VIRTUAL_GOAL
+            snaps[goal] = self.goal_snap
+        return start, goal, snaps
+
+    def edit_road_at(self, coords, closed=None, factor=None, profile=None):
+        """
+        Close/reopen or re-weight the road nearest a point (both ways on a
+        two-way road). Like the other updates, returns (True, RouteRepairJob)
+        for the caller to poll, or (False, message).
+        """
+        snap = self.map.snap_to_edge(*coords)
+        if not snap:
+            return False, "Could not find nearest road!"
+        edits = road_edits(snap.u, snap.v, snap.two_way, closed, factor)
+        return self._publish(lambda: self.map.apply_edits(edits), "🚧", profile)
+
+    def reopen_all_roads(self, profile=None):
+        return self._publish(self.map.clear_edits, "🚧", profile)
+
+    def ingest_traffic(self, path, profile=None):
+        """Publish the speeds of a traffic snapshot CSV and repair the route on them."""
+        return self._publish(lambda: self.map.ingest_traffic(path), "🚦", profile)
+
+    @property
+    def is_publishing(self):
+        return self.publish_job is not None and self.publish_job.is_running
+
+    def _publish(self, update, icon, profile):
+        # One update at a time, since each repairs the same route
+        if self.is_publishing:
+            return False, "⏳ Still applying the previous update, try again in a moment"
+        self.publish_job = RouteRepairJob(update, icon, self._current_route(profile)).start()
+        return True, self.publish_job
+
+    def show_repaired_route(self, job, path):
+        # Skipped when the route was cleared or replaced while repairing
+        if job.route is not None and job.route is self.route:
+            self._draw_route(path, job.route.snaps)
+
+    def _current_route(self, profile):
+        if not self.start_node or not self.goal_node:
+            return None
+
+        start, goal, snaps = self.search_endpoints()
+        key = (start, goal, id(self.start_snap), id(self.goal_snap), profile, id(self.map.compiled))
+        if self.route is None or key != self.route_key:
+            self._drop_route()
+            self.route, self.route_key = DynamicRoute(self.map, start, goal, snaps, profile), key
+        return self.route
+
+    def _drop_route(self):
+        # A route still being repaired is left to the worker and the garbage collector
+        if self.route is not None and not self.is_publishing:
+            self.route.close()
+        self.route = self.route_key = None
+
+    def _draw_route(self, path, snaps):
+        if self.route_path is not None:
+            self.route_path.delete()
+            self.route_path = None
+
+        coords = self.map.get_path_coords(path, snaps)
+        if len(coords) > 1:
+            self.route_path = set_lod_path(self.map_widget, coords, color="magenta", width=5)
+
+    def draw_road_edits(self):
+        for path in self.edit_paths:
+            path.delete()
+        self.edit_paths.clear()
+
+        drawn = set()
+        for u, v, closed, factor in self.map.edited_roads():
+            if (v, u) in drawn:
+                continue
+            drawn.add((u, v))
+            color = "red" if closed else "orange"
+            self.edit_paths.append(set_lod_path(self.map_widget, self.map.get_path_coords([u, v]), color=color, width=7))
+
     def check_path_exists(self):
         """Check if path exists between start and goal."""
         if not self.start_node or not self.goal_node:
             return False, None
 
-        return check_connectivity(self.map.graph, self.start_node, self.goal_node)
+        # Until the background indexing finishes, let the search itself find out
+        if self.map.connectivity is None:
+            return True, None
+
+        return check_connectivity(
+            self.map.connectivity, self.start_node, self.goal_node, self.start_snap, self.goal_snap
+        )
 
     def clear_paths(self):
         self.map_widget.delete_all_path()
         self.current_paths.clear()
+        self.route_path = None
+        self.edit_paths.clear()
+        self.draw_road_edits()
 
     def clear_all(self):
         self.map_widget.delete_all_marker()
@@ -212,8 +368,14 @@ class MapController:
         self.goal_marker = None
         self.current_paths.clear()
         self.debug_markers.clear()
+        self.route_path = None
+        self._drop_route()
+        self.edit_paths.clear()
+        self.draw_road_edits()
         self.start_node = None
         self.goal_node = None
+        self.start_snap = None
+        self.goal_snap = None
         self.click_mode = "start"
 
     def _haversine_distance(self, lat1, lon1, lat2, lon2):
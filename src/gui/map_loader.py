@@ -0,0 +1,76 @@
+import queue
+import threading
+
+from core.tile_store import is_mbtiles_file
+
+
+class MapLoadJob:
+    """
+    Loads a map on a worker thread; the Tk thread polls for its events.
+
+    Events are ("progress", stage, message) while loading, then
+    ("loaded", success, message) once the map can be shown and clicked, and
+    ("indexed", success, message) once the search graph, connectivity and
+    stats are built. An .mbtiles file only produces ("tiles", success, message).
+    Cancelling takes effect at the next stage boundary and ends the job with
+    ("cancelled", message) in place of the stage it stopped.
+    """
+
+    def __init__(self, map, location, force_download=False, tile_store=None):
+        self.map = map
+        self.location = location
+        self.force_download = force_download
+        self.tile_store = tile_store
+
+        self.events = queue.Queue()
+        self.cancelled = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def cancel(self):
+        self.cancelled.set()
+
+    @property
+    def is_running(self):
+        return self.thread.is_alive()
+
+    def poll(self):
+        """Every event queued since the last poll, oldest first."""
+        events = []
+        while True:
+            try:
+                events.append(self.events.get_nowait())
+            except queue.Empty:
+                return events
+
+    def _progress(self, stage, message):
+        self.events.put(("progress", stage, message))
+
+    def _run(self):
+        if is_mbtiles_file(self.location):
+            self._progress("read", "Importing map tiles")
+            try:
+                count = self.tile_store.import_mbtiles(self.location)
+                self.events.put(("tiles", True, f"Imported {count:,} map tiles"))
+            except Exception as e:
+                self.events.put(("tiles", False, f"Error importing tiles: {str(e)}"))
+            return
+
+        success, msg = self.map.load_map(
+            self.location, self.force_download, self._progress, self.cancelled, defer_indexes=True
+        )
+        if not success and self.cancelled.is_set():
+            self.events.put(("cancelled", msg))
+            return
+        self.events.put(("loaded", success, msg))
+        if not success:
+            return
+
+        success, index_msg = self.map.build_indexes(self._progress, self.cancelled)
+        if not success and self.cancelled.is_set():
+            self.events.put(("cancelled", index_msg))
+            return
+        self.events.put(("indexed", success, index_msg))
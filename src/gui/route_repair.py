@@ -0,0 +1,69 @@
+import queue
+import threading
+import time
+
+
+class RouteRepairJob:
+    """
+    Publishes a weight update and repairs the current route on a worker
+    thread; the Tk thread polls for its events.
+
+    Events are ("published", success, message) once the update is applied,
+    then, when there is a route, ("repaired", path, message). A route not
+    planned yet is planned before the update, so that its repair stays
+    incremental.
+    """
+
+    def __init__(self, update, icon, route=None):
+        self.update = update  # () -> (success, message), e.g. Map.apply_edits
+        self.icon = icon
+        self.route = route  # DynamicRoute or None
+
+        self.events = queue.Queue()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    @property
+    def is_running(self):
+        return self.thread.is_alive()
+
+    def poll(self):
+        """Every event queued since the last poll, oldest first."""
+        events = []
+        while True:
+            try:
+                events.append(self.events.get_nowait())
+            except queue.Empty:
+                return events
+
+    def _run(self):
+        try:
+            if self.route is not None and self.route.planner is None:
+                self.route.repair()
+            success, msg = self.update()
+        except Exception as e:
+            self.events.put(("published", False, f"Error applying update: {str(e)}"))
+            return
+
+        self.events.put(("published", success, f"{self.icon} {msg}" if success else msg))
+        if not success or self.route is None:
+            return
+
+        start_time = time.perf_counter()
+        try:
+            path, expanded = self.route.repair()
+        except Exception as e:
+            self.events.put(("repaired", [], f"{self.icon} {msg} | ❌ Route repair failed: {str(e)}"))
+            return
+        duration = (time.perf_counter() - start_time) * 1000
+
+        if not path:
+            self.events.put(("repaired", path, f"{self.icon} {msg} | ❌ No route left between start and goal"))
+        else:
+            self.events.put((
+                "repaired", path,
+                f"{self.icon} {msg} | 🔁 Route repaired in {duration:.1f} ms ({expanded:,} nodes re-expanded)",
+            ))
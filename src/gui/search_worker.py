@@ -0,0 +1,178 @@
+import queue
+import threading
+import time
+
+from algorithms import SearchStats, run_algorithm
+from core.graph_view import NodeCoords
+from gui.frame_scheduler import FrameScheduler
+
+EVENT_QUEUE_SIZE = 256  # the worker blocks once the GUI falls this many events behind
+EMIT_WAIT_S = 0.05  # how often a worker blocked on a full queue checks for cancellation
+COMPARE_PAUSE_S = 0.5  # pause between algorithms when animating a comparison
+
+
+class SearchJob:
+    """
+    Runs one or more searches on a worker thread; the Tk thread polls for events.
+
+    Per algorithm the events are ("started", name), then one ("explored",
+    name, [(lat, lon), ...]) batch per animation frame while animating, then
+    ("finished", result) with the result dict of AlgorithmExecutor plus the
+    path "coords" and its "cost" under the weight profile (and "stats", a
+    SearchStats, when instrumented). A final ("done", results) ends the
+    job. Every search of a job runs on the weight snapshot that was current
+    when it started, whatever is published meanwhile. Cancelling sets a
+    token the algorithms check every step, so a running search returns at
+    its next expansion; from then on events that do not fit in the queue
+    are dropped.
+    """
+
+    def __init__(self, map, algo_names, start, goal, snaps, colors, animate=False, rate=None, compress=False, instrument=False,
+                 profile=None):
+        self.map = map
+        self.algo_names = algo_names
+        self.start_node = start
+        self.goal_node = goal
+        self.snaps = snaps
+        self.colors = colors
+        self.animate = animate
+        self.rate = rate  # animated expansions per second, None for as fast as possible
+        self.compress = compress
+        self.instrument = instrument
+        self.profile = profile  # weight profile name, None for length
+        self.snapshot = None  # pinned by _run
+
+        self.events = queue.Queue(maxsize=EVENT_QUEUE_SIZE)
+        self.cancelled = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def cancel(self):
+        self.cancelled.set()
+
+    @property
+    def is_running(self):
+        return self.thread.is_alive()
+
+    def poll(self):
+        """Every event queued since the last poll, oldest first."""
+        events = []
+        while True:
+            try:
+                events.append(self.events.get_nowait())
+            except queue.Empty:
+                return events
+
+    def _emit(self, event):
+        # Blocks while the GUI catches up, but once cancelled nobody may be reading:
+        # the remaining events are dropped rather than waited on
+        while not self.cancelled.is_set():
+            try:
+                self.events.put(event, timeout=EMIT_WAIT_S)
+                return
+            except queue.Full:
+                pass
+        try:
+            self.events.put_nowait(event)
+        except queue.Full:
+            pass
+
+    def _run(self):
+        compiled = self.map.compiled
+        self.snapshot = compiled.snapshot if compiled is not None else None
+
+        results = []
+        for i, name in enumerate(self.algo_names):
+            if self.cancelled.is_set():
+                break
+            if self.animate and i > 0:
+                time.sleep(COMPARE_PAUSE_S)
+
+            self._emit(("started", name))
+            result = self._search(name, self.colors[i % len(self.colors)])
+            results.append(result)
+            self._emit(("finished", result))
+
+        self._emit(("done", results))
+
+    def _search(self, name, color):
+        result = {
+            "name": name,
+            "time_ms": 0,
+            "visited": 0,
+            "length_km": None,
+            "path_nodes": 0,
+            "color": color,
+            "profile": self.profile,
+            "cost": None,
+            "success": False,
+            "coords": None,
+        }
+
+        # Coordinates of its own for the virtual endpoints: a cancelled search still
+        # winding down would otherwise pop them from under the next one
+        graph = self.map.graph
+        node_coords = NodeCoords(graph)
+
+        callback = None
+        if self.animate:
+            pending = []
+            frames = FrameScheduler(self.rate)
+
+            def animation_callback(current_node, visited_set):
+                pending.append(node_coords[current_node])
+                if frames.tick():
+                    self._emit(("explored", name, pending[:]))
+                    pending.clear()
+            callback = animation_callback
+
+        stats = SearchStats() if self.instrument else None
+
+        start_time = time.perf_counter()
+        try:
+            path, visited = run_algorithm(
+                name,
+                graph,
+                self.start_node,
+                self.goal_node,
+                node_coords,
+                callback=callback,
+                search_graph=self.map.search_graph if self.compress else None,
+                snaps=self.snaps,
+                cancel=self.cancelled,
+                stats=stats,
+                profile=self.profile,
+                snapshot=self.snapshot,
+            )
+        except Exception as e:
+            result["error"] = str(e)
+            return result
+
+        duration = (time.perf_counter() - start_time) * 1000
+
+        if self.animate and pending:
+            self._emit(("explored", name, pending[:]))
+
+        if self.cancelled.is_set():
+            result["error"] = "Cancelled"
+            return result
+
+        result["time_ms"] = duration
+        result["visited"] = visited
+        if stats is not None:
+            result["stats"] = stats
+
+        if path:
+            coords = self.map.get_path_coords(path, self.snaps)
+            if coords:
+                result["coords"] = coords
+                result["length_km"] = self.map.get_path_length(path, self.snaps) / 1000
+                if self.profile:
+                    result["cost"] = self.map.get_path_weight(path, self.profile, self.snaps, self.snapshot)
+                result["path_nodes"] = len(path)
+                result["success"] = True
+
+        return result
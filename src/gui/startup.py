@@ -0,0 +1,55 @@
+import importlib
+import threading
+import tkinter as tk
+from tkinter import messagebox
+
+# Imported before the main window is built (the window module and the map widget)
+WINDOW_MODULES = ("numpy", "PIL.ImageTk", "tkintermapview", "gui.window")
+# Only needed once a map is read or searched; warmed up after the window is shown
+BACKGROUND_MODULES = ("networkx", "osmnx")
+POLL_MS = 20
+
+
+def preload(modules):
+    """Import modules on a daemon thread; returns the thread, whose `error` is the ImportError that stopped it."""
+    def run():
+        for name in modules:
+            try:
+                importlib.import_module(name)
+            except ImportError as e:
+                print(f"⚠️ Preloading {name} failed: {e}")
+                thread.error = e
+                return
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.error = None
+    thread.start()
+    return thread
+
+
+def start(root, build_window):
+    """
+    Draw a splash frame at once, import the window's modules in the
+    background, then call build_window(root) on the Tk thread and warm up
+    the map-loading modules. If one of the window's modules fails to import,
+    the error is shown and re-raised on the Tk thread instead.
+    """
+    splash = tk.Label(root, text="🗺️ Real-World Pathfinding Visualizer\n\nStarting...", font=("Segoe UI", 14))
+    splash.grid(row=0, column=0)
+    root.update_idletasks()
+
+    loader = preload(WINDOW_MODULES)
+
+    def poll():
+        if loader.is_alive():
+            root.after(POLL_MS, poll)
+            return
+        splash.destroy()
+        if loader.error is not None:
+            messagebox.showerror("Startup failed", f"{loader.error}\n\nInstall the requirements: pip install -r requirements.txt")
+            root.destroy()
+            raise loader.error
+        build_window(root)
+        preload(BACKGROUND_MODULES)
+
+    root.after(POLL_MS, poll)
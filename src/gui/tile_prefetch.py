@@ -0,0 +1,63 @@
+import queue
+import threading
+
+
+class TilePrefetchJob:
+    """
+    Pre-fetches a region's map tiles into the tile store on a worker thread;
+    the Tk thread polls for its events.
+
+    The job ends with ("prefetched", success, message), or ("cancelled",
+    message) when cancel() stopped it. Cancelling takes effect once the
+    batch of tiles being downloaded is stored.
+    """
+
+    def __init__(self, tile_store, bounds, min_zoom, max_zoom):
+        self.tile_store = tile_store
+        self.bounds = bounds  # (min_lat, min_lon, max_lat, max_lon)
+        self.min_zoom = min_zoom
+        self.max_zoom = max_zoom
+
+        self.events = queue.Queue()
+        self.cancelled = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def cancel(self):
+        self.cancelled.set()
+
+    @property
+    def is_running(self):
+        return self.thread.is_alive()
+
+    def poll(self):
+        """Every event queued since the last poll, oldest first."""
+        events = []
+        while True:
+            try:
+                events.append(self.events.get_nowait())
+            except queue.Empty:
+                return events
+
+    def _run(self):
+        try:
+            stored, failed = self.tile_store.prefetch(
+                self.bounds, self.min_zoom, self.max_zoom, cancel=self.cancelled
+            )
+        except ValueError as e:
+            self.events.put(("prefetched", False, f"Map too large to save offline: {e}"))
+            return
+        except Exception as e:
+            self.events.put(("prefetched", False, f"Error saving map tiles: {str(e)}"))
+            return
+
+        msg = f"Saved {stored:,} map tiles for offline use"
+        if failed:
+            msg += f" | {failed:,} failed"
+        if self.cancelled.is_set():
+            self.events.put(("cancelled", f"Tile download stopped | {msg}"))
+        else:
+            self.events.put(("prefetched", True, msg))
@@ -1,6 +1,11 @@
+import os
 import tkinter as tk
 from tkinter import ttk
 import tkintermapview
+from core.tile_store import TileStore, TileImageCache
+
+# Serve tiles only from the local store (air-gapped machines); set PATHFINDER_OFFLINE_TILES=1
+OFFLINE_TILES = os.environ.get("PATHFINDER_OFFLINE_TILES") == "1"
 
 class UIBuilder:
 
@@ -9,11 +14,13 @@ class UIBuilder:
         map_frame = tk.Frame(parent)
         map_frame.grid(row=0, column=0, sticky="nsew", padx=10, pady=10)
 
-        map_widget = tkintermapview.TkinterMapView(map_frame, corner_radius=0)
-        map_widget.set_tile_server(
-            "https://mt0.google.com/vt/lyrs=m&hl=en&x={x}&y={y}&z={z}&s=Ga",
-            max_zoom=22,
+        # Tiles are read from the local store first; the widget only asks the server for missing ones
+        tile_store = TileStore()
+        map_widget = tkintermapview.TkinterMapView(
+            map_frame, corner_radius=0, database_path=tile_store.path, use_database_only=OFFLINE_TILES
         )
+        map_widget.set_tile_server(tile_store.server, max_zoom=tile_store.max_zoom)
+        map_widget.tile_image_cache = TileImageCache()
         map_widget.pack(fill="both", expand=True)
 
         return map_widget
@@ -42,6 +49,14 @@ class UIBuilder:
         reload_btn.grid(row=0, column=2, padx=5, pady=5)
         widgets["reload_btn"] = reload_btn
 
+        cancel_load_btn = ttk.Button(
+            controls, text="⏹ Cancel",
+            command=callbacks.get("on_cancel_load"),
+            state="disabled"
+        )
+        cancel_load_btn.grid(row=0, column=3, padx=5, pady=5)
+        widgets["cancel_load_btn"] = cancel_load_btn
+
         # Row 1: Algorithm Selection & Mode
         ttk.Label(controls, text="🧠 Algorithm:").grid(
             row=1, column=0, sticky="w", pady=5
@@ -67,6 +82,22 @@ class UIBuilder:
         if callbacks.get("on_algo_change"):
             algo_box.bind("<<ComboboxSelected>>", callbacks["on_algo_change"])
 
+        from core.weight_profiles import DEFAULT_PROFILE, PROFILES
+
+        ttk.Label(algo_frame, text="⚖️ Weight:").pack(side="left", padx=(10, 5))
+        profile_var = tk.StringVar(value=DEFAULT_PROFILE)
+        profile_box = ttk.Combobox(
+            algo_frame,
+            textvariable=profile_var,
+            values=list(PROFILES),
+            state="readonly",
+            width=12,
+            postcommand=callbacks.get("on_profiles"),
+        )
+        profile_box.pack(side="left")
+        widgets["profile_var"] = profile_var
+        widgets["profile_box"] = profile_box
+
         mode_label = ttk.Label(
             algo_frame, text="Mode: Setting START 🟢", foreground="green"
         )
@@ -141,6 +172,22 @@ class UIBuilder:
         debug_check.pack(side="left", padx=5)
         widgets["debug_var"] = debug_var
 
+        compress_var = tk.BooleanVar(value=True)
+        ttk.Checkbutton(
+            options_frame,
+            text="🔗 Compress road chains for UCS/A* (skip degree-2 nodes)",
+            variable=compress_var,
+        ).pack(side="left", padx=5)
+        widgets["compress_var"] = compress_var
+
+        instrument_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            options_frame,
+            text="🔬 Search counters",
+            variable=instrument_var,
+        ).pack(side="left", padx=5)
+        widgets["instrument_var"] = instrument_var
+
         # Row 4: Action Buttons
         btn_frame = ttk.Frame(controls)
         btn_frame.grid(row=4, column=0, columnspan=4, pady=10, sticky="ew")
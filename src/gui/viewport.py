@@ -0,0 +1,59 @@
+import numpy as np
+
+from core.polyline import TILE_SIZE
+
+
+class Viewport:
+    """
+    Snapshot of what the map widget shows, in zoom-0 Mercator pixels.
+
+    Everything drawn on the map keeps its geometry in zoom-0 pixels
+    (core.polyline.to_mercator_px); this turns those into canvas positions the
+    same way CanvasPath.get_canvas_pos does, and answers what is on screen.
+    """
+
+    def __init__(self, map_widget):
+        self.zoom = round(map_widget.zoom)
+        self.width = int(map_widget.width)
+        self.height = int(map_widget.height)
+        self.upper_left = np.asarray(map_widget.upper_left_tile_pos, dtype=np.float64)
+        self.lower_right = np.asarray(map_widget.lower_right_tile_pos, dtype=np.float64)
+
+        # canvas pixels per zoom-0 pixel, per axis
+        tiles_per_px0 = 2.0 ** self.zoom / TILE_SIZE
+        self.scale = tiles_per_px0 * np.array([self.width, self.height]) / (self.lower_right - self.upper_left)
+        self.origin = self.upper_left / tiles_per_px0
+
+    @property
+    def key(self):
+        """Changes whenever the mapping to the canvas changes."""
+        return self.zoom, tuple(self.upper_left), tuple(self.lower_right), self.width, self.height
+
+    def to_canvas(self, px):
+        return (np.asarray(px) - self.origin) * self.scale
+
+    def bounds(self, margin: float = 0.0):
+        """(low, high) corners of the visible area in zoom-0 pixels, grown by `margin` canvas pixels."""
+        low = self.origin - margin / self.scale
+        high = self.origin + (np.array([self.width, self.height]) + margin) / self.scale
+        return low, high
+
+    def visible_runs(self, canvas_xy, margin: float = 0.0):
+        """
+        [(start, end)] slices of a polyline (canvas coordinates) whose segments
+        touch the viewport grown by `margin`; each slice is drawn as one line.
+        """
+        if len(canvas_xy) < 2:
+            return []
+        a, b = canvas_xy[:-1], canvas_xy[1:]
+        lo, hi = np.minimum(a, b), np.maximum(a, b)
+        visible = (
+            (hi[:, 0] >= -margin) & (lo[:, 0] <= self.width + margin)
+            & (hi[:, 1] >= -margin) & (lo[:, 1] <= self.height + margin)
+        )
+
+        # Boundaries of runs of consecutive visible segments; segment i spans points i..i+1
+        edges = np.diff(np.concatenate([[0], visible.astype(np.int8), [0]]))
+        starts = np.flatnonzero(edges == 1)
+        ends = np.flatnonzero(edges == -1) + 1
+        return list(zip(starts.tolist(), ends.tolist()))
@@ -1,12 +1,18 @@
 import tkinter as tk
-from tkinter import messagebox
+from tkinter import filedialog, messagebox
 
 from algorithms import COMPARE_MODE
-from gui.map_controller import MapController
+from gui.map_controller import MapController, PREFETCH_ZOOMS
 from gui.algorithm_executor import AlgorithmExecutor
 from gui.ui_builder import UIBuilder
-from core.map_diagnostics import get_graph_stats, format_diagnostic_report
+from core.map_diagnostics import format_diagnostic_report
+from core.weight_profiles import DEFAULT_PROFILE
 
+LOAD_POLL_MS = 50
+# Animated expansions per second; a 100k-node search takes 10 s on "Fast"
+ANIMATION_SPEEDS = {"Slow": 100, "Medium": 1_000, "Fast": 10_000, "Instant": None}
+LOAD_STAGES = {"read": "1/5", "parse": "2/5", "compile": "3/5", "index": "4/5", "stats": "5/5"}
+SLOWDOWN_FACTOR = 3.0  # weight multiplier for "Slow down road here"
 
 class PathfinderWindow:
     def __init__(self, root):
@@ -17,8 +23,11 @@ class PathfinderWindow:
         self.root.grid_rowconfigure(0, weight=1)
         self.root.grid_columnconfigure(0, weight=1)
 
+        self.load_job = None
+
         self._setup_ui()
 
+        self.root.protocol("WM_DELETE_WINDOW", self._on_close)
         self.root.after(100, self._initial_load)
 
     def _setup_ui(self):
@@ -29,52 +38,139 @@ class PathfinderWindow:
 
         callbacks = {
             "on_reload_map": self._on_reload_map,
+            "on_cancel_load": self._on_cancel_load,
             "on_randomize": self._on_randomize,
             "on_smart_randomize": self._on_smart_randomize,
             "on_diagnose": self._on_diagnose,
             "on_run": self._on_run_pathfinding,
             "on_clear_paths": self._on_clear_paths,
             "on_clear_all": self._on_clear_all,
+            "on_profiles": self._refresh_profiles,
         }
 
         self.controls, self.widgets = UIBuilder.create_controls_panel(
             self.root, callbacks
         )
 
+        # Live road edits from the map's right-click menu
+        self.map_widget.add_right_click_menu_command("🚧 Close road here", self._on_close_road, pass_coords=True)
+        self.map_widget.add_right_click_menu_command("🐢 Slow down road here", self._on_slow_road, pass_coords=True)
+        self.map_widget.add_right_click_menu_command("✅ Reopen all roads", self._on_reopen_roads)
+        self.map_widget.add_right_click_menu_command("🚦 Load traffic speeds (CSV)...", self._on_load_traffic)
+        self.map_widget.add_right_click_menu_command("🧱 Save map tiles for offline use", self._on_prefetch_tiles)
+
         self._set_status("👋 Welcome! Loading map...")
 
     def _initial_load(self):
         self._load_map(force=False)
 
     def _load_map(self, force=False):
+        self.algo_exec.stop_execution()
+        if self.load_job and self.load_job.is_running:
+            self.load_job.cancel()
+
         location = self.widgets["location_entry"].get()
         self._set_status(f"⏳ Loading {location}...")
-        self.root.update()
 
-        success, msg = self.map_ctrl.load_map(location, force)
+        for name in ("run_btn", "random_btn", "smart_random_btn", "diagnose_btn"):
+            self.widgets[name].config(state="disabled")
+        self.widgets["cancel_load_btn"].config(state="normal")
 
-        if success:
-            self.widgets["run_btn"].config(state="normal")
-            self.widgets["random_btn"].config(state="normal")
-            self.widgets["smart_random_btn"].config(state="normal")
-            self.widgets["diagnose_btn"].config(state="normal")
+        self.load_job = self.map_ctrl.load_map_async(location, force)
+        self.root.after(LOAD_POLL_MS, self._poll_load, self.load_job)
+
+    def _poll_load(self, job):
+        # A newer load replaced this one; its events are stale
+        if job is not self.load_job:
+            return
 
-            self.map_widget.add_left_click_map_command(self._on_map_click)
+        for kind, *event in job.poll():
+            if kind == "progress":
+                stage, message = event
+                self._set_status(f"⏳ [{LOAD_STAGES.get(stage, stage)}] {message}...")
+            elif kind == "tiles":
+                self._on_tiles_imported(*event)
+            elif kind == "loaded":
+                self._on_map_loaded(*event)
+            elif kind == "indexed":
+                self._on_map_indexed(*event)
+            elif kind == "cancelled":
+                self._set_status(f"⏹ {event[0]}")
+                self._enable_map_controls()
+
+        if job.is_running or not job.events.empty():
+            self.root.after(LOAD_POLL_MS, self._poll_load, job)
+        else:
+            self.widgets["cancel_load_btn"].config(state="disabled")
 
-            stats = get_graph_stats(self.map_ctrl.map.graph)
-            status = (
-                f"✅ {msg} | "
-                f"Nodes: {stats['nodes']:,} | "
-                f"Edges: {stats['edges']:,} | "
-                f"Components: {stats['weak_components']}"
-            )
-            if stats['weak_components'] > 1:
-                status += " ⚠️"
+    def _enable_map_controls(self):
+        # A failed or cancelled load leaves the previous map installed and searchable
+        map = self.map_ctrl.map
+        if map.compiled is None:
+            return
+        self.widgets["run_btn"].config(state="normal")
+        self.widgets["random_btn"].config(state="normal")
+        if map.sampler is not None:
+            self.widgets["smart_random_btn"].config(state="normal")
+            self.widgets["diagnose_btn"].config(state="normal")
 
-            self._set_status(status)
+    def _on_tiles_imported(self, success, msg):
+        self._enable_map_controls()
+        if success:
+            self._set_status(f"✅ {msg}")
         else:
+            self._set_status("❌ Tile import failed")
+            messagebox.showerror("Error", msg)
+
+    def _on_map_loaded(self, success, msg):
+        if not success:
+            self._enable_map_controls()
             self._set_status("❌ Load failed")
             messagebox.showerror("Error", msg)
+            return
+
+        # Endpoints and paths belong to the previous graph
+        self._do_clear_all()
+        self.map_ctrl.show_loaded_map()
+        self._refresh_profiles()
+
+        self._enable_map_controls()
+        self.map_widget.add_left_click_map_command(self._on_map_click)
+
+        self._set_status(
+            f"✅ {msg} | Nodes: {len(self.map_ctrl.map.node_keys):,} | ⏳ Indexing..."
+        )
+
+    def _on_map_indexed(self, success, msg):
+        if not success:
+            self._set_status(f"⚠️ {msg}")
+            return
+
+        self._enable_map_controls()
+
+        stats = self.map_ctrl.map.stats
+        status = (
+            f"✅ Map ready | "
+            f"Nodes: {stats['nodes']:,} | "
+            f"Edges: {stats['edges']:,} | "
+            f"Components: {stats['weak_components']}"
+        )
+        if stats['weak_components'] > 1:
+            status += " ⚠️"
+
+        self._set_status(status)
+
+    def _refresh_profiles(self):
+        # Read when the list opens, so profiles added with Map.add_profile show up too
+        profiles = list(self.map_ctrl.map.profiles)
+        self.widgets["profile_box"].configure(values=profiles)
+        if self.widgets["profile_var"].get() not in profiles:
+            self.widgets["profile_var"].set(DEFAULT_PROFILE)
+
+    def _on_cancel_load(self):
+        if self.load_job and self.load_job.is_running:
+            self.load_job.cancel()
+            self._set_status("⏹ Cancelling after the current step...")
 
     def _on_reload_map(self):
         self._load_map(force=True)
@@ -97,6 +193,94 @@ class PathfinderWindow:
             if "cancelled" not in msg.lower():
                 messagebox.showerror("Error", msg)
 
+    def _on_close_road(self, coords):
+        self._edit_road(coords, closed=True)
+
+    def _on_slow_road(self, coords):
+        self._edit_road(coords, factor=SLOWDOWN_FACTOR)
+
+    def _on_reopen_roads(self):
+        self._edit_road(None)
+
+    def _edit_road(self, coords, **change):
+        if not self.map_ctrl.map.graph:
+            messagebox.showwarning("Warning", "Please load a map first!")
+            return
+
+        profile = self.widgets["profile_var"].get()
+        if coords is None:
+            self._watch_publish(*self.map_ctrl.reopen_all_roads(profile))
+        else:
+            self._watch_publish(*self.map_ctrl.edit_road_at(coords, profile=profile, **change))
+
+    def _on_load_traffic(self):
+        if not self.map_ctrl.map.graph:
+            messagebox.showwarning("Warning", "Please load a map first!")
+            return
+
+        path = filedialog.askopenfilename(
+            title="Traffic snapshot", filetypes=[("CSV (u, v, speed_kph)", "*.csv"), ("All files", "*.*")]
+        )
+        if not path:
+            return
+
+        self._set_status("⏳ Ingesting traffic speeds...")
+        self._watch_publish(*self.map_ctrl.ingest_traffic(path, self.widgets["profile_var"].get()))
+
+    def _on_prefetch_tiles(self):
+        success, job = self.map_ctrl.prefetch_tiles(*PREFETCH_ZOOMS)
+        if not success:
+            messagebox.showwarning("Warning", job)
+            return
+
+        self._set_status(f"🧱 Saving map tiles (zoom {PREFETCH_ZOOMS[0]}-{PREFETCH_ZOOMS[1]})...")
+        self.root.after(LOAD_POLL_MS, self._poll_prefetch, job)
+
+    def _poll_prefetch(self, job):
+        for kind, *event in job.poll():
+            if kind == "prefetched":
+                success, msg = event
+                if success:
+                    self._set_status(f"🧱 {msg}")
+                else:
+                    messagebox.showerror("Error", msg)
+            elif kind == "cancelled":
+                self._set_status(f"⏹ {event[0]}")
+
+        if job.is_running or not job.events.empty():
+            self.root.after(LOAD_POLL_MS, self._poll_prefetch, job)
+
+    def _on_close(self):
+        # Worker threads are told to stop; the tile downloader's pool would otherwise hold up exit
+        self.map_ctrl.stop_prefetch()
+        if self.load_job and self.load_job.is_running:
+            self.load_job.cancel()
+        self.algo_exec.stop_execution()
+        self.root.destroy()
+
+    def _watch_publish(self, success, job):
+        if not success:
+            messagebox.showerror("Error", job)
+            return
+        self.root.after(LOAD_POLL_MS, self._poll_publish, job)
+
+    def _poll_publish(self, job):
+        for kind, *event in job.poll():
+            if kind == "published":
+                success, msg = event
+                if not success:
+                    messagebox.showerror("Error", msg)
+                    continue
+                self.map_ctrl.draw_road_edits()
+                self._set_status(msg)
+            elif kind == "repaired":
+                path, msg = event
+                self.map_ctrl.show_repaired_route(job, path)
+                self._set_status(msg)
+
+        if job.is_running or not job.events.empty():
+            self.root.after(LOAD_POLL_MS, self._poll_publish, job)
+
     def _on_randomize(self):
         success, msg = self.map_ctrl.randomize_endpoints()
         self._set_status(msg)
@@ -121,7 +305,7 @@ class PathfinderWindow:
             messagebox.showwarning("Warning", "Please load a map first!")
             return
 
-        stats = get_graph_stats(self.map_ctrl.map.graph)
+        stats = self.map_ctrl.map.stats
 
         if self.map_ctrl.start_node and self.map_ctrl.goal_node:
             is_connected, diagnostic = self.map_ctrl.check_path_exists()
@@ -165,65 +349,59 @@ class PathfinderWindow:
             return
 
         animate = self.widgets["animate_var"].get()
-        speed_delays = {
-            "Slow": 0.1,
-            "Medium": 0.05,
-            "Fast": 0.000001,    #This is still slow for most dists ;(
-            "Instant": 0.0
-        }
-        delay = speed_delays.get(self.widgets["speed_var"].get(), 0.0)
+        rate = ANIMATION_SPEEDS.get(self.widgets["speed_var"].get())
 
         algo = self.widgets["algorithm_var"].get()
         self.map_ctrl.clear_paths()
         self.root.update()
 
+        compress = self.widgets["compress_var"].get()
+        instrument = self.widgets["instrument_var"].get()
+        profile = self.widgets["profile_var"].get()
+
         if algo == COMPARE_MODE:
-            self._run_comparison(animate, delay)
+            self._run_comparison(animate, rate, compress, instrument, profile)
         else:
-            self._run_single(algo, animate, delay)
+            self._run_single(algo, animate, rate, compress, instrument, profile)
 
-    def _run_single(self, algo_name, animate=False, delay=0.0):
+    def _run_single(self, algo_name, animate=False, rate=None, compress=False, instrument=False, profile=None):
         self._set_status(f"🔄 Running {algo_name}...")
-        self.root.update()
-
-        result = self.algo_exec.run_single_algorithm(
+        self.algo_exec.run_single_algorithm(
             algo_name,
+            self._on_search_done,
             animate=animate,
-            delay=delay
+            rate=rate,
+            compress=compress,
+            instrument=instrument,
+            profile=profile,
         )
-        formatted = AlgorithmExecutor.format_results([result])
-        self._set_status(formatted)
 
-    def _run_comparison(self, animate=False, delay=0.0):
+    def _run_comparison(self, animate=False, rate=None, compress=False, instrument=False, profile=None):
         self._set_status("🔄 Running comparison...")
-        self.root.update()
+        self.algo_exec.run_comparison(
+            self._on_search_done, animate=animate, rate=rate, compress=compress, instrument=instrument,
+            profile=profile,
+        )
 
-        results = self.algo_exec.run_comparison(animate=animate, delay=delay)
-        formatted = AlgorithmExecutor.format_results(results)
-        self._set_status(formatted)
+    def _on_search_done(self, results):
+        self._set_status(AlgorithmExecutor.format_results(results))
 
     def _on_clear_paths(self):
-        if self.algo_exec.is_running:
-            self.algo_exec.stop_execution()
-            self.root.after(100, lambda: self._do_clear_paths())
-        else:
-            self._do_clear_paths()
+        self.algo_exec.stop_execution()
+        self._do_clear_paths()
 
     def _do_clear_paths(self):
         self.map_ctrl.clear_paths()
-        self.algo_exec._clear_visited_markers()
+        self.algo_exec.clear_exploration()
         self._set_status("🧹 Paths cleared")
 
     def _on_clear_all(self):
-        if self.algo_exec.is_running:
-            self.algo_exec.stop_execution()
-            self.root.after(100, lambda: self._do_clear_all())
-        else:
-            self._do_clear_all()
+        self.algo_exec.stop_execution()
+        self._do_clear_all()
 
     def _do_clear_all(self):
         self.map_ctrl.clear_all()
-        self.algo_exec._clear_visited_markers()
+        self.algo_exec.clear_exploration()
         self.widgets["mode_label"].config(
             text="Mode: Setting START 🟢", foreground="green"
         )
@@ -0,0 +1,117 @@
+import argparse
+import contextlib
+import json
+import sys
+
+from benchmarks.harness import DEFAULT_METRIC, FAILURE_COUNTS, MIN_DELTA_MS, compare, missing_stages
+from benchmarks.import_profile import profile_imports
+from benchmarks.suite import run_suite
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Offline routing benchmarks with baseline regression checks")
+    parser.add_argument("--region", action="append", default=[],
+                        help="cached location or local .osm/.osm.pbf extract (repeatable)")
+    parser.add_argument("--synthetic", type=int, action="append", default=[],
+                        help="node count of a synthetic road network (repeatable)")
+    parser.add_argument("--algorithm", action="append", help="algorithm to run (default: all)")
+    parser.add_argument("--queries", type=int, default=40)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--load-repeat", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=10.0, help="seconds per search before it is cancelled")
+    parser.add_argument("--compress", action="store_true", help="run UCS and A* on the chain-compressed graph")
+    parser.add_argument("--profile", default="length", help="weight profile the searches minimise, e.g. travel_time")
+    parser.add_argument("--output", help="write the JSON report here (default: stdout)")
+    parser.add_argument("--baseline", help="compare against this JSON report")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="allowed slowdown, e.g. 0.1 = 10%%")
+    parser.add_argument("--stage-tolerance", action="append", default=[], metavar="STAGE=FRACTION",
+                        help="per-stage override, e.g. search:DFS=0.3")
+    parser.add_argument("--metric", default=DEFAULT_METRIC,
+                        help="summary field compared with the baseline (best_p50_ms: median of each query's fastest round)")
+    parser.add_argument("--min-delta-ms", type=float, default=MIN_DELTA_MS,
+                        help="a stage slower by less than this is never a regression")
+    parser.add_argument("--imports", action="append", default=[], metavar="MODULE",
+                        help="profile the import time of this module, e.g. gui.window (repeatable)")
+    parser.add_argument("--import-budget-ms", type=float, help="fail when an --imports module takes longer")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    graphs = {f"region:{r}": ("region", r) for r in args.region}
+    graphs.update({f"synthetic:{n}": ("synthetic", n) for n in args.synthetic})
+    if not graphs and not args.imports:
+        graphs = {"synthetic:10000": ("synthetic", 10_000)}
+
+    # Stdout carries only the JSON report; map loading's progress goes to stderr with the rest
+    with contextlib.redirect_stdout(sys.stderr):
+        report = run_suite(
+            graphs,
+            algorithms=args.algorithm,
+            queries=args.queries,
+            seed=args.seed,
+            warmup=args.warmup,
+            repeat=args.repeat,
+            load_repeat=args.load_repeat,
+            timeout_s=args.timeout,
+            compress=args.compress,
+            profile=args.profile,
+        )
+    if args.imports:
+        report["imports"] = {module: profile_imports(module) for module in args.imports}
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+        print(f"💾 Report written to {args.output}", file=sys.stderr)
+    else:
+        print(text)
+
+    status = 0
+    for module, profile in report.get("imports", {}).items():
+        heaviest = ", ".join(f"{p['name']} {p['self_ms']:.0f}" for p in profile["packages"][:5])
+        print(f"📦 import {module}: {profile['total_ms']:.0f} ms ({heaviest})", file=sys.stderr)
+        if args.import_budget_ms is not None and profile["total_ms"] > args.import_budget_ms:
+            print(f"❌ import {module} is over the {args.import_budget_ms:.0f} ms budget", file=sys.stderr)
+            status = 1
+
+    if not args.baseline:
+        return status
+
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+
+    overrides = {}
+    for item in args.stage_tolerance:
+        stage, _, value = item.rpartition("=")
+        overrides[stage] = float(value)
+
+    # Not failures, since a run may select fewer algorithms, but a dropped stage would otherwise pass unnoticed
+    for graph, stage in missing_stages(report, baseline):
+        print(f"⚠️ {graph}: stage '{stage}' is in the baseline but was not measured", file=sys.stderr)
+
+    regressions = compare(report, baseline, args.tolerance, overrides, args.metric, args.min_delta_ms)
+    if not regressions:
+        print(f"✅ No regressions beyond {args.tolerance:.0%} ({args.metric})", file=sys.stderr)
+        return status
+
+    unit = "ms" if args.metric.endswith("_ms") else "/s"
+    print(f"❌ {len(regressions)} regression(s) ({args.metric}):", file=sys.stderr)
+    for graph, stage, field, base, value, ratio in regressions:
+        if field in FAILURE_COUNTS:
+            print(f"   {graph:<28} {stage:<16} {base:10,} → {value:10,} {field}", file=sys.stderr)
+        elif value is None:
+            print(f"   {graph:<28} {stage:<16} {base:10.2f} → {'none':>10} {unit}  (every query timed out or failed)",
+                  file=sys.stderr)
+        else:
+            print(f"   {graph:<28} {stage:<16} {base:10.2f} → {value:10.2f} {unit}  ({ratio - 1:+.0%} slower)",
+                  file=sys.stderr)
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
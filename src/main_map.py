@@ -1,7 +1,18 @@
 import tkinter as tk
-from gui.window import PathfinderWindow
+from gui import startup
+
+
+def build_window(root):
+    from gui.window import PathfinderWindow
+    root.app = PathfinderWindow(root)
+
 
 if __name__ == "__main__":
     root = tk.Tk()
-    app = PathfinderWindow(root)
+    root.title("🗺️ Real-World Pathfinding Visualizer")
+    root.geometry("1400x850")
+    root.grid_rowconfigure(0, weight=1)
+    root.grid_columnconfigure(0, weight=1)
+
+    startup.start(root, build_window)
     root.mainloop()
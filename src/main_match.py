@@ -0,0 +1,59 @@
+import argparse
+import csv
+import sys
+import time
+from collections import deque
+
+from core.map import Map
+from core.map_matching import read_traces_csv
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Batch map-matching of GPS traces onto a road network")
+    parser.add_argument("location", help="cached location or local .osm/.osm.pbf extract")
+    parser.add_argument("traces", help="CSV of fixes with trace_id, lat and lon columns, one trace's rows in time order")
+    parser.add_argument("--output", required=True, help="CSV of matched node paths (trace_id, piece, seq, node_id)")
+    parser.add_argument("--workers", type=int, help="worker processes (default: one per CPU)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    m = Map()
+    success, msg = m.load_map(args.location)
+    if not success:
+        print(f"❌ {msg}")
+        return 1
+
+    # The matcher sees the fixes only; results come back in order, each after its trace was read
+    pending = deque()
+
+    def traces():
+        for trace_id, fixes in read_traces_csv(args.traces):
+            pending.append((trace_id, len(fixes)))
+            yield fixes
+
+    start = time.perf_counter()
+    count = points = matched = 0
+    with open(args.output, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["trace_id", "piece", "seq", "node_id"])
+        for result in m.match_traces(traces(), args.workers):
+            trace_id, size = pending.popleft()
+            for piece, path in enumerate(result.paths):
+                writer.writerows((trace_id, piece, seq, node) for seq, node in enumerate(path))
+            count += 1
+            points += size
+            matched += result.matched
+
+    duration = time.perf_counter() - start
+    print(
+        f"✅ Matched {count:,} traces ({matched:,}/{points:,} fixes on a road) in {duration:.1f} s "
+        f"| {points / max(duration, 1e-9):,.0f} fixes/s → {args.output}"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,28 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+
+@pytest.fixture(scope="session")
+def make_road_map(tmp_path_factory):
+    """
+    make_road_map(num_nodes, seed) -> a Map of that synthetic road network,
+    indexed and with its region cache in a temporary directory. Each call
+    returns a fresh Map; the generated graph is shared between calls.
+    """
+    from core.map import Map
+    from core.synthetic_roads import synthetic_graph
+
+    graphs = {}
+
+    def make(num_nodes, seed):
+        if (num_nodes, seed) not in graphs:
+            graphs[num_nodes, seed] = synthetic_graph(num_nodes, seed)
+        m = Map(data_dir=str(tmp_path_factory.mktemp("data")))
+        m.load_graph(graphs[num_nodes, seed])
+        return m
+
+    return make
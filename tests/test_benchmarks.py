@@ -0,0 +1,55 @@
+import math
+
+from benchmarks.harness import best_of_rounds, compare, summarize
+
+
+def _report(**stages):
+    return {"graphs": {"synthetic:1000": {"stages": stages}}}
+
+
+def _search(ms, timeouts=0, errors=0):
+    summary = summarize([ms / 1000] * 5 if ms is not None else [])
+    summary.update(timeouts=timeouts, errors=errors)
+    return summary
+
+
+def test_slower_median_beyond_tolerance():
+    baseline = _report(**{"search:UCS": _search(5.0), "search:BFS": _search(5.0)})
+    current = _report(**{"search:UCS": _search(5.2), "search:BFS": _search(6.0)})
+
+    assert [r[:3] for r in compare(current, baseline, 0.1)] == [("synthetic:1000", "search:BFS", "best_p50_ms")]
+    assert compare(current, baseline, 0.1, {"search:BFS": 0.5}) == []
+
+
+def test_stage_that_always_times_out_regresses():
+    baseline = _report(**{"search:UCS": _search(5.0)})
+    current = _report(**{"search:UCS": _search(None, timeouts=5)})
+
+    regressions = {r[2]: r for r in compare(current, baseline)}
+    assert regressions["best_p50_ms"][4] is None and math.isinf(regressions["best_p50_ms"][5])
+    assert regressions["timeouts"][3:5] == (0, 5)
+
+
+def test_more_errors_regress_even_when_faster():
+    baseline = _report(**{"search:DFS": _search(5.0, errors=1)})
+
+    assert [r[2:5] for r in compare(_report(**{"search:DFS": _search(4.0, errors=2)}), baseline)] == [("errors", 1, 2)]
+    assert compare(_report(**{"search:DFS": _search(4.0, errors=1)}), baseline) == []
+
+
+def test_small_time_differences_are_noise():
+    baseline = _report(snap=_search(0.2), geometry=_search(2.0))
+    current = _report(snap=_search(0.4), geometry=_search(3.0))
+
+    assert [r[1] for r in compare(current, baseline)] == ["geometry"]
+    assert compare(current, baseline, min_delta_ms=2.0) == []
+    assert [r[1] for r in compare(current, baseline, min_delta_ms=0.0)] == ["snap", "geometry"]
+
+
+def test_best_p50_takes_each_item_fastest_round():
+    # Two rounds over three items; the second round is slowed down by a noisy neighbour
+    samples = [0.001, 0.002, 0.003, 0.004, 0.0015, 0.009]
+    summary = summarize(samples, best=best_of_rounds(samples, 3))
+
+    assert summary["best_p50_ms"] == 1.5
+    assert summary["p50_ms"] > summary["best_p50_ms"]
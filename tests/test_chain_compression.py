@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+from algorithms import COMPRESSIBLE, run_algorithm
+from core.edge_snapping import VIRTUAL_START, VIRTUAL_GOAL
+from core.road_edits import road_edits
+
+
+@pytest.fixture
+def road_map(make_road_map):
+    return make_road_map(3000, 17)
+
+
+def _close_random_roads(m, count, seed):
+    c = m.compiled
+    rng = np.random.default_rng(seed)
+    edits = []
+    for e in rng.choice(c.num_edges, count, replace=False).tolist():
+        u, v = int(c.node_ids[c.edge_sources[e]]), int(c.target_ids[e])
+        edits.extend(road_edits(u, v, c.edge_ids([c.index_of(v)], [c.index_of(u)])[0] >= 0, closed=True))
+    assert m.apply_edits(edits)[0]
+
+
+def _random_snaps(m, rng):
+    low, high = m.compiled.coords.min(axis=0), m.compiled.coords.max(axis=0)
+    return {VIRTUAL_START: m.snap_to_edge(*rng.uniform(low, high)), VIRTUAL_GOAL: m.snap_to_edge(*rng.uniform(low, high))}
+
+
+def _assert_same_routes(m, queries, profile):
+    for start, goal, snaps in queries:
+        for name in COMPRESSIBLE:
+            plain, _ = run_algorithm(name, m.graph, start, goal, m.node_coords, snaps=snaps, profile=profile)
+            compressed, _ = run_algorithm(name, m.graph, start, goal, m.node_coords, snaps=snaps, profile=profile,
+                                          search_graph=m.search_graph)
+
+            assert bool(compressed) == bool(plain), (name, start, goal)
+            if not plain:
+                continue
+            assert compressed[0] == start and compressed[-1] == goal
+            # Ties may pick another route, but never a dearer or broken one
+            cost = m.get_path_weight(compressed, profile, snaps)
+            assert cost == pytest.approx(m.get_path_weight(plain, profile, snaps), rel=1e-9), (name, start, goal)
+            assert np.isfinite(cost)
+            # Every real edge of the expanded path is open; the legs to virtual endpoints are split edges
+            assert all(v in m.graph.neighbors(u) for u, v in zip(compressed, compressed[1:]) if u >= 0 and v >= 0)
+
+
+def test_compression_shrinks_the_graph(road_map):
+    compressed = road_map.search_graph
+    assert compressed.num_nodes < road_map.compiled.num_nodes
+
+
+@pytest.mark.parametrize("profile", ["length", "travel_time"])
+@pytest.mark.parametrize("closed", [0, 150])
+def test_node_queries_match_the_full_graph(road_map, profile, closed):
+    if closed:
+        _close_random_roads(road_map, closed, seed=closed)
+    starts, goals, _ = road_map.sampler.sample(40, seed=5)
+    _assert_same_routes(road_map, [(s, g, None) for s, g in zip(starts.tolist(), goals.tolist())], profile)
+
+
+@pytest.mark.parametrize("profile", ["length", "travel_time"])
+@pytest.mark.parametrize("closed", [0, 150])
+def test_snapped_queries_match_the_full_graph(road_map, profile, closed):
+    if closed:
+        _close_random_roads(road_map, closed, seed=closed + 1)
+    rng = np.random.default_rng(9)
+    _assert_same_routes(road_map, [(VIRTUAL_START, VIRTUAL_GOAL, _random_snaps(road_map, rng)) for _ in range(40)],
+                        profile)
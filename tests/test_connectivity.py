@@ -0,0 +1,145 @@
+from types import SimpleNamespace
+
+import networkx as nx
+import numpy as np
+import pytest
+
+import core.connectivity as connectivity
+from algorithms import run_algorithm
+from core.connectivity import ConnectivityIndex, component_labels
+from core.edge_snapping import VIRTUAL_START, VIRTUAL_GOAL
+from core.map import Map
+from core.map_diagnostics import check_connectivity
+from core.synthetic_roads import synthetic_graph
+
+
+@pytest.fixture(scope="module")
+def road_map(make_road_map):
+    return make_road_map(3000, 5)
+
+
+def _digraph(indptr, indices, n):
+    g = nx.DiGraph()
+    g.add_nodes_from(range(n))
+    g.add_edges_from((u, int(v)) for u in range(n) for v in indices[indptr[u]:indptr[u + 1]])
+    return g
+
+
+def _partition(labels):
+    groups = {}
+    for node, label in enumerate(labels.tolist()):
+        groups.setdefault(label, set()).add(node)
+    return sorted(map(sorted, groups.values()))
+
+
+def _search(m, start, goal, snaps=None):
+    return bool(run_algorithm("BFS", m.graph, start, goal, m.node_coords, snaps=snaps)[0])
+
+
+def _snap_on(m, u, v, fraction):
+    """A snap at `fraction` along u → v, found by snapping to a point on the straight segment."""
+    (lat_u, lon_u), (lat_v, lon_v) = m.get_node_coords(u), m.get_node_coords(v)
+    return m.snap_to_edge(lat_u + (lat_v - lat_u) * fraction, lon_u + (lon_v - lon_u) * fraction)
+
+
+def test_node_reachability_matches_search(road_map):
+    c = road_map.compiled
+    rng = np.random.default_rng(1)
+    for s, g in rng.integers(0, c.num_nodes, (200, 2)).tolist():
+        start, goal = int(c.node_ids[s]), int(c.node_ids[g])
+        assert check_connectivity(road_map.connectivity, start, goal)[0] == _search(road_map, start, goal)
+
+
+def test_snapped_reachability_matches_search(road_map):
+    c = road_map.compiled
+    rng = np.random.default_rng(2)
+    low, high = c.coords.min(axis=0), c.coords.max(axis=0)
+    for _ in range(100):
+        start_snap = road_map.snap_to_edge(*rng.uniform(low, high))
+        goal_snap = road_map.snap_to_edge(*rng.uniform(low, high))
+        snaps = {VIRTUAL_START: start_snap, VIRTUAL_GOAL: goal_snap}
+        connected, _ = check_connectivity(
+            road_map.connectivity, start_snap.nearest_exit(), goal_snap.nearest_entry(), start_snap, goal_snap
+        )
+        assert connected == _search(road_map, VIRTUAL_START, VIRTUAL_GOAL, snaps)
+
+
+def test_both_endpoints_on_one_way_edge(road_map):
+    c = road_map.compiled
+    one_way = next(
+        (int(c.node_ids[c.edge_sources[e]]), int(c.target_ids[e]))
+        for e in range(c.num_edges)
+        if c.edge_ids([c.index_of(int(c.target_ids[e]))], [c.edge_sources[e]])[0] < 0
+    )
+    first, second = _snap_on(road_map, *one_way, 0.3), _snap_on(road_map, *one_way, 0.7)
+    assert (first.u, first.v) == (second.u, second.v) == one_way
+
+    for start_snap, goal_snap in ((first, second), (second, first)):
+        snaps = {VIRTUAL_START: start_snap, VIRTUAL_GOAL: goal_snap}
+        connected, _ = check_connectivity(
+            road_map.connectivity, start_snap.nearest_exit(), goal_snap.nearest_entry(), start_snap, goal_snap
+        )
+        assert connected == _search(road_map, VIRTUAL_START, VIRTUAL_GOAL, snaps)
+
+
+def _random_csr(seed, n, m):
+    """CSR arrays of a random sparse digraph, with many small strong components."""
+    rng = np.random.default_rng(seed)
+    sources, targets = rng.integers(0, n, (2, m))
+    order = np.argsort(sources, kind="stable")
+    indptr = np.concatenate([[0], np.cumsum(np.bincount(sources, minlength=n))])
+    return SimpleNamespace(indptr=indptr, indices=targets[order], edge_sources=sources[order], num_nodes=n)
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_component_labels_match_networkx(seed):
+    csr = _random_csr(seed, 400, 500)
+    g = _digraph(csr.indptr, csr.indices, csr.num_nodes)
+
+    (scc, num_strong), (wcc, num_weak) = component_labels(csr.indptr, csr.indices, csr.num_nodes)
+
+    assert _partition(scc) == sorted(map(sorted, nx.strongly_connected_components(g)))
+    assert _partition(wcc) == sorted(map(sorted, nx.weakly_connected_components(g)))
+    assert (num_strong, num_weak) == (nx.number_strongly_connected_components(g), nx.number_weakly_connected_components(g))
+    # Reverse topological numbering: condensation edges go from higher labels to lower ones
+    assert all(scc[u] >= scc[v] for u, v in g.edges)
+
+
+@pytest.mark.parametrize("bitsets", [True, False])
+def test_reachability_index_matches_networkx(monkeypatch, bitsets):
+    if not bitsets:
+        monkeypatch.setattr(connectivity, "BITSET_MAX_COMPONENTS", 0)
+    csr = _random_csr(4, 2000, 2600)
+    index = ConnectivityIndex(csr)
+    assert (index.closure is not None) == bitsets
+
+    g = _digraph(csr.indptr, csr.indices, csr.num_nodes)
+    rng = np.random.default_rng(3)
+    for source in rng.integers(0, csr.num_nodes, 40).tolist():
+        reached = nx.descendants(g, source) | {source}
+        targets = rng.integers(0, csr.num_nodes, 50)
+        expected = [t in reached for t in targets.tolist()]
+        assert index.reaches_many(np.full(len(targets), source), targets).tolist() == expected
+        assert [index.reaches(source, t) for t in targets.tolist()] == expected
+
+
+def test_labels_round_trip(road_map, tmp_path):
+    index = road_map.connectivity
+    path = str(tmp_path / "components.npz")
+    index.save_labels(path, "abc")
+
+    (scc, num_strong), (wcc, num_weak) = ConnectivityIndex.load_labels(path, "abc")
+    assert np.array_equal(scc, index.scc) and np.array_equal(wcc, index.wcc)
+    assert (num_strong, num_weak) == (index.num_strong, index.num_weak)
+    assert ConnectivityIndex.load_labels(path, "other") is None
+    assert ConnectivityIndex.load_labels(str(tmp_path / "missing.npz"), "abc") is None
+
+
+def test_stats_count_parallel_edges(tmp_path):
+    graph = synthetic_graph(500, 2)
+    u, v, data = next(iter(graph.edges(data=True)))
+    graph.add_edge(u, v, **dict(data, length=data["length"] + 5.0))
+
+    m = Map(data_dir=str(tmp_path))
+    m.load_graph(graph)
+    assert m.stats["edges"] == graph.number_of_edges() == m.compiled.num_edges + 1
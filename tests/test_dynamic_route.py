@@ -0,0 +1,85 @@
+import random
+
+import pytest
+
+from algorithms import ALGORITHMS, run_algorithm
+from algorithms.dynamic_route import DynamicRoute
+from core.edge_snapping import VIRTUAL_START, VIRTUAL_GOAL
+from core.road_edits import road_edits
+from core.utils import reconstruct_path
+
+
+@pytest.fixture
+def road_map(make_road_map):
+    return make_road_map(3000, 3)
+
+
+def _cost(m, path, profile, snaps=None):
+    return round(m.get_path_weight(path, profile, snaps), 6)
+
+
+def _road(m, u, v, closed=None, factor=None):
+    c = m.compiled
+    return road_edits(u, v, c.edge_ids([c.index_of(v)], [c.index_of(u)])[0] >= 0, closed, factor)
+
+
+def test_reconstruct_path_of_unreached_goal():
+    assert reconstruct_path({1: None, 2: 1}, 3) == []
+    assert reconstruct_path({1: None, 2: 1}, 2) == [1, 2]
+
+
+def test_closing_only_edges_to_goal(road_map):
+    s, g = road_map.sampler.sample_one(seed=1)
+    route = DynamicRoute(road_map, s, g, profile="length")
+    assert route.repair()[0]
+
+    ok, _ = road_map.apply_edits([edit for p in set(road_map.graph.predecessors(g)) for edit in road_edits(p, g, False, closed=True)])
+    assert ok
+
+    assert route.repair()[0] == []
+    for name in ALGORITHMS:
+        assert run_algorithm(name, road_map.graph, s, g, road_map.node_coords)[0] == [], name
+
+
+def test_closing_snapped_edge(road_map):
+    c = road_map.compiled
+    s, _ = road_map.sampler.sample_one(seed=2)
+    (lat0, lon0), (lat1, lon1) = c.coords.min(0), c.coords.max(0)
+    snaps = {VIRTUAL_GOAL: road_map.snap_to_edge((lat0 + lat1) / 2, (lon0 + lon1) / 2)}
+    snap = snaps[VIRTUAL_GOAL]
+    route = DynamicRoute(road_map, s, VIRTUAL_GOAL, snaps, "length")
+    assert route.repair()[0]
+
+    road_map.apply_edits(road_edits(snap.u, snap.v, snap.two_way, closed=True))
+
+    assert route.repair()[0] == []
+    assert run_algorithm("A*", road_map.graph, s, VIRTUAL_GOAL, road_map.node_coords, snaps=snaps)[0] == []
+
+
+@pytest.mark.parametrize("profile", ["length", "travel_time"])
+def test_repair_matches_fresh_search(road_map, profile):
+    rng = random.Random(profile)
+    closed = set()
+    for trial in range(3):
+        s, g = road_map.sampler.sample_one(seed=trial)
+        route = DynamicRoute(road_map, s, g, profile=profile)
+        path, _ = route.repair()
+
+        for step in range(5):
+            if len(path) < 2:
+                break
+            i = rng.randrange(len(path) - 1)
+            if step % 2:
+                edits = _road(road_map, path[i], path[i + 1], factor=4.0)
+            else:
+                edits = _road(road_map, path[i], path[i + 1], closed=True)
+                closed.update((e.u, e.v) for e in edits)
+            assert road_map.apply_edits(edits)[0]
+
+            path, _ = route.repair()
+            fresh, _ = run_algorithm("UCS", road_map.graph, s, g, road_map.node_coords, profile=profile)
+            assert bool(path) == bool(fresh)
+            if path:
+                assert _cost(road_map, path, profile) == _cost(road_map, fresh, profile)
+                assert not closed & set(zip(path, path[1:]))
+        route.close()
@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from core.compiled_graph import CompiledGraph
+from core.connectivity import ConnectivityIndex
+from core.endpoint_sampler import EndpointSampler
+from core.spatial_index import haversine_km
+from core.synthetic_roads import synthetic_graph
+
+
+@pytest.fixture(scope="module")
+def road_map(make_road_map):
+    return make_road_map(3000, 13)
+
+
+def test_seeded_samples_repeat(road_map):
+    first = road_map.sampler.sample(50, 0.5, 2.0, seed=7)
+    again = road_map.sampler.sample(50, 0.5, 2.0, seed=7)
+
+    assert all(np.array_equal(a, b) for a, b in zip(first, again))
+    assert not np.array_equal(first[0], road_map.sampler.sample(50, 0.5, 2.0, seed=8)[0])
+
+
+@pytest.mark.parametrize("min_km, max_km", [(0.0, None), (0.3, 1.0), (1.0, 2.5)])
+def test_pairs_stay_in_the_band(road_map, min_km, max_km):
+    starts, goals, dist = road_map.sampler.sample(200, min_km, max_km, seed=1)
+    assert len(starts) == 200 and np.all(starts != goals)
+
+    coords = road_map.compiled.coords
+    a, b = coords[road_map.compiled.node_index(starts)], coords[road_map.compiled.node_index(goals)]
+    assert np.allclose(dist, haversine_km(a[:, 0], a[:, 1], b[:, 0], b[:, 1]))
+    assert np.all(dist >= min_km) and (max_km is None or np.all(dist <= max_km))
+
+
+def _with_island():
+    """A synthetic network plus a detached three-node ring of two-way roads, as a CompiledGraph."""
+    graph = synthetic_graph(3000, 13)
+    lat = max(y for _, y in graph.nodes(data="y")) + 0.05
+    lon = max(x for _, x in graph.nodes(data="x")) + 0.05
+    island = [10 ** 12 + i for i in range(3)]
+    for i, node in enumerate(island):
+        graph.add_node(node, y=lat + 0.001 * i, x=lon)
+    for a, b in zip(island, island[1:] + island[:1]):
+        graph.add_edge(a, b, length=111.0)
+        graph.add_edge(b, a, length=111.0)
+    return CompiledGraph.from_graph(graph), island
+
+
+def test_pairs_come_from_the_requested_component():
+    compiled, island = _with_island()
+    connectivity = ConnectivityIndex(compiled)
+    scc = connectivity.scc
+    largest = int(np.bincount(scc).argmax())
+    starts, goals, _ = EndpointSampler(compiled, connectivity).sample(100, seed=2)
+    assert np.all(scc[compiled.node_index(starts)] == largest)
+
+    label = int(scc[compiled.node_index(island[0])])
+    assert label != largest
+    starts, goals, _ = EndpointSampler(compiled, connectivity, component=label).sample(20, seed=3)
+    assert len(starts) == 20
+    assert set(starts) | set(goals) <= set(island)
+
+
+def test_unknown_component_is_refused(road_map):
+    with pytest.raises(ValueError):
+        EndpointSampler(road_map.compiled, road_map.connectivity, component=road_map.connectivity.num_strong)
@@ -0,0 +1,117 @@
+import numpy as np
+import pytest
+from tkintermapview.utility_functions import decimal_to_osm
+
+import gui.heatmap_overlay as heatmap_overlay
+from gui.heatmap_overlay import ExplorationHeatmap
+
+
+class FakeCanvas:
+    def __init__(self):
+        self.items = set()
+
+    def create_image(self, *args, **kwargs):
+        self.items.add(1)
+        return 1
+
+    def itemconfig(self, *args, **kwargs):
+        pass
+
+    def delete(self, item):
+        self.items.discard(item)
+
+
+class FakeMapWidget:
+    width, height = 800, 600
+
+    def __init__(self, lat, lon, zoom):
+        self.canvas = FakeCanvas()
+        self.canvas_polygon_list = []
+        self.show(lat, lon, zoom)
+
+    def show(self, lat, lon, zoom):
+        """Centre the view on a point."""
+        self.zoom = zoom
+        x, y = decimal_to_osm(lat, lon, zoom)
+        half_w, half_h = self.width / 512, self.height / 512
+        self.upper_left_tile_pos = (x - half_w, y - half_h)
+        self.lower_right_tile_pos = (x + half_w, y + half_h)
+
+    def manage_z_order(self):
+        pass
+
+
+@pytest.fixture(autouse=True)
+def no_photo_images(monkeypatch):
+    # PhotoImage needs a Tk display; the density grid is what is under test
+    monkeypatch.setattr(heatmap_overlay.ImageTk, "PhotoImage", lambda image: image)
+
+
+def _points(n, seed, spread=0.02):
+    rng = np.random.default_rng(seed)
+    return np.column_stack([rng.uniform(30 - spread, 30 + spread, n), rng.uniform(31 - spread, 31 + spread, n)])
+
+
+def test_point_lands_in_its_cell():
+    widget = FakeMapWidget(30.0, 31.0, 14)
+    heatmap = ExplorationHeatmap(widget)
+    heatmap.add(30.0, 31.0)
+    heatmap.flush(force=True)
+
+    rows, cols = -(-widget.height // heatmap.cell_px), -(-widget.width // heatmap.cell_px)
+    density = heatmap.density.reshape(rows, cols)
+    assert density.sum() == 1
+    row, col = np.argwhere(density)[0]
+    assert abs(col * heatmap.cell_px - widget.width / 2) <= heatmap.cell_px
+    assert abs(row * heatmap.cell_px - widget.height / 2) <= heatmap.cell_px
+    assert np.asarray(heatmap.image)[..., 3].any()
+
+
+def test_incremental_frames_match_one_rebin():
+    points = _points(5000, 1)
+    widget = FakeMapWidget(30.0, 31.0, 14)
+
+    incremental = ExplorationHeatmap(widget)
+    for batch in np.array_split(points, 10):
+        incremental.add_many(batch)
+        incremental.flush(force=True)
+    for lat, lon in _points(100, 2):
+        incremental.add(lat, lon)
+    incremental.flush(force=True)
+
+    single = ExplorationHeatmap(widget)
+    single.add_many(np.vstack([points, _points(100, 2)]))
+    single.flush(force=True)
+
+    assert np.array_equal(incremental.density, single.density)
+
+
+def test_panned_view_reads_only_visible_buckets(monkeypatch):
+    widget = FakeMapWidget(30.0, 31.0, 16)
+    heatmap = ExplorationHeatmap(widget)
+    heatmap.add_many(_points(50000, 3, spread=0.5))
+    heatmap.flush(force=True)
+
+    widget.show(30.01, 31.02, 16)
+    heatmap.draw(move=True)
+    culled = heatmap.density.copy()
+
+    monkeypatch.setattr(heatmap_overlay, "MAX_BUCKET_ROWS", -1)
+    heatmap.view = None
+    heatmap.draw()
+    assert culled.sum() > 0
+    assert np.array_equal(culled, heatmap.density)
+
+
+def test_clear_and_delete_remove_the_image():
+    widget = FakeMapWidget(30.0, 31.0, 14)
+    heatmap = ExplorationHeatmap(widget)
+    heatmap.add_many(_points(10, 4))
+    heatmap.flush(force=True)
+    assert widget.canvas.items
+
+    heatmap.clear()
+    assert not widget.canvas.items and heatmap.canvas_image is None
+
+    heatmap.delete()
+    assert heatmap not in widget.canvas_polygon_list
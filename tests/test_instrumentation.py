@@ -0,0 +1,67 @@
+import importlib
+
+import pytest
+
+from algorithms import ALGORITHMS, SearchStats, run_algorithm
+from core.road_edits import road_edits
+
+
+@pytest.fixture(scope="module")
+def road_map(make_road_map):
+    m = make_road_map(2000, 9)
+    s, _ = m.sampler.sample_one(seed=0)
+    # A closed road, so the counts must skip closed edges
+    m.apply_edits(road_edits(s, m.graph.neighbors(s)[0], False, closed=True))
+    return m
+
+
+@pytest.mark.parametrize("name", list(ALGORITHMS))
+@pytest.mark.parametrize("compress", [False, True])
+def test_stats_leave_the_search_unchanged(road_map, name, compress):
+    search_graph = road_map.search_graph if compress else None
+    for seed in range(3):
+        s, g = road_map.sampler.sample_one(seed=seed)
+        plain = run_algorithm(name, road_map.graph, s, g, road_map.node_coords, search_graph=search_graph)
+        stats = SearchStats()
+        counted = run_algorithm(name, road_map.graph, s, g, road_map.node_coords, search_graph=search_graph, stats=stats)
+
+        assert counted == plain
+        assert stats.expansions > 0 and stats.edges_scanned >= stats.expansions - 1
+
+
+@pytest.mark.parametrize("name", ["BFS", "DFS", "UCS", "A*"])
+def test_edges_scanned_are_the_expanded_rows(road_map, name):
+    s, g = road_map.sampler.sample_one(seed=4)
+    expanded = []
+    stats = SearchStats()
+    run_algorithm(name, road_map.graph, s, g, road_map.node_coords,
+                  callback=lambda node, _: expanded.append(node), stats=stats)
+
+    # BFS and DFS report the goal when they reach it, without reading its edges
+    assert stats.edges_scanned == sum(len(road_map.graph.neighbors(node)) for node in expanded if node != g)
+
+
+def test_ids_pushes_count_its_frames(road_map, monkeypatch):
+    # The package re-exports the ids function under the module's name
+    ids = importlib.import_module("algorithms.ids")
+
+    frames = []
+    search = ids._depth_limited_search
+
+    def counted(*args, **kwargs):
+        frames.append(args[1])
+        return search(*args, **kwargs)
+
+    monkeypatch.setattr(ids, "_depth_limited_search", counted)
+    s, g = road_map.sampler.sample_one(seed=5)
+    stats = SearchStats()
+    ids.ids(road_map.graph, s, g, max_depth=12, stats=stats)
+    assert stats.pushes == len(frames)
+
+
+def test_ids_without_depth_finds_nothing(road_map):
+    ids = importlib.import_module("algorithms.ids")
+    s, g = road_map.sampler.sample_one(seed=6)
+    stats = SearchStats()
+    assert ids.ids(road_map.graph, s, g, max_depth=-1, stats=stats) == ([], 0)
+    assert stats.pushes == 0 and stats.discovered == 0
@@ -0,0 +1,112 @@
+import numpy as np
+import pytest
+
+from algorithms import run_algorithm
+from core.map_matching import MapMatcher, match_traces, read_traces_csv
+
+
+@pytest.fixture(scope="module")
+def road_map(make_road_map):
+    return make_road_map(3000, 7)
+
+
+@pytest.fixture
+def matcher(road_map):
+    return MapMatcher(road_map.compiled, road_map.segment_index)
+
+
+def _route(m, seed):
+    s, g = m.sampler.sample_one(seed=seed)
+    return run_algorithm("UCS", m.graph, s, g, m.node_coords)[0]
+
+
+def _trace(m, path, spacing_m=20.0, noise_m=0.0, seed=0):
+    """GPS fixes every `spacing_m` along a path's geometry, with Gaussian noise."""
+    projection = m.segment_index
+    xy = projection.project(*np.asarray(m.get_path_coords(path)).T)
+    along = np.concatenate([[0.0], np.cumsum(np.hypot(*np.diff(xy, axis=0).T))])
+    at = np.arange(0.0, along[-1], spacing_m)
+    fixes = np.column_stack([np.interp(at, along, xy[:, 0]), np.interp(at, along, xy[:, 1])])
+    return projection.unproject(fixes + np.random.default_rng(seed).normal(0.0, noise_m, fixes.shape))
+
+
+def _off_map(m, count):
+    low = m.compiled.coords.min(axis=0)
+    return np.tile(low - 1.0, (count, 1))
+
+
+def test_empty_trace(matcher):
+    result = matcher.match(np.empty((0, 2)))
+    assert result.paths == [] and result.matched == 0
+    assert result.edges.shape == (0, 2) and result.offsets.shape == (0,)
+
+
+def test_single_fix(road_map, matcher):
+    result = matcher.match(road_map.compiled.coords[:1])
+    assert result.matched == 1
+    assert len(result.paths) == 1 and result.paths[0]
+
+
+def test_off_map_fixes(road_map, matcher):
+    result = matcher.match(_off_map(road_map, 3))
+    assert result.paths == [] and result.matched == 0
+    assert (result.edges == -1).all() and np.isnan(result.offsets).all()
+
+    c = road_map.compiled
+    mixed = matcher.match(np.vstack([c.coords[:1], _off_map(road_map, 1), c.coords[1:2]]))
+    assert mixed.matched == 2
+    assert mixed.edges[1].tolist() == [-1, -1]
+
+
+@pytest.mark.parametrize("noise_m", [0.0, 5.0])
+def test_trace_along_route_matches_it(road_map, matcher, noise_m):
+    for seed in range(5):
+        route = _route(road_map, seed)
+        trace = _trace(road_map, route, noise_m=noise_m, seed=seed)
+        result = matcher.match(trace)
+
+        assert result.matched == len(trace)
+        assert len(result.paths) == 1
+        path = result.paths[0]
+        assert set(route[1:-1]) <= set(path)
+        # Consecutive nodes are joined by roads
+        c = road_map.compiled
+        assert (c.edge_ids(c.node_index(path[:-1]), c.node_index(path[1:])) >= 0).all()
+
+
+def test_jump_splits_trace(road_map, matcher):
+    c = road_map.compiled
+    near = _trace(road_map, _route(road_map, 1))[:5]
+    far_end = c.coords[np.argmax(np.hypot(*(c.coords - near[0]).T))]
+    result = matcher.match(np.vstack([near, np.tile(far_end, (3, 1))]))
+    assert result.matched == 8
+    assert len(result.paths) == 2
+
+
+def test_batches_and_workers_keep_order(road_map):
+    traces = [_trace(road_map, _route(road_map, seed), noise_m=5.0, seed=seed) for seed in range(6)]
+    traces.insert(2, np.empty((0, 2)))
+
+    serial = list(road_map.match_traces(traces, workers=1))
+    parallel = list(match_traces(MapMatcher(road_map.compiled), iter(traces), workers=2, batch_size=2))
+
+    assert len(serial) == len(parallel) == len(traces)
+    for a, b in zip(serial, parallel):
+        assert a.paths == b.paths
+        assert np.array_equal(a.edges, b.edges)
+
+
+def test_read_traces_csv_across_chunks(tmp_path):
+    path = tmp_path / "traces.csv"
+    rows = [("a", 30.0 + i, 31.0) for i in range(5)] + [("b", 40.0, 41.0)] + [("c", 50.0, 51.0 + i) for i in range(4)]
+    path.write_text("lon,trace_id,lat\n" + "".join(f"{lon},{tid},{lat}\n" for tid, lat, lon in rows))
+
+    for chunk_rows in (1, 3, 100):
+        traces = list(read_traces_csv(str(path), chunk_rows=chunk_rows))
+        assert [tid for tid, _ in traces] == ["a", "b", "c"]
+        assert [len(fixes) for _, fixes in traces] == [5, 1, 4]
+        assert traces[2][1][-1].tolist() == [50.0, 54.0]
+
+    path.write_text("trace_id,lat\n")
+    with pytest.raises(ValueError):
+        list(read_traces_csv(str(path)))
@@ -0,0 +1,72 @@
+import os
+from types import SimpleNamespace
+
+import pytest
+
+import core.region_cache as region_cache
+from core.map import Map
+from core.region_cache import RegionCache
+
+
+def _add_region(cache, location, size):
+    key = cache.region_key(location)
+    cache.prepare(key)
+    with open(cache.graph_path(key), "wb") as f:
+        f.write(b"x" * size)
+    return key, cache.register(key, location)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return Map(cache_budget_bytes=2500, data_dir=str(tmp_path)).cache
+
+
+def test_least_recently_used_regions_are_evicted(cache, monkeypatch):
+    clock = iter(range(100))
+    monkeypatch.setattr(region_cache, "time", SimpleNamespace(time=lambda: next(clock)))
+
+    cairo, _ = _add_region(cache, "Cairo, Egypt", 1000)
+    giza, _ = _add_region(cache, "Giza, Egypt", 1000)
+    cache.touch(cairo)
+    alex, evicted = _add_region(cache, "Alexandria, Egypt", 1000)
+
+    assert evicted == [giza]
+    assert not os.path.exists(cache.region_dir(giza))
+    assert set(cache.regions()) == {cairo, alex} and cache.total_size() == 2000
+    assert set(RegionCache(cache.cache_dir).regions()) == {cairo, alex}
+
+
+def test_region_over_the_budget_alone_is_kept(cache):
+    small, _ = _add_region(cache, "Cairo", 1000)
+    large, evicted = _add_region(cache, "Egypt", 5000)
+
+    # The region just written stays, even though it alone exceeds the budget
+    assert evicted == [small]
+    assert cache.has_graph(large) and cache.total_size() == 5000
+
+
+def test_artefacts_of_an_evicted_region_are_not_written(cache):
+    key, _ = _add_region(cache, "Cairo", 1000)
+    cache.remove(key)
+
+    assert not cache.prepare_artefact(key)
+    assert not os.path.exists(cache.region_dir(key))
+
+
+def test_index_is_rewritten_whole(cache, monkeypatch):
+    key, _ = _add_region(cache, "Cairo", 1000)
+    before = open(cache.index_path, encoding="utf-8").read()
+
+    # A save that fails half way leaves the previous index and no temp file behind
+    def broken_dump(data, f, **kwargs):
+        f.write('{"regions": {')
+        raise OSError("disk full")
+    monkeypatch.setattr(region_cache.json, "dump", broken_dump)
+    with pytest.raises(OSError):
+        _add_region(cache, "Giza", 1000)
+    monkeypatch.undo()
+
+    assert open(cache.index_path, encoding="utf-8").read() == before
+    assert [name for name in os.listdir(cache.cache_dir) if name.endswith(".tmp")] == []
+    assert set(RegionCache(cache.cache_dir).regions()) == {key}
+
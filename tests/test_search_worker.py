@@ -0,0 +1,47 @@
+import time
+
+import numpy as np
+import pytest
+
+from core.edge_snapping import VIRTUAL_START, VIRTUAL_GOAL
+from gui.search_worker import SearchJob
+
+
+@pytest.fixture(scope="module")
+def road_map(make_road_map):
+    return make_road_map(3000, 11)
+
+
+def _snaps(m, seed):
+    rng = np.random.default_rng(seed)
+    low, high = m.compiled.coords.min(axis=0), m.compiled.coords.max(axis=0)
+    while True:
+        snaps = {VIRTUAL_START: m.snap_to_edge(*rng.uniform(low, high)),
+                 VIRTUAL_GOAL: m.snap_to_edge(*rng.uniform(low, high))}
+        job = SearchJob(m, ["UCS"], VIRTUAL_START, VIRTUAL_GOAL, snaps, ["blue"]).start()
+        job.thread.join()
+        if job.poll()[-1][1][0]["success"]:
+            return snaps
+
+
+def _results(job):
+    job.thread.join(timeout=30)
+    assert not job.is_running
+    return job.poll()[-1][1]
+
+
+@pytest.mark.parametrize("name", ["A*", "UCS", "BFS"])
+def test_search_started_right_after_a_cancel(road_map, name):
+    for seed in range(5):
+        snaps = _snaps(road_map, seed)
+        slow = SearchJob(road_map, ["IDS"], VIRTUAL_START, VIRTUAL_GOAL, snaps, ["blue"], animate=True).start()
+        time.sleep(0.05)
+        slow.cancel()
+
+        # The cancelled search winds down while this one runs on the same endpoints
+        job = SearchJob(road_map, [name], VIRTUAL_START, VIRTUAL_GOAL, snaps, ["blue"], animate=True).start()
+        result, = _results(job)
+        _results(slow)
+
+        assert result["success"], result.get("error")
+        assert VIRTUAL_START not in road_map.node_coords and VIRTUAL_GOAL not in road_map.node_coords
@@ -0,0 +1,42 @@
+import threading
+
+import pytest
+
+import core.tile_store as tile_store
+from core.tile_store import TileStore
+
+BOUNDS = (30.0, 31.2, 30.1, 31.3)  # a 0.1 degree box, 4-6 tiles a side at zoom 14
+
+
+@pytest.fixture
+def store(tmp_path):
+    return TileStore(str(tmp_path / "tiles.db"))
+
+
+def test_prefetch_stores_missing_tiles_once(store):
+    fetched = []
+    stored, failed = store.prefetch(BOUNDS, 12, 14, fetch=lambda *t: fetched.append(t) or b"png")
+
+    assert (stored, failed) == (len(fetched), 0) and stored == store.count()
+    assert store.prefetch(BOUNDS, 12, 14, fetch=lambda *t: b"png") == (0, 0)
+
+
+def test_prefetch_refuses_over_the_limit(store):
+    missing = len(store.missing_tiles(BOUNDS, 10, 14))
+    with pytest.raises(ValueError):
+        store.prefetch(BOUNDS, 10, 14, fetch=lambda *t: pytest.fail("fetched"), max_tiles=missing - 1)
+    assert store.count() == 0
+
+
+def test_prefetch_stores_batches_until_cancelled(store, monkeypatch):
+    monkeypatch.setattr(tile_store, "PREFETCH_BATCH", 4)
+    cancel = threading.Event()
+
+    def fetch(zoom, x, y):
+        # The first batch is already stored; cancelled during the second, which still finishes
+        if store.count() >= 4:
+            cancel.set()
+        return b"png"
+
+    assert store.prefetch(BOUNDS, 14, 14, fetch=fetch, cancel=cancel) == (8, 0)
+    assert store.count() == 8
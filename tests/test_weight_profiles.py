@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from core.weight_profiles import EdgeTable, compile_profile, evaluate_profile
+
+
+@pytest.fixture
+def table():
+    return EdgeTable.from_rows([0, 1, 1], [
+        {"length": 100.0, "highway": "residential"},
+        {"length": 300.0, "highway": "primary", "maxspeed": "60"},
+        {"length": 200.0, "highway": "primary", "maxspeed": "90"},
+    ])
+
+
+@pytest.mark.parametrize("expression, expected", [
+    ("length", [100.0, 200.0]),
+    ("travel_time * (2 if highway == 'residential' else 1)", [24.0, 8.0]),
+    ("length / max(speed_kph, 50)", [2.0, 200.0 / 90]),
+    ("np.where(highway in ('primary', 'trunk'), length, 0)", [0.0, 200.0]),
+    ("(length / 100) ** 2 + -1", [0.0, 3.0]),
+])
+def test_allowed_expressions(table, expression, expected):
+    assert evaluate_profile(expression, table, 2).tolist() == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("expression", [
+    "().__class__.__mro__[1].__subclasses__()",
+    "__import__('os').system('true')",
+    "np.load('weights.npy')",
+    "length.real",
+    "[length for _ in 'ab']",
+    "(lambda: length)()",
+    "min(length, key=abs)",
+    "'x' * 10 ** 9 == highway",
+    "highway * 3",
+    "9 ** 9 ** 9",
+    "length[0]",
+    "length = 1",
+])
+def test_rejected_expressions(table, expression):
+    with pytest.raises(ValueError):
+        compile_profile(expression)
+    with pytest.raises(ValueError):
+        evaluate_profile(expression, table, 2)
+
+
+def test_map_refuses_unsafe_profile(make_road_map):
+    m = make_road_map(500, 1)
+    ok, msg = m.add_profile("escape", "().__class__")
+    assert not ok and "not allowed" in msg
+    assert "escape" not in m.profiles and "escape" not in m.compiled.weights
+    assert np.isfinite(m.compiled.snapshot.weights["length"]).all()
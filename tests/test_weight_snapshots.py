@@ -0,0 +1,124 @@
+import numpy as np
+import pytest
+
+from algorithms import run_algorithm
+from algorithms.dynamic_route import DynamicRoute
+from core.road_edits import road_edits
+
+
+@pytest.fixture
+def road_map(make_road_map):
+    return make_road_map(3000, 5)
+
+
+def _edge_ends(c):
+    return c.node_ids[c.edge_sources], c.target_ids
+
+
+def _feed(m, share, seed, slow=False):
+    """Publish random speeds for `share` of the edges; returns (edge mask, speeds)."""
+    c = m.compiled
+    rng = np.random.default_rng(seed)
+    chosen = rng.random(c.num_edges) < share
+    speeds = rng.uniform(5.0, 20.0 if slow else 130.0, chosen.sum())
+    u, v = _edge_ends(c)
+    c.ingest_speeds(u[chosen], v[chosen], speeds)
+    m._repin()
+    return chosen, speeds
+
+
+def _cost(m, profile, snapshot, seed=3):
+    s, g = m.sampler.sample_one(seed=seed)
+    path, _ = run_algorithm("UCS", m.graph, s, g, m.node_coords, profile=profile, snapshot=snapshot)
+    return m.get_path_weight(path, profile, snapshot=snapshot)
+
+
+def test_ingested_speeds_set_travel_times(road_map):
+    c = road_map.compiled
+    mapped = c.weights["travel_time"].copy()
+    lengths = c.weights["length"].copy()
+
+    chosen, speeds = _feed(road_map, 0.5, 1)
+    assert np.allclose(c.weights["travel_time"][chosen], lengths[chosen] / (speeds / 3.6))
+    assert np.array_equal(c.weights["travel_time"][~chosen], mapped[~chosen])
+    assert np.array_equal(c.weights["length"], lengths)
+
+    # Edges a later feed leaves out go back to their mapped speed
+    _feed(road_map, 0.0, 2)
+    assert np.array_equal(c.weights["travel_time"], mapped)
+
+
+def test_feed_keeps_weight_factors_and_counts_unmatched_rows(road_map):
+    c = road_map.compiled
+    u, v = _edge_ends(c)
+    road_map.apply_edits(road_edits(int(u[0]), int(v[0]), False, factor=3.0))
+
+    changed, unmatched = c.ingest_speeds(np.append(u[:1], -1), np.append(v[:1], -2), [36.0, 50.0])
+    assert unmatched == 1
+    assert changed.tolist() == [0]
+    length = c.weights["length"][0] / 3.0  # the factor scales every profile
+    assert np.isclose(c.weights["travel_time"][0], 3.0 * length / 10.0)  # 36 km/h = 10 m/s
+
+
+def test_traffic_csv_columns_in_any_order(road_map, tmp_path):
+    c = road_map.compiled
+    u, v = _edge_ends(c)
+    path = tmp_path / "speeds.csv"
+    path.write_text("speed_kph,source,v,u\n" + "".join(f"18.0,x,{b},{a}\n" for a, b in zip(u[:10], v[:10])))
+
+    success, _ = road_map.ingest_traffic(str(path))
+    assert success
+    assert np.allclose(c.weights["travel_time"][:10], c.weights["length"][:10] / 5.0)
+    assert not road_map.ingest_traffic(str(tmp_path / "missing.csv"))[0]
+
+
+def test_pinned_snapshot_keeps_its_costs(road_map):
+    c = road_map.compiled
+    pinned = c.snapshot
+    before = _cost(road_map, "travel_time", pinned)
+
+    for seed in range(3):
+        _feed(road_map, 0.5, seed, slow=True)
+
+    assert c.version > pinned.version
+    assert _cost(road_map, "travel_time", pinned) == before
+    assert _cost(road_map, "travel_time", None) != before
+
+
+def test_only_current_and_pinned_snapshots_stay_live(road_map):
+    c = road_map.compiled
+    pinned_view = road_map.graph.with_profile("travel_time", c.snapshot)
+    s, g = road_map.sampler.sample_one(seed=1)
+    route = DynamicRoute(road_map, s, g, profile="travel_time")
+    route.repair()
+    _feed(road_map, 0.2, 0)
+    route.repair()
+
+    for seed in range(1, 5):
+        _feed(road_map, 0.2, seed)
+        road_map.apply_edits(road_edits(s, int(c.target_ids[c.indptr[c.index_of(s)]]), False, factor=1.5))
+
+    assert c.live_versions() == sorted({pinned_view.snapshot.version, route.planner.graph.snapshot.version, c.version})
+
+    del pinned_view
+    route.close()
+    del route
+    assert c.live_versions() == [c.version]
+
+
+def test_edited_since_lists_changed_edges(road_map):
+    c = road_map.compiled
+    u, v = _edge_ends(c)
+    start = c.version
+
+    road_map.apply_edits(road_edits(int(u[5]), int(v[5]), False, closed=True))
+    road_map.apply_edits(road_edits(int(u[7]), int(v[7]), False, factor=2.0))
+    assert c.edited_since(start).tolist() == [5, 7]
+    assert c.edited_since(c.version).tolist() == []
+
+    # Updates too large to list, and versions older than the log, call for a full replan
+    _feed(road_map, 0.5, 0)
+    assert c.edited_since(start) is None
+    for _ in range(c.EDIT_LOG_SIZE):
+        road_map.apply_edits(road_edits(int(u[5]), int(v[5]), False, closed=False))
+    assert c.edited_since(start + 2) is None